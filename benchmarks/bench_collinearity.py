@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 08:50
+@Author  : itlubber
+@Site    : itlubber.art
+
+宽表相关系数和 VIF 的耗时对比：pd.DataFrame.corr 加逐个变量回归的 VIF 与 Collinearity 分块计算
+
+逐个变量回归的 VIF 只计算前 --vif-cols 个变量，按比例推算全部变量的耗时
+
+PYTHONPATH=. python benchmarks/bench_collinearity.py --rows 50000 --cols 1000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from mltoolbox.eda import Collinearity
+
+
+def make_data(rows, cols, seed=42):
+    rng = np.random.RandomState(seed)
+    factors = rng.normal(size=(rows, max(cols // 10, 1)))
+    loadings = rng.normal(size=(factors.shape[1], cols)) * (rng.random_sample((factors.shape[1], cols)) < 0.05)
+    values = factors @ loadings + rng.normal(size=(rows, cols))
+    return pd.DataFrame(values, columns=[f"x{i}" for i in range(cols)])
+
+
+def regression_vif(data, columns):
+    result = {}
+    for column in columns:
+        others = data.drop(columns=column)
+        r2 = LinearRegression().fit(others, data[column]).score(others, data[column])
+        result[column] = 1 / (1 - r2)
+    return result
+
+
+def collinearity_pairs(data, threshold, **kwargs):
+    # 统计量在构造时流式累加，计时包含构造
+    collinearity = Collinearity(data, **kwargs)
+    return collinearity, collinearity.pairs(threshold)
+
+
+def timeit(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--cols", type=int, default=1000)
+    parser.add_argument("--vif-cols", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    data = make_data(args.rows, args.cols)
+    print(f"rows: {args.rows:,d}  cols: {args.cols}")
+
+    cost, corr = timeit(lambda: data.corr())
+    print(f"{'DataFrame.corr':<28} cost: {cost:8.2f}s")
+    cost, expected = timeit(lambda: regression_vif(data, data.columns[:args.vif_cols]))
+    print(f"{'regression VIF (estimated)':<28} cost: {cost * args.cols / args.vif_cols:8.2f}s")
+
+    for float32 in (False, True):
+        cost, (collinearity, pairs) = timeit(lambda: collinearity_pairs(data, args.threshold, float32=float32, n_jobs=args.n_jobs))
+        name = f"pairs float{32 if float32 else 64}"
+        print(f"{name:<28} cost: {cost:8.2f}s  pairs: {len(pairs)}  max error: {np.abs(corr.to_numpy() - collinearity.matrix().to_numpy()).max():.1e}")
+
+    cost, result = timeit(lambda: Collinearity(data, n_jobs=args.n_jobs).vif())
+    error = max(abs(result[c] / v - 1) for c, v in expected.items())
+    print(f"{'Collinearity.vif':<28} cost: {cost:8.2f}s  max relative error: {error:.1e}")
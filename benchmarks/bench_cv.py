@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 06:00
+@Author  : itlubber
+@Site    : itlubber.art
+
+交叉验证耗时对比：逐折串行训练、CrossValidator 串行、CrossValidator 进程池，并估算理想耗时 单折耗时 × 折数 / 进程数
+
+PYTHONPATH=. python benchmarks/bench_cv.py --rows 200000 --cols 50 --folds 5 --n-jobs -1
+"""
+
+import os
+import time
+import pickle
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.datasets import make_classification
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.model_selection import StratifiedKFold
+
+from mltoolbox.cv import CrossValidator
+
+
+def serial(estimator, X, y, folds):
+    oof = np.zeros(len(y))
+    for train, valid in folds:
+        model = clone(estimator).fit(X.iloc[train], y[train])
+        oof[valid] = model.predict_proba(X.iloc[valid])[:, 1]
+    return oof
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--cols", type=int, default=50)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    n_jobs = os.cpu_count() if args.n_jobs == -1 else args.n_jobs
+    X, y = make_classification(n_samples=args.rows, n_features=args.cols, random_state=42)
+    X = pd.DataFrame(X, columns=[f"x{i}" for i in range(args.cols)])
+    estimator = HistGradientBoostingClassifier(max_iter=50, random_state=42)
+    folds = list(StratifiedKFold(args.folds, shuffle=True, random_state=42).split(X, y))
+
+    start = time.perf_counter()
+    serial(estimator, X, y, folds)
+    serial_cost = time.perf_counter() - start
+
+    with CrossValidator(X, y, cv=folds, n_jobs=1) as validator:
+        start = time.perf_counter()
+        result = validator.evaluate(estimator)
+        single_cost = time.perf_counter() - start
+        fold_cost = result.scores[["preprocess_time", "fit_time", "predict_time"]].sum(axis=1).mean()
+
+    with CrossValidator(X, y, cv=folds, n_jobs=n_jobs) as validator:
+        start = time.perf_counter()
+        validator.evaluate(estimator)
+        parallel_cost = time.perf_counter() - start
+        payload = len(pickle.dumps((validator.store, validator.data_key, validator.fold_keys[0], estimator)))
+
+    print(f"rows: {args.rows:,d}  cols: {args.cols}  folds: {args.folds}  n_jobs: {n_jobs}  X: {X.values.nbytes / 1024 ** 2:.1f} MiB  task payload: {payload / 1024:.1f} KiB")
+    print(f"serial loop           {serial_cost:7.2f}s")
+    print(f"CrossValidator n=1    {single_cost:7.2f}s")
+    print(f"CrossValidator n={n_jobs:<4d} {parallel_cost:7.2f}s  ideal: {fold_cost * args.folds / min(n_jobs, args.folds):7.2f}s")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 10:20
+@Author  : itlubber
+@Site    : itlubber.art
+
+部分依赖 / ICE 耗时对比：每个网格点单独预测的循环、sklearn.inspection.partial_dependence 与 PartialDependence 拼接网格点批量预测
+
+PYTHONPATH=. python benchmarks/bench_dependence.py --rows 2000 --cols 30 --features 20
+PYTHONPATH=. python benchmarks/bench_dependence.py --model lr --rows 1000 --cols 200 --features 100
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import partial_dependence
+from sklearn.linear_model import LogisticRegression
+
+from mltoolbox.explainer import PartialDependence
+
+
+def naive_ice(model, X, feature, grid):
+    result = []
+    for value in grid:
+        result.append(model.predict_proba(X.assign(**{feature: value}))[:, 1])
+    return np.column_stack(result)
+
+
+def timeit(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--cols", type=int, default=30)
+    parser.add_argument("--features", type=int, default=20)
+    parser.add_argument("--grid", type=int, default=20)
+    parser.add_argument("--model", choices=["hgb", "lr"], default="hgb")
+    args = parser.parse_args()
+
+    X, y = make_classification(n_samples=args.rows, n_features=args.cols, n_informative=10, random_state=42)
+    X = pd.DataFrame(X, columns=[f"x{i}" for i in range(args.cols)])
+    model = HistGradientBoostingClassifier(max_iter=100, random_state=42) if args.model == "hgb" else LogisticRegression(max_iter=1000)
+    model.fit(X, y)
+    features = list(X.columns[:args.features])
+    print(f"model: {args.model}  rows: {args.rows:,d}  cols: {args.cols}  features: {args.features}  grid: {args.grid}")
+
+    explainer = PartialDependence(model, grid_resolution=args.grid, max_samples=None).fit(X)
+    cost, expected = timeit(lambda: {f: naive_ice(model, X, f, explainer.grid(f)) for f in features})
+    print(f"{'predict per grid point':<28} cost: {cost:7.2f}s")
+    cost, _ = timeit(lambda: [partial_dependence(model, X, [f], kind="both", grid_resolution=args.grid, method="brute") for f in features])
+    print(f"{'sklearn partial_dependence':<28} cost: {cost:7.2f}s")
+    cost, result = timeit(lambda: {f: explainer.ice(f).to_numpy() for f in features})
+    error = max(np.abs(result[f] - expected[f]).max() for f in features)
+    print(f"{'PartialDependence':<28} cost: {cost:7.2f}s  max error: {error:.1e}")
+    cost, _ = timeit(lambda: [explainer.plot(f) for f in features])
+    print(f"{'plots from cache':<28} cost: {cost:7.2f}s")
+    cost, _ = timeit(lambda: explainer.interaction(features[0], features[1]))
+    print(f"{'2-D interaction':<28} cost: {cost:7.2f}s")
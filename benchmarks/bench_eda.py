@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 08:00
+@Author  : itlubber
+@Site    : itlubber.art
+
+数据探查耗时和内存峰值对比：pandas 多次遍历 (describe、nunique、分位数、缺失率、value_counts) 与 DataProfiler 单次分块遍历
+
+PYTHONPATH=. python benchmarks/bench_eda.py --rows 1000000 --cols 20
+"""
+
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from mltoolbox.eda import DataProfiler
+
+
+def make_data(rows, cols, seed=42):
+    rng = np.random.RandomState(seed)
+    data = {}
+    for i in range(cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"amt_{i}"] = rng.lognormal(5, 1, rows)
+        elif kind == 1:
+            data[f"cnt_{i}"] = np.where(rng.random_sample(rows) < 0.1, np.nan, rng.poisson(3, rows))
+        elif kind == 2:
+            data[f"score_{i}"] = rng.normal(size=rows)
+        else:
+            data[f"cat_{i}"] = rng.choice(["A", "B", "C", "D", None], rows)
+    return pd.DataFrame(data)
+
+
+def pandas_profile(data):
+    numeric = data.select_dtypes("number")
+    return (data.describe(percentiles=[0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]), data.isna().mean(), (numeric == 0).sum(), data.nunique(),
+            numeric.skew(), numeric.kurt(), {c: data[c].value_counts().head(10) for c in data.columns})
+
+
+def measure(func):
+    start = time.perf_counter()
+    func()
+    cost = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cost, peak / 1024 ** 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    data = make_data(args.rows, args.cols)
+    print(f"rows: {args.rows:,d}  cols: {args.cols}  data: {data.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MiB")
+    for name, func in [("pandas", lambda: pandas_profile(data)), ("DataProfiler", lambda: DataProfiler().fit(data, chunk_size=args.chunk_size).to_frame())]:
+        cost, peak = measure(func)
+        print(f"{name:<14} cost: {cost:7.2f}s  peak: {peak:8.1f} MiB")
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 00:10
+@Author  : itlubber
+@Site    : itlubber.art
+
+FocalLoss.lgb_obj 分别调用 grad 和 hess 与合并计算 grad_hess (float64 / float32) 的耗时和每轮新分配内存对比
+
+PYTHONPATH=. python benchmarks/bench_focal_loss.py --rows 1000000 5000000 --rounds 10
+"""
+
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+from scipy import special
+
+from mltoolbox.models.tricks.focal_loss import FocalLoss
+
+
+class Dataset:
+    """
+    模拟 lightgbm.Dataset ，只提供 get_label 和 get_weight
+    """
+
+    def __init__(self, label, weight=None):
+        self.label = label
+        self.weight = weight
+
+    def get_label(self):
+        return self.label
+
+    def get_weight(self):
+        return self.weight
+
+
+def separate_obj(loss, preds, train_data):
+    y = train_data.get_label()
+    p = special.expit(preds)
+    return loss.grad(y, p), loss.hess(y, p)
+
+
+def bench(obj, loss, preds, train_data, rounds=10):
+    obj(loss, preds, train_data)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        obj(loss, preds, train_data)
+    cost = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    obj(loss, preds, train_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cost, peak / 1024 ** 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000000, 5000000])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--gamma", type=float, default=2.)
+    parser.add_argument("--alpha", type=float, default=0.25)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        rng = np.random.RandomState(42)
+        train_data = Dataset(rng.randint(0, 2, rows).astype(np.float32))
+        preds = rng.normal(0, 2, rows)
+
+        results = [
+            ("grad + hess", bench(separate_obj, FocalLoss(args.gamma, args.alpha), preds, train_data, args.rounds)),
+            ("fused float64", bench(FocalLoss.lgb_obj, FocalLoss(args.gamma, args.alpha), preds, train_data, args.rounds)),
+            ("fused float32", bench(FocalLoss.lgb_obj, FocalLoss(args.gamma, args.alpha, dtype=np.float32), preds, train_data, args.rounds)),
+        ]
+        for name, (cost, peak) in results:
+            print(f"rows: {rows:>10,d}  {name:<14} per round: {cost * 1000:9.1f}ms  speedup: {results[0][1][0] / cost:5.2f}x  allocated per round: {peak:8.1f} MiB")
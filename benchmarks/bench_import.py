@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 02:40
+@Author  : itlubber
+@Site    : itlubber.art
+
+冷启动耗时测试，每次在全新的解释器中导入模块，记录导入耗时和被加载的重依赖，超过预算时返回非零状态码，可以直接放到 CI 中
+
+PYTHONPATH=. python benchmarks/bench_import.py
+PYTHONPATH=. python benchmarks/bench_import.py --repeat 10 --budget 0.05
+PYTHONPATH=. python benchmarks/bench_import.py --statements "from mltoolbox.utils.setter import init_setting; init_setting()" "import mltoolbox.utils.reader"
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["numpy", "pandas", "scipy", "matplotlib", "joblib", "openpyxl", "sklearn", "PIL"]
+
+# (导入语句, 冷启动预算 (秒)，不允许加载的依赖)，预算为 None 时只记录不检查
+STATEMENTS = [
+    ("import mltoolbox", 0.05, HEAVY),
+    ("from mltoolbox.utils import init_logger, load_pickle", 0.05, HEAVY),
+    ("from mltoolbox.utils.setter import init_setting, seed_everything", 0.05, HEAVY),
+    ("from mltoolbox.utils.writer import ExcelWriter", None, []),
+    # 使用 matplotlib 自带的字体，第二次及之后的运行使用缓存的字体属性注册
+    ("import os, matplotlib; from mltoolbox.utils.setter import init_setting; init_setting(font_path=os.path.join(matplotlib.get_data_path(), 'fonts', 'ttf', 'DejaVuSans.ttf'))", None, []),
+]
+
+SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+exec({statement!r})
+cost = time.perf_counter() - start
+print(json.dumps(dict(cost=cost, modules=[m for m in {heavy!r} if m in sys.modules])))
+"""
+
+
+def measure(statement, repeat=5):
+    """
+    在 repeat 个全新的解释器中执行导入语句，返回最小耗时和被加载的重依赖
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    results = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-c", SCRIPT.format(statement=statement, heavy=HEAVY)], capture_output=True, text=True, env=env)
+        if process.returncode != 0:
+            raise RuntimeError((process.stderr.strip().splitlines() or ["unknown error"])[-1])
+        results.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return min(r["cost"] for r in results), results[0]["modules"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None, help="覆盖默认的冷启动预算 (秒)")
+    parser.add_argument("--statements", nargs="+", default=None, help="自定义的导入语句，只记录不检查")
+    args = parser.parse_args()
+
+    statements = [(s, None, []) for s in args.statements] if args.statements else STATEMENTS
+
+    failed = []
+    for statement, budget, forbidden in statements:
+        budget = args.budget if args.budget is not None and budget is not None else budget
+        try:
+            cost, modules = measure(statement, repeat=args.repeat)
+        except RuntimeError as error:
+            failed.append(statement)
+            print(f"{'ERROR':<5} {statement}  {error}")
+            continue
+
+        loaded = [m for m in modules if m in forbidden]
+        ok = (budget is None or cost <= budget) and not loaded
+        if not ok:
+            failed.append(statement)
+        print(f"{'OK' if ok else 'FAIL':<5} {cost * 1000:9.1f}ms  budget: {'-' if budget is None else f'{budget * 1000:.0f}ms':>7}  heavy: {','.join(modules) or '-':<40} {statement}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 09:40
+@Author  : itlubber
+@Site    : itlubber.art
+
+置换重要性耗时对比：每个特征每次重复复制整张表并单独预测的循环与 PermutationImportance 复用缓冲区、批量预测
+
+PYTHONPATH=. python benchmarks/bench_permutation.py --rows 100000 --cols 50
+PYTHONPATH=. python benchmarks/bench_permutation.py --model lr --rows 5000 --cols 300
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+from mltoolbox.explainer import PermutationImportance
+
+
+def naive_importance(model, X, y, n_repeats, seed=0):
+    rng = np.random.RandomState(seed)
+    baseline = roc_auc_score(y, model.predict_proba(X)[:, 1])
+    result = {}
+    for column in X.columns:
+        scores = []
+        for _ in range(n_repeats):
+            permuted = X.copy()
+            permuted[column] = rng.permutation(permuted[column].to_numpy())
+            scores.append(baseline - roc_auc_score(y, model.predict_proba(permuted)[:, 1]))
+        result[column] = np.mean(scores)
+    return pd.Series(result)
+
+
+def timeit(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--model", choices=["hgb", "lr"], default="hgb")
+    args = parser.parse_args()
+
+    X, y = make_classification(n_samples=args.rows, n_features=args.cols, n_informative=10, random_state=42)
+    X = pd.DataFrame(X, columns=[f"x{i}" for i in range(args.cols)])
+    model = HistGradientBoostingClassifier(max_iter=100, random_state=42) if args.model == "hgb" else LogisticRegression(max_iter=1000)
+    model.fit(X, y)
+    print(f"model: {args.model}  rows: {args.rows:,d}  cols: {args.cols}  repeats: {args.repeats}")
+
+    cost, expected = timeit(lambda: naive_importance(model, X, y, args.repeats))
+    print(f"{'copy per feature':<32} cost: {cost:7.2f}s")
+    for name, params in [("buffer, batch_size=1", dict(batch_size=1)), ("buffer, batched", dict()), ("buffer, batched, 20% sample", dict(max_samples=0.2))]:
+        explainer = PermutationImportance(model, n_repeats=args.repeats, n_jobs=args.n_jobs, seed=0, **params)
+        cost, importances = timeit(lambda: explainer.fit(X, y).importances.set_index("feature")["importance"])
+        print(f"{name:<32} cost: {cost:7.2f}s  rank corr: {importances.corr(expected, method='spearman'):.3f}")
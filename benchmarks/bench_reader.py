@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 05:00
+@Author  : itlubber
+@Site    : itlubber.art
+
+宽表读取的耗时、内存峰值和结果大小对比：pd.read_csv 与 DatasetReader 一次读取、分块读取
+
+PYTHONPATH=. python benchmarks/bench_reader.py --rows 50000 --cols 300
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from mltoolbox.utils.reader import DatasetReader
+
+
+def make_wide(path, rows, cols, seed=42):
+    """
+    模拟评分卡宽表：整数计数特征、分箱后的取值、连续特征以及少量低基数字符串特征
+    """
+    rng = np.random.RandomState(seed)
+    data = {}
+    for i in range(cols):
+        kind = i % 6
+        if kind in (0, 1):
+            data[f"cnt_{i}"] = rng.poisson(3, rows)
+        elif kind == 2:
+            data[f"bin_{i}"] = rng.randint(0, 10, rows) / 4
+        elif kind == 3:
+            data[f"amt_{i}"] = rng.lognormal(5, 1, rows).round(2)
+        elif kind == 4:
+            data[f"flag_{i}"] = np.where(rng.random_sample(rows) < 0.05, np.nan, rng.randint(0, 2, rows))
+        else:
+            data[f"cat_{i}"] = rng.choice(["A", "B", "C", "D", "E"], rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+    return path
+
+
+def measure(func):
+    """
+    耗时和内存峰值分开测量，tracemalloc 会显著拖慢解析
+    """
+    start = time.perf_counter()
+    data = func()
+    cost = time.perf_counter() - start
+    size = data.memory_usage(deep=True).sum() / 1024 ** 2
+    del data
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cost, peak / 1024 ** 2, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--cols", type=int, default=300)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_wide(os.path.join(tmp, "wide.csv"), args.rows, args.cols)
+        cases = [
+            ("pd.read_csv", lambda: pd.read_csv(path)),
+            ("DatasetReader", lambda: DatasetReader(path).read()),
+            ("DatasetReader chunks", lambda: DatasetReader(path, chunk_size=args.chunk_size).read()),
+            ("DatasetReader float32", lambda: DatasetReader(path, float32=True).read()),
+        ]
+        for name, func in cases:
+            cost, peak, size = measure(func)
+            print(f"{name:<22} rows: {args.rows:>8,d}  cols: {args.cols}  cost: {cost:7.2f}s  peak: {peak:8.1f} MiB  result: {size:8.1f} MiB")
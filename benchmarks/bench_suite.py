@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/16 23:40
+@Author  : itlubber
+@Site    : itlubber.art
+
+excel 报告相关接口的基准测试，覆盖 insert_df2sheet (边框、填充、merge_column、auto_width)、带全部列格式参数的 dataframe2excel、
+insert_pic2sheet 以及 replace 和 append 模式下的 save，在 1k 到 1M 个单元格的表格上记录耗时和内存峰值，结果保存为 json 便于不同版本之间对比
+
+每个用例在独立的子进程中运行，内存峰值为子进程的最大常驻内存 (peak_rss_mb) 以及相对于用例准备完成时的增量 (delta_rss_mb)
+
+benchmarks 下的脚本都在仓库根目录通过 PYTHONPATH=. 运行，也可以先 pip install -e . 安装 mltoolbox
+
+PYTHONPATH=. python benchmarks/bench_suite.py --output results.json
+PYTHONPATH=. python benchmarks/bench_suite.py --sizes 1000 10000 --cases insert_border dataframe2excel --repeat 3
+PYTHONPATH=. python benchmarks/bench_suite.py --output new.json --compare results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from bench_writer import make_template, make_sample
+from mltoolbox.utils.writer import ExcelWriter, dataframe2excel
+
+
+SIZES = [1000, 10000, 100000, 1000000]
+COLUMNS = 10
+
+
+def make_data(cells, cols=COLUMNS, seed=42):
+    rows = max(cells // cols, 1)
+    data = make_sample(rows, cols - 2, seed=seed)
+    data["类别"] = np.random.RandomState(seed).choice(["类别A", "类别B", "其他"], rows)
+    return data
+
+
+def case_insert_border(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("模型报告")
+    return lambda: writer.insert_df2sheet(worksheet, data, "B2", bulk=True)
+
+
+def case_insert_border_cell(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("模型报告")
+    return lambda: writer.insert_df2sheet(worksheet, data, "B2")
+
+
+def case_insert_fill(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("模型报告")
+    return lambda: writer.insert_df2sheet(worksheet, data, "B2", fill=True, bulk=True)
+
+
+def case_insert_merge_column(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("模型报告")
+    return lambda: writer.insert_df2sheet(worksheet, data, "B2", merge_column="target", merge=True, bulk=True)
+
+
+def case_insert_auto_width(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("模型报告")
+    return lambda: writer.insert_df2sheet(worksheet, data, "B2", auto_width=True, bulk=True)
+
+
+def dataframe2excel_params(data):
+    columns = data.columns.tolist()
+    return dict(title="模型报告", percent_cols=columns[:2], condition_cols=columns[2:4], color_cols=columns[4:5], custom_cols=columns[5:6], custom_format="#,##0.00", auto_width=True)
+
+
+def case_dataframe2excel(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    return lambda: dataframe2excel(data, writer, sheet_name="模型报告", **dataframe2excel_params(data))
+
+
+def case_dataframe2excel_stream(template, data, tmp):
+    filename = os.path.join(tmp, "stream.xlsx")
+    return lambda: dataframe2excel(data, filename, sheet_name="模型报告", engine="stream", writer_params={"style_excel": template}, **dataframe2excel_params(data))
+
+
+def case_insert_pic2sheet(template, data, tmp):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("模型报告")
+    figures = []
+    for i in range(4):
+        fig, ax = plt.subplots(figsize=(6, 3))
+        ax.plot(data.iloc[:, i].values[:1000])
+        figures.append(fig)
+
+    def run():
+        # 每张图片插入三次，缓存后只渲染和保存一次
+        for i, fig in enumerate(figures * 3):
+            writer.insert_pic2sheet(worksheet, fig, (2 + 16 * i, 2))
+        writer.save(os.path.join(tmp, "pictures.xlsx"))
+
+    return run
+
+
+def case_save_replace(template, data, tmp):
+    writer = ExcelWriter(style_excel=template)
+    dataframe2excel(data, writer, sheet_name="模型报告", **dataframe2excel_params(data))
+    return lambda: writer.save(os.path.join(tmp, "replace.xlsx"))
+
+
+def case_save_append(template, data, tmp):
+    filename = os.path.join(tmp, "append.xlsx")
+    writer = ExcelWriter(style_excel=template)
+    for i in range(5):
+        dataframe2excel(data, writer, sheet_name=f"历史{i}")
+    writer.save(filename)
+
+    writer = ExcelWriter(style_excel=template, mode="append")
+    dataframe2excel(data, writer, sheet_name="新增", **dataframe2excel_params(data))
+    return lambda: writer.save(filename)
+
+
+CASES = {name[5:]: func for name, func in list(globals().items()) if name.startswith("case_")}
+
+
+def peak_rss():
+    # linux 下 ru_maxrss 的单位为 KB，macOS 下为 B
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(name, cells):
+    """
+    在当前进程中准备并运行一次用例，返回耗时和内存峰值
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        template = make_template(os.path.join(tmp, "template.xlsx"))
+        data = make_data(cells)
+        run = CASES[name](template, data, tmp)
+        baseline = peak_rss()
+        start = time.perf_counter()
+        run()
+        cost = time.perf_counter() - start
+        peak = peak_rss()
+
+    return dict(wall=cost, peak_rss_mb=peak, delta_rss_mb=peak - baseline, rows=data.shape[0], cols=data.shape[1])
+
+
+def run_isolated(name, cells):
+    """
+    在全新的子进程中运行用例，避免前一个用例的内存峰值影响后一个用例
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_case, (name, cells))
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return dict(time=datetime.now().isoformat(timespec="seconds"), commit=commit, python=platform.python_version(), platform=platform.platform(), cpus=os.cpu_count(), pandas=pd.__version__, numpy=np.__version__, openpyxl=openpyxl.__version__)
+
+
+def benchmark(cases, sizes, repeat=1, isolate=True, max_cells=None):
+    results = []
+    for name in cases:
+        for cells in sizes:
+            if max_cells and name in max_cells and cells > max_cells[name]:
+                continue
+
+            runs = [(run_isolated if isolate else run_case)(name, cells) for _ in range(repeat)]
+            walls = [r["wall"] for r in runs]
+            result = dict(case=name, cells=cells, rows=runs[0]["rows"], cols=runs[0]["cols"], repeat=repeat, wall_min=min(walls), wall_median=float(np.median(walls)),
+                          peak_rss_mb=max(r["peak_rss_mb"] for r in runs), delta_rss_mb=max(r["delta_rss_mb"] for r in runs))
+            results.append(result)
+            print(f"{name:<24} cells: {cells:>10,d}  wall: {result['wall_min']:9.3f}s  peak rss: {result['peak_rss_mb']:9.1f} MiB  delta: {result['delta_rss_mb']:9.1f} MiB", flush=True)
+
+    return results
+
+
+def compare(results, baseline):
+    """
+    与之前保存的结果对比，ratio 大于 1 表示变慢或者内存变多
+    """
+    previous = {(r["case"], r["cells"]): r for r in baseline["results"]}
+    print(f"\n{'case':<24} {'cells':>10}  {'wall ratio':>10}  {'delta rss ratio':>15}")
+    for r in results:
+        old = previous.get((r["case"], r["cells"]))
+        if old is None:
+            continue
+        wall = r["wall_min"] / old["wall_min"] if old["wall_min"] else float("nan")
+        memory = r["delta_rss_mb"] / old["delta_rss_mb"] if old["delta_rss_mb"] > 0 else float("nan")
+        print(f"{r['case']:<24} {r['cells']:>10,d}  {wall:>10.2f}  {memory:>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="表格的单元格数量")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-isolate", action="store_true", help="在当前进程中运行全部用例，内存峰值只在第一个用例上有意义")
+    parser.add_argument("--output", default=None, help="结果保存的 json 文件路径")
+    parser.add_argument("--compare", default=None, help="需要对比的之前版本的 json 结果")
+    args = parser.parse_args()
+
+    # 逐单元格写入和 append 准备阶段在超大表格上耗时过长，默认只跑到 100k 个单元格
+    results = benchmark(args.cases, args.sizes, repeat=args.repeat, isolate=not args.no_isolate, max_cells={"insert_border_cell": 100000, "save_append": 100000})
+    report = dict(environment=environment(), results=results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
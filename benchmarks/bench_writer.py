@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/16 10:30
+@Author  : itlubber
+@Site    : itlubber.art
+
+ExcelWriter.insert_df2sheet 逐单元格写入与按列批量写入的耗时对比，memory 和 stream 引擎的内存峰值对比，以及向已有报告追加 sheet 的耗时
+
+PYTHONPATH=. python benchmarks/bench_writer.py --rows 50000 --cols 40
+PYTHONPATH=. python benchmarks/bench_writer.py --memory --cols 20
+PYTHONPATH=. python benchmarks/bench_writer.py --append --sheets 30 --rows 1000
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from mltoolbox.utils.writer import ExcelWriter, SheetJob, build_report, dataframe2excel
+
+
+def make_template(path):
+    workbook = Workbook()
+    workbook.active.title = "初始化"
+    workbook.save(path)
+    return path
+
+
+def make_sample(rows, cols, seed=42):
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame(rng.random_sample((rows, cols)) * 40, columns=[f"特征{i}" for i in range(cols)])
+    data["target"] = rng.randint(0, 3, rows)
+    return data
+
+
+def bench_insert_df2sheet(template, data, repeat=1, **kwargs):
+    costs = []
+    for _ in range(repeat):
+        writer = ExcelWriter(style_excel=template)
+        worksheet = writer.get_sheet_by_name("模型报告")
+        start = time.perf_counter()
+        writer.insert_df2sheet(worksheet, data, "B2", **kwargs)
+        costs.append(time.perf_counter() - start)
+    return min(costs)
+
+
+def bench_engine_memory(template, data, filename, engine="memory"):
+    tracemalloc.start()
+    start = time.perf_counter()
+    dataframe2excel(data, filename, sheet_name="模型报告", percent_cols=data.columns[:2].tolist(), condition_cols=data.columns[2:4].tolist(), engine=engine, writer_params={"style_excel": template})
+    cost = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cost, peak / 1024 ** 2
+
+
+def bench_append(template, data, filename, sheets=30):
+    writer = ExcelWriter(style_excel=template)
+    for i in range(sheets):
+        dataframe2excel(data, writer, sheet_name=f"历史{i}", bulk=True)
+    writer.save(filename)
+
+    start = time.perf_counter()
+    writer = ExcelWriter(style_excel=template, mode="append")
+    dataframe2excel(data.head(20), writer, sheet_name="新增")
+    writer.save(filename)
+    return os.path.getsize(filename) / 1024 ** 2, time.perf_counter() - start
+
+
+def bench_small_reports(template, data, tmp, reports=100, cache_template=True):
+    ExcelWriter.clear_template_cache()
+    start = time.perf_counter()
+    for i in range(reports):
+        writer = ExcelWriter(style_excel=template, cache_template=cache_template)
+        dataframe2excel(data, writer, sheet_name="分群报告")
+        writer.save(os.path.join(tmp, f"report_{i}.xlsx"))
+    return time.perf_counter() - start
+
+
+def bench_build_report(template, data, filename, sheets=40, n_jobs=-1):
+    jobs = [SheetJob(f"报告{i}").title(f"报告{i}").table(data, title="明细", percent_cols=["B0"]).table(data.head(50), fill=False) for i in range(sheets)]
+
+    start = time.perf_counter()
+    build_report(jobs, filename, n_jobs=n_jobs, writer_params=dict(style_excel=template))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cols", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--memory", action="store_true", help="对比 memory 和 stream 引擎在不同行数下的内存峰值")
+    parser.add_argument("--append", action="store_true", help="向包含 --sheets 个 sheet 的已有报告追加一个 sheet 的耗时")
+    parser.add_argument("--sheets", type=int, default=30)
+    parser.add_argument("--build", action="store_true", help="使用 build_report 并行生成包含 --sheets 个 sheet 的报告，对比 --n-jobs 个进程与单进程的耗时")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--reports", type=int, default=0, help="批量生成 --reports 个小报告，对比是否缓存样式模版的耗时")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = make_template(os.path.join(tmp, "template.xlsx"))
+
+        if args.memory:
+            for rows in [10000, 20000, 40000, 80000]:
+                sample = make_sample(rows, args.cols)
+                for engine in ["memory", "stream"]:
+                    cost, peak = bench_engine_memory(template, sample, os.path.join(tmp, f"{engine}.xlsx"), engine=engine)
+                    print(f"engine: {engine:<8} rows: {rows:>8,d}  cost: {cost:8.3f}s  peak: {peak:10.1f} MiB")
+            exit()
+
+        if args.append:
+            size, cost = bench_append(template, make_sample(args.rows, args.cols), os.path.join(tmp, "report.xlsx"), sheets=args.sheets)
+            print(f"sheets: {args.sheets}  size: {size:8.2f} MiB  append cost: {cost:8.3f}s")
+            exit()
+
+        if args.build:
+            sample = make_sample(args.rows, args.cols)
+            for n_jobs in [1, args.n_jobs]:
+                cost = bench_build_report(template, sample, os.path.join(tmp, "report.xlsx"), sheets=args.sheets, n_jobs=n_jobs)
+                print(f"sheets: {args.sheets}  n_jobs: {n_jobs:>3d}  cost: {cost:8.3f}s")
+            exit()
+
+        if args.reports:
+            sample = make_sample(20, 8)
+            for cache_template in [False, True]:
+                cost = bench_small_reports(template, sample, tmp, reports=args.reports, cache_template=cache_template)
+                print(f"reports: {args.reports}  cache_template: {str(cache_template):<5}  cost: {cost:8.3f}s  per report: {cost / args.reports * 1000:8.2f}ms")
+            exit()
+
+        sample = make_sample(args.rows, args.cols)
+
+        for params in [dict(), dict(fill=True), dict(merge_column="target"), dict(auto_width=True)]:
+            cost = bench_insert_df2sheet(template, sample, repeat=args.repeat, **params)
+            bulk_cost = bench_insert_df2sheet(template, sample, repeat=args.repeat, bulk=True, **params)
+            print(f"{str(params):<32} cells: {sample.size:>10,d}  cell: {cost:8.3f}s  bulk: {bulk_cost:8.3f}s  speedup: {cost / bulk_cost:6.2f}x")
@@ -5,6 +5,21 @@
 @Site    : itlubber.art
 """
 
+import importlib
+
 __author__ = "itlubber"
 __site__ = "https://itlubber.art"
 __version__ = "0.1.0"
+
+# 子模块在第一次访问时才导入，import mltoolbox 不会加载 pandas 、 matplotlib 等依赖
+_submodules = ["cv", "eda", "explainer", "mertics", "models", "optimizer", "sampler", "selector", "transformer", "utils"]
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules))
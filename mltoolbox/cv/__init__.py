@@ -4,3 +4,30 @@
 @Author  : itlubber
 @Site    : itlubber.art
 """
+
+import importlib
+
+_submodules = ["engine", "splitter"]
+_exports = {
+    "CrossValidator": "engine",
+    "CVResult": "engine",
+    "cross_validate": "engine",
+    "make_folds": "engine",
+    "KFoldSplit": "splitter",
+    "StratifiedSplit": "splitter",
+    "GroupSplit": "splitter",
+    "OutOfTimeSplit": "splitter",
+    "RollingSplit": "splitter",
+}
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _exports:
+        return getattr(importlib.import_module(f"{__name__}.{_exports[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | set(_exports))
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 05:30
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import os
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import roc_auc_score, roc_curve
+from sklearn.utils.multiclass import type_of_target
+
+from ..utils.reader import load_artifact
+from ..utils.writer import save_artifact, write_atomic
+from ..utils.setter import task_seed
+from .splitter import KFoldSplit, StratifiedSplit, index_dtype
+
+
+def ks_score(y_true, y_pred):
+    fpr, tpr, _ = roc_curve(y_true, y_pred)
+    return float(np.max(tpr - fpr))
+
+
+def take(data, index):
+    if data is None:
+        return None
+    return data.iloc[index] if hasattr(data, "iloc") else data[index]
+
+
+def ref_path(store, name):
+    """
+    预处理缓存的索引文件，记录 (数据, 折, 预处理器) 对应的 artifact 哈希值
+    """
+    return os.path.join(store, "refs", name[:2], name)
+
+
+def read_ref(store, name):
+    path = ref_path(store, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return f.read().strip()
+
+
+def compact(index, dtype):
+    return index if isinstance(index, slice) else np.asarray(index, dtype=dtype)
+
+
+def make_folds(cv, X, y, groups=None, seed=None):
+    """
+    逐折生成交叉验证的训练集和验证集下标，下标使用 int32 保存，slice 保持不变
+
+    :param cv: 折数、splitter (参考 mltoolbox.cv.splitter ，也可以是 sklearn 的 splitter) 或者 [(训练集下标, 验证集下标), ...] ，
+               传入折数时分类目标使用 StratifiedSplit ，其余使用 KFoldSplit ，均打乱顺序
+    :param X: 特征
+    :param y: 目标
+    :param groups: 分组，透传至 splitter.split
+    :param seed: 主种子，打乱顺序的随机种子为 task_seed(seed, "cv")
+    :return: 生成 (训练集下标, 验证集下标) 的生成器
+    """
+    if isinstance(cv, (int, np.integer)):
+        random_state = None if seed is None else task_seed(seed, "cv")
+        if type_of_target(y) in ("binary", "multiclass"):
+            cv = StratifiedSplit(int(cv), shuffle=True, random_state=random_state)
+        else:
+            cv = KFoldSplit(int(cv), shuffle=True, random_state=random_state)
+
+    dtype = index_dtype(len(y))
+    for train, valid in (cv.split(X, y, groups) if hasattr(cv, "split") else cv):
+        yield compact(train, dtype), compact(valid, dtype)
+
+
+def predict(estimator, X, method):
+    pred = getattr(estimator, method)(X)
+    if method == "predict_proba" and pred.ndim == 2 and pred.shape[1] == 2:
+        return pred[:, 1]
+    return pred
+
+
+def fold_data(store, data_key, fold_key, preprocessor=None, preprocessor_hash=None):
+    """
+    加载一折的训练集和验证集，传入 preprocessor 时在训练集上拟合并转换两者，结果保存在 store 中，相同的数据、折和预处理器直接复用；
+    以 slice 划分的折直接使用数据的视图
+
+    :return: (X_train, y_train, w_train, X_valid, y_valid, 是否命中缓存, 预处理耗时)
+    """
+    start = time.perf_counter()
+    data = load_artifact(data_key, store, cache=False)
+    train, valid = load_artifact(fold_key, store, cache=False)
+    X, y, w = data["X"], data["y"], data["sample_weight"]
+    y_train, w_train, y_valid = y[train], take(w, train), y[valid]
+
+    if preprocessor is None:
+        return take(X, train), y_train, w_train, take(X, valid), y_valid, False, time.perf_counter() - start
+
+    name = joblib.hash((data_key, fold_key, preprocessor_hash))
+    key = read_ref(store, name)
+    if key is not None:
+        cached = load_artifact(key, store, cache=False)
+        return cached["X_train"], y_train, w_train, cached["X_valid"], y_valid, True, time.perf_counter() - start
+
+    X_train = take(X, train)
+    fitted = clone(preprocessor).fit(X_train, y_train)
+    result = {"X_train": fitted.transform(X_train), "X_valid": fitted.transform(take(X, valid))}
+    key = save_artifact(result, store, compress=0)
+    write_atomic(ref_path(store, name), key.encode())
+
+    return result["X_train"], y_train, w_train, result["X_valid"], y_valid, False, time.perf_counter() - start
+
+
+def fit_fold(store, data_key, fold_key, fold, estimator, preprocessor=None, preprocessor_hash=None, fit_params=None, method="predict", metrics=None, seed=None, return_estimator=False):
+    """
+    在工作进程中训练并评估一折，只通过 store 和哈希值传递数据，特征矩阵以内存映射打开，不随任务序列化
+    """
+    X_train, y_train, w_train, X_valid, y_valid, cached, preprocess_time = fold_data(store, data_key, fold_key, preprocessor, preprocessor_hash)
+
+    estimator = clone(estimator)
+    if seed is not None and "random_state" in estimator.get_params():
+        estimator.set_params(random_state=task_seed(seed, "cv", fold))
+
+    fit_params = dict(fit_params or {})
+    if w_train is not None:
+        fit_params["sample_weight"] = w_train
+
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train, **fit_params)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pred = predict(estimator, X_valid, method)
+    predict_time = time.perf_counter() - start
+
+    score = {"fold": fold, "train_size": len(y_train), "valid_size": len(y_valid), "cached": cached, "preprocess_time": preprocess_time, "fit_time": fit_time, "predict_time": predict_time}
+    for name, metric in (metrics or {}).items():
+        score[name] = metric(y_valid, pred)
+
+    return np.asarray(pred), score, estimator if return_estimator else None
+
+
+class CVResult:
+    """
+    交叉验证的结果
+
+    oof 为每个样本在验证集上的预测，没有进入过验证集的样本为 nan ，多次进入验证集时取平均 (类别标签不取平均，参考 CrossValidator.out_of_fold)；scores 为每折的样本数、耗时和评估指标；
+    estimators 为每折训练好的模型，只在 return_estimator=True 时保存
+    """
+
+    def __init__(self, oof, scores, estimators=None):
+        self.oof = oof
+        self.scores = scores
+        self.estimators = estimators
+
+    @property
+    def summary(self):
+        """
+        评估指标和耗时在各折上的均值和标准差
+        """
+        columns = [c for c in self.scores.columns if c not in ("fold", "cached")]
+        return self.scores[columns].agg(["mean", "std"]).T
+
+    def __repr__(self):
+        return f"CVResult(folds={len(self.scores)})\n{self.summary}"
+
+
+class CrossValidator:
+    """
+    在进程池中并行训练各折的交叉验证
+
+    >>> with CrossValidator(X, y, cv=5, seed=42) as validator:
+    ...     lr = validator.evaluate(LogisticRegression(), preprocessor=StandardScaler())
+    ...     svm = validator.evaluate(SVC(probability=True), preprocessor=StandardScaler())  # 复用每折拟合好的 StandardScaler 的转换结果
+    >>> lr.oof, lr.scores
+
+    特征矩阵、目标和各折下标在初始化时一次性写入 cache_dir (artifact 仓库，参考 save_artifact)，各折逐个生成并写入，不会同时保存在内存中，工作进程按哈希值以只读内存映射打开，
+    多个进程共享操作系统的页缓存，不会为每折序列化一份特征矩阵；每折的预处理结果按照 (数据, 折, 预处理器参数) 缓存在同一目录中，
+    传入相同的 cache_dir 时跨进程、跨会话复用
+    """
+
+    def __init__(self, X, y, cv=5, groups=None, sample_weight=None, n_jobs=-1, backend=None, cache_dir=None, seed=None, mmap_threshold=1024 ** 2):
+        """
+        :param X: 特征，pd.DataFrame 或 np.ndarray
+        :param y: 目标
+        :param cv: 折数、sklearn 的 splitter 或者 [(训练集下标, 验证集下标), ...] ，参考 make_folds
+        :param groups: 分组，透传至 splitter.split
+        :param sample_weight: 样本权重，按折切分后以 sample_weight 传给模型的 fit
+        :param n_jobs: 并行的进程数，默认 -1 ，即使用全部 CPU ，为 1 时在当前进程中串行执行
+        :param backend: joblib 的并行后端，默认 None ，即 loky 进程池
+        :param cache_dir: 保存数据和预处理缓存的目录，默认 None ，使用临时目录并在 close 时删除
+        :param seed: 主种子，用于打乱各折以及设置每折模型的 random_state (task_seed(seed, "cv", fold))
+        :param mmap_threshold: 以内存映射共享的数组的最小字节数，默认 1MiB
+        """
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.seed = seed
+        self.temporary = cache_dir is None
+        self.store = tempfile.mkdtemp(prefix="mltoolbox-cv-") if cache_dir is None else cache_dir
+
+        y = np.asarray(y)
+        sample_weight = None if sample_weight is None else np.asarray(sample_weight)
+        self.size = len(y)
+        self.target_type = type_of_target(y)
+        self.data_key = save_artifact({"X": X, "y": y, "sample_weight": sample_weight}, self.store, compress=0, mmap_threshold=mmap_threshold)
+        self.fold_keys = [save_artifact(fold, self.store, compress=0, mmap_threshold=mmap_threshold) for fold in make_folds(cv, X, y, groups=groups, seed=seed)]
+
+    @property
+    def folds(self):
+        """
+        各折的 (训练集下标, 验证集下标)，以内存映射加载
+        """
+        return [load_artifact(key, self.store, cache=False) for key in self.fold_keys]
+
+    def default_metrics(self, estimator, method):
+        if is_classifier(estimator) and method == "predict_proba" and self.target_type == "binary":
+            return {"auc": roc_auc_score, "ks": ks_score}
+        return {}
+
+    def evaluate(self, estimator, preprocessor=None, method=None, metrics=None, fit_params=None, return_estimator=False):
+        """
+        交叉验证一个模型
+
+        :param estimator: 未训练的 sklearn 风格模型，每折 clone 一份
+        :param preprocessor: 每折在训练集上拟合的 sklearn 转换器，默认 None
+        :param method: 预测方法，默认 None ，模型有 predict_proba 时使用 predict_proba (二分类只保留正类概率)，否则使用 predict
+        :param metrics: 评估指标 {名称: func(y_true, y_pred)}，默认 None ，二分类概率预测时计算 auc 和 ks
+        :param fit_params: 透传至模型 fit 的参数
+        :param return_estimator: 是否返回每折训练好的模型，默认 False
+        :return: CVResult
+        """
+        method = method or ("predict_proba" if hasattr(estimator, "predict_proba") else "predict")
+        metrics = self.default_metrics(estimator, method) if metrics is None else metrics
+        preprocessor_hash = None if preprocessor is None else joblib.hash(clone(preprocessor))
+        params = dict(store=self.store, data_key=self.data_key, estimator=estimator, preprocessor=preprocessor, preprocessor_hash=preprocessor_hash,
+                      fit_params=fit_params, method=method, metrics=metrics, seed=self.seed, return_estimator=return_estimator)
+
+        if self.n_jobs == 1 or len(self.fold_keys) == 1:
+            results = [fit_fold(fold_key=key, fold=fold, **params) for fold, key in enumerate(self.fold_keys)]
+        else:
+            results = Parallel(n_jobs=self.n_jobs, backend=self.backend)(delayed(fit_fold)(fold_key=key, fold=fold, **params) for fold, key in enumerate(self.fold_keys))
+
+        oof = self.out_of_fold([pred for pred, _, _ in results], labels=method == "predict" and is_classifier(estimator))
+
+        scores = pd.DataFrame([score for _, score, _ in results])
+        estimators = [estimator for _, _, estimator in results] if return_estimator else None
+        return CVResult(oof, scores, estimators)
+
+    def out_of_fold(self, preds, labels=False):
+        """
+        汇总各折验证集上的预测
+
+        数值预测在多次进入验证集的样本上取平均，没有进入过验证集的样本为 nan ；类别标签 (分类模型的 predict 或者非数值的预测) 不能取平均，
+        各折的验证集需要互不重叠，没有进入过验证集的样本为 None
+
+        :param preds: 各折的预测，顺序与 fold_keys 一致
+        :param labels: 是否为类别标签
+        :return: np.ndarray
+        """
+        first = preds[0]
+        labels = labels or first.dtype.kind not in "fc"
+        counts = np.zeros(self.size, dtype=np.int32)
+        if labels:
+            oof = np.empty((self.size,) + first.shape[1:], dtype=np.result_type(*preds))
+        else:
+            oof = np.zeros((self.size,) + first.shape[1:], dtype=np.float64)
+
+        for key, pred in zip(self.fold_keys, preds):
+            _, valid = load_artifact(key, self.store, cache=False)
+            if labels:
+                oof[valid] = pred
+            else:
+                oof[valid] += pred
+            counts[valid] += 1
+
+        if labels:
+            if (counts > 1).any():
+                raise ValueError("类别标签的预测不能取平均，各折的验证集需要互不重叠，或者使用 method=\"predict_proba\"")
+            if (counts == 0).any():
+                oof = oof.astype(object)
+                oof[counts == 0] = None
+            return oof
+
+        with np.errstate(invalid="ignore"):
+            return oof / counts.reshape((-1,) + (1,) * (oof.ndim - 1))
+
+    def close(self):
+        """
+        删除临时目录，传入 cache_dir 时保留缓存
+        """
+        if getattr(self, "temporary", False) and os.path.exists(self.store):
+            shutil.rmtree(self.store, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def cross_validate(estimator, X, y, cv=5, preprocessor=None, method=None, metrics=None, fit_params=None, return_estimator=False, **kwargs):
+    """
+    并行交叉验证一个模型，需要在多个模型之间复用数据和预处理结果时使用 CrossValidator
+
+    :param estimator: 未训练的 sklearn 风格模型
+    :param X: 特征
+    :param y: 目标
+    :param cv: 折数、sklearn 的 splitter 或者 [(训练集下标, 验证集下标), ...]
+    :param kwargs: 透传至 CrossValidator 的参数，例如 n_jobs 、 seed 、 cache_dir
+    :return: CVResult
+    """
+    with CrossValidator(X, y, cv=cv, **kwargs) as validator:
+        return validator.evaluate(estimator, preprocessor=preprocessor, method=method, metrics=metrics, fit_params=fit_params, return_estimator=return_estimator)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 06:30
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+# 按块生成下标时每块的行数，临时数组的大小与数据量无关
+CHUNK_SIZE = 1 << 16
+
+
+def num_rows(X):
+    return X.shape[0] if hasattr(X, "shape") else len(X)
+
+
+def index_dtype(n):
+    return np.dtype(np.int32) if n <= np.iinfo(np.int32).max else np.dtype(np.int64)
+
+
+def fold_indices(fold_id, fold, dtype=None, chunk_size=CHUNK_SIZE):
+    """
+    根据每行所属的折生成训练集和验证集下标，按块计算，除结果外只需要 chunk_size 大小的临时数组
+
+    :param fold_id: 每行所属的折，int8 或 int16
+    :param fold: 作为验证集的折
+    :param dtype: 下标的数据类型，默认 None ，行数不超过 int32 上限时使用 int32
+    :return: (训练集下标, 验证集下标)
+    """
+    n = len(fold_id)
+    dtype = dtype or index_dtype(n)
+    valid_size = sum(int(np.count_nonzero(fold_id[start:start + chunk_size] == fold)) for start in range(0, n, chunk_size))
+    train, valid = np.empty(n - valid_size, dtype=dtype), np.empty(valid_size, dtype=dtype)
+
+    t = v = 0
+    for start in range(0, n, chunk_size):
+        block = fold_id[start:start + chunk_size] == fold
+        index = np.flatnonzero(block)
+        np.add(index, start, out=valid[v:v + len(index)], casting="unsafe")
+        v += len(index)
+        index = np.flatnonzero(~block)
+        np.add(index, start, out=train[t:t + len(index)], casting="unsafe")
+        t += len(index)
+
+    return train, valid
+
+
+def balanced_labels(n, n_splits, offset=0):
+    """
+    长度为 n 的折编号，每折的行数最多相差 1 ，多出的行从第 offset 折开始分配
+    """
+    dtype = np.int8 if n_splits <= np.iinfo(np.int8).max else np.int16
+    sizes = np.full(n_splits, n // n_splits)
+    sizes[(np.arange(n % n_splits) + offset) % n_splits] += 1
+    return np.repeat(np.arange(n_splits, dtype=dtype), sizes)
+
+
+def as_slice(start, stop, n, slices=True):
+    return slice(start, stop) if slices else np.arange(start, stop, dtype=index_dtype(n))
+
+
+class AssignedSplit:
+    """
+    先为每一行分配所属的折 (每行 1 字节)，再逐折生成 int32 下标，同一时间只保存当前折的下标
+
+    与 sklearn 的 splitter 接口一致，可以直接传给 CrossValidator 或 sklearn 的 cross_validate
+    """
+
+    def __init__(self, n_splits=5, shuffle=False, random_state=None):
+        """
+        :param n_splits: 折数
+        :param shuffle: 是否打乱顺序，默认 False
+        :param random_state: 打乱顺序的随机种子
+        """
+        if n_splits < 2:
+            raise ValueError("n_splits 至少为 2")
+        self.n_splits = n_splits
+        self.shuffle = shuffle
+        self.random_state = random_state
+
+    def assign(self, X, y=None, groups=None):
+        raise NotImplementedError
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def split(self, X, y=None, groups=None):
+        fold_id = self.assign(X, y, groups)
+        for fold in range(self.n_splits):
+            yield fold_indices(fold_id, fold)
+
+
+class KFoldSplit(AssignedSplit):
+    """
+    K 折划分，不打乱顺序时每折的验证集为连续的行
+    """
+
+    def assign(self, X, y=None, groups=None):
+        labels = balanced_labels(num_rows(X), self.n_splits)
+        if self.shuffle:
+            np.random.default_rng(self.random_state).shuffle(labels)
+        return labels
+
+
+class StratifiedSplit(AssignedSplit):
+    """
+    分层 K 折划分，每折中各类别的比例与整体一致，每个类别内部按照行的顺序 (或打乱后的顺序) 分配到各折
+    """
+
+    def assign(self, X, y=None, groups=None):
+        if y is None:
+            raise ValueError("StratifiedSplit 需要传入 y")
+
+        y = np.asarray(y)
+        values = np.sort(pd.unique(y))
+        counts = {value: int(np.count_nonzero(y == value)) for value in values}
+        # 与 sklearn 的 StratifiedKFold 一致，只有全部类别的样本数都少于折数时报错，部分类别少于折数时分配到能够覆盖的折中
+        if all(count < self.n_splits for count in counts.values()):
+            raise ValueError(f"全部类别的样本数都少于折数 {self.n_splits}")
+        rare = {value: count for value, count in counts.items() if count < self.n_splits}
+        if rare:
+            warnings.warn(f"类别 {list(rare)} 的样本数 {list(rare.values())} 少于折数 {self.n_splits} ，部分折的验证集中没有这些类别")
+
+        rng = np.random.default_rng(self.random_state)
+        fold_id = np.empty(len(y), dtype=balanced_labels(0, self.n_splits).dtype)
+        offset = 0
+        for value in values:
+            mask = y == value
+            count = counts[value]
+            labels = balanced_labels(count, self.n_splits, offset)
+            if self.shuffle:
+                rng.shuffle(labels)
+            fold_id[mask] = labels
+            offset = (offset + count) % self.n_splits
+
+        return fold_id
+
+
+class GroupSplit(AssignedSplit):
+    """
+    分组 K 折划分，同一组的样本只出现在同一折中，例如同一客户的多笔申请
+
+    各组按照样本数从大到小 (shuffle=True 时按随机顺序) 蛇形分配到各折，使各折样本数尽量接近
+    """
+
+    def assign(self, X, y=None, groups=None):
+        if groups is None:
+            raise ValueError("GroupSplit 需要传入 groups")
+
+        codes, uniques = pd.factorize(np.asarray(groups))
+        if len(uniques) < self.n_splits:
+            raise ValueError(f"分组数 {len(uniques)} 少于折数 {self.n_splits}")
+
+        if self.shuffle:
+            order = np.random.default_rng(self.random_state).permutation(len(uniques))
+        else:
+            order = np.argsort(-np.bincount(codes, minlength=len(uniques)), kind="stable")
+
+        snake = np.concatenate([np.arange(self.n_splits), np.arange(self.n_splits)[::-1]])
+        group_fold = np.empty(len(uniques), dtype=balanced_labels(0, self.n_splits).dtype)
+        group_fold[order] = snake[np.arange(len(uniques)) % len(snake)]
+
+        return group_fold[codes]
+
+
+class OrderedSplit:
+    """
+    按时间顺序划分，数据需要已经按时间升序排列，训练集和验证集为连续的行，以 slice 返回，DataFrame.iloc 和 numpy 切片得到的是视图，不复制数据
+    """
+
+    def __init__(self, gap=0, time=None, slices=True):
+        """
+        :param gap: 训练集结束与验证集开始之间间隔的行数，传入 time 时为时间间隔，例如 pd.Timedelta("30D")
+        :param time: 时间列名或时间数组，默认 None ，按照行号划分
+        :param slices: 是否返回 slice ，默认 True ，为 False 时返回 int32 下标，用于不支持 slice 的场景
+        """
+        self.gap = gap
+        self.time = time
+        self.slices = slices
+
+    def times(self, X):
+        if self.time is None:
+            return None
+
+        times = X[self.time] if isinstance(self.time, str) else self.time
+        times = pd.Series(times) if not isinstance(times, pd.Series) else times
+        for start in range(0, len(times), CHUNK_SIZE):
+            block = times.iloc[start:start + CHUNK_SIZE + 1].to_numpy()
+            if np.any(block[1:] < block[:-1]):
+                raise ValueError("数据需要按照时间升序排列")
+
+        return times
+
+    def position(self, times, value, n):
+        """
+        时间点对应的行号，未传入 time 时 value 为行号或 (0, 1) 之间的比例
+        """
+        if times is None:
+            return int(n * value) if isinstance(value, float) and 0 < value < 1 else int(value)
+        return int(times.searchsorted(value))
+
+    def windows(self, X):
+        """
+        生成每次划分的 (训练集起点, 训练集终点, 验证集起点, 验证集终点) 行号
+        """
+        raise NotImplementedError
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return sum(1 for _ in self.split(X))
+
+    def split(self, X, y=None, groups=None):
+        n = num_rows(X)
+        for bounds in self.windows(X):
+            train_start, train_stop, valid_start, valid_stop = (min(max(int(b), 0), n) for b in bounds)
+            if train_start < train_stop and valid_start < valid_stop:
+                yield as_slice(train_start, train_stop, n, self.slices), as_slice(valid_start, valid_stop, n, self.slices)
+
+
+class OutOfTimeSplit(OrderedSplit):
+    """
+    跨时间验证，每个时间切分点之前的全部数据为训练集，切分点到下一个切分点 (最后一个切分点到数据末尾) 为验证集
+
+    >>> OutOfTimeSplit("2023-07-01", time="apply_date")                  # 一次跨时间验证
+    >>> OutOfTimeSplit(["2023-04-01", "2023-07-01", "2023-10-01"], time="apply_date", gap=pd.Timedelta("30D"))
+    >>> OutOfTimeSplit(0.8)                                              # 按行号取最后 20% 为验证集
+    """
+
+    def __init__(self, cutoffs, gap=0, time=None, slices=True):
+        """
+        :param cutoffs: 一个或多个切分点，传入 time 时为时间，否则为行号或 (0, 1) 之间的比例
+        """
+        super().__init__(gap=gap, time=time, slices=slices)
+        self.cutoffs = list(cutoffs) if isinstance(cutoffs, (list, tuple, np.ndarray, pd.Index)) else [cutoffs]
+
+    def windows(self, X):
+        n, times = num_rows(X), self.times(X)
+        cutoffs = [self.position(times, cutoff, n) for cutoff in self.cutoffs]
+
+        for i, (value, cutoff) in enumerate(zip(self.cutoffs, cutoffs)):
+            if times is None:
+                start = cutoff + int(self.gap)
+            elif times.dtype.kind == "M":
+                start = self.position(times, pd.Timestamp(value) + pd.Timedelta(self.gap), n)
+            else:
+                start = self.position(times, value + self.gap, n)
+            yield 0, cutoff, start, cutoffs[i + 1] if i + 1 < len(cutoffs) else n
+
+
+class RollingSplit(OrderedSplit):
+    """
+    滚动窗口验证，训练窗口和验证窗口每次向后移动 step ，expanding=True 时训练窗口的起点固定为数据开头
+
+    >>> RollingSplit(train_size=100000, valid_size=20000)                                        # 按行数滚动
+    >>> RollingSplit(train_size="180D", valid_size="30D", step="30D", time="apply_date")         # 按时间滚动
+
+    最后一个验证窗口可能不完整
+    """
+
+    def __init__(self, train_size, valid_size, step=None, gap=0, expanding=False, time=None, slices=True):
+        """
+        :param train_size: 训练窗口的长度，传入 time 时为时间长度，可以是 pd.Timedelta 或 "30D" 之类的字符串
+        :param valid_size: 验证窗口的长度
+        :param step: 每次移动的长度，默认 None ，等于 valid_size
+        :param expanding: 训练窗口是否从数据开头开始扩展，默认 False
+        """
+        super().__init__(gap=gap, time=time, slices=slices)
+        self.train_size = train_size
+        self.valid_size = valid_size
+        self.step = valid_size if step is None else step
+        self.expanding = expanding
+
+    def windows(self, X):
+        n, times = num_rows(X), self.times(X)
+
+        if times is None:
+            origin, last, convert = 0, n - 1, int
+        else:
+            convert = pd.Timedelta if times.dtype.kind == "M" else (lambda v: v)
+            origin, last = times.iloc[0], times.iloc[-1]
+
+        train_size, valid_size, step, gap = convert(self.train_size), convert(self.valid_size), convert(self.step), convert(self.gap)
+        start = origin
+        while start + train_size + gap <= last:
+            train_stop = start + train_size
+            bounds = [origin if self.expanding else start, train_stop, train_stop + gap, train_stop + gap + valid_size]
+            if times is not None:
+                bounds = [int(times.searchsorted(b)) for b in bounds]
+            yield tuple(bounds)
+            start = start + step
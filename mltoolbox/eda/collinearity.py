@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 08:20
+@Author  : itlubber
+@Site    : itlubber.art
+
+宽表的相关系数和方差膨胀因子，按列分块计算，每块的充分统计量按行分块流式累加，默认只返回相关系数绝对值超过阈值的变量对
+
+>>> collinearity = Collinearity(data, float32=True, n_jobs=4)
+>>> collinearity.pairs(threshold=0.8)
+>>> collinearity.vif()
+>>> Collinearity(DatasetReader("data.csv", chunk_size=100000), float32=True).pairs(threshold=0.8)
+"""
+
+import math
+import warnings
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+
+class Collinearity:
+    """
+    按列分块、按行分块累加充分统计量计算 Pearson / Spearman 相关系数
+
+    输入可以是 pd.DataFrame 、二维数组，也可以是逐块产生 pd.DataFrame 的可迭代对象 (例如 DatasetReader)，数据只遍历一次，
+    每块数据按列平移、缩放 (使用该列第一次出现有效值时所在块的均值和标准差，避免大数值的列在累加平方和时损失精度) 后，
+    对每个列块对累加交叉乘积，只保留一个块大小的临时副本，不复制整张表；充分统计量按列块的上三角保存，大小为 p × p / 2
+
+    存在缺失值的列块对按照 pd.DataFrame.corr 的方式只使用两列同时不缺失的行，此时额外累加两列同时不缺失的样本数、和、平方和，
+    仍然全部通过矩阵乘法计算；同一块中不同列块对的计算在线程池中并行，numpy 的矩阵乘法计算时释放 GIL
+
+    Spearman 需要对每列整体排序，只支持 pd.DataFrame 或二维数组，排序结果整体保存在内存中
+    """
+
+    def __init__(self, data, method="pearson", block_size=512, chunk_size=16384, float32=False, n_jobs=1):
+        """
+        :param data: pd.DataFrame 、二维数组或者逐块产生 pd.DataFrame 的可迭代对象，只使用数值列，分块输入时以第一块的列为准
+        :param method: 相关系数，可选 pearson、spearman ，默认 pearson ；spearman 对每列整体排序，存在缺失值时与 pd.DataFrame.corr 逐对排序的结果略有不同
+        :param block_size: 每块的列数，默认 512
+        :param chunk_size: pd.DataFrame 或二维数组每次累加的行数，默认 16384 ，分块输入时按输入的块累加
+        :param float32: 是否使用 float32 计算，默认 False ，开启时临时副本减半、矩阵乘法更快，相关系数的误差约为 1e-6 量级
+        :param n_jobs: 并行的线程数，默认 1
+        """
+        if method not in ("pearson", "spearman"):
+            raise ValueError("method 可选 pearson、spearman")
+
+        self.method = method
+        self.block_size = block_size
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.dtype = np.dtype(np.float32 if float32 else np.float64)
+        self._matrix = None
+
+        if isinstance(data, np.ndarray):
+            data = pd.DataFrame(data)
+        if isinstance(data, pd.DataFrame):
+            frame = data.select_dtypes(include=["number", "bool"])
+            if method == "spearman":
+                frame = frame.rank()
+            chunks = (frame.iloc[start:start + chunk_size] for start in range(0, max(len(frame), 1), chunk_size))
+        elif method == "spearman":
+            raise ValueError("spearman 需要对每列整体排序，不支持分块输入")
+        else:
+            chunks = iter(data)
+
+        first = next(chunks)
+        first = first if isinstance(first, pd.DataFrame) else pd.DataFrame(first)
+        self.columns = first.select_dtypes(include=["number", "bool"]).columns
+        p = len(self.columns)
+        self.blocks = [slice(start, min(start + block_size, p)) for start in range(0, p, block_size)]
+
+        # 每列的平移量、缩放量、有效样本数、和、平方和、最小值、最大值
+        self.shift, self.scale = np.full(p, np.nan), np.ones(p)
+        self.count, self.sums, self.squares = np.zeros(p), np.zeros(p), np.zeros(p)
+        self.low, self.high = np.full(p, np.inf), np.full(p, -np.inf)
+        self.rows = 0
+        # 每个列块对的交叉乘积，以及出现缺失值之后的逐对统计量 (样本数、和、平方和)
+        self.cross = {tile: np.zeros((self.blocks[tile[0]].stop - self.blocks[tile[0]].start, self.blocks[tile[1]].stop - self.blocks[tile[1]].start)) for tile in self.tiles()}
+        self.pairwise = dict.fromkeys(self.tiles())
+        # 出现缺失值之后额外累加不存在缺失值的样本 (完整样本) 的统计量，用于计算 VIF ，{列块对: 交叉乘积}
+        self.complete = None
+
+        with Parallel(n_jobs=self.n_jobs, prefer="threads") as parallel:
+            for chunk in chain([first], chunks):
+                self.update(chunk if isinstance(chunk, pd.DataFrame) else pd.DataFrame(chunk), parallel)
+
+        self.constant = ~(self.high > self.low)
+        self.missing = self.count < self.rows
+
+    def tiles(self):
+        return [(i, j) for i in range(len(self.blocks)) for j in range(i, len(self.blocks))]
+
+    def update(self, chunk, parallel):
+        """
+        累加一块数据的充分统计量
+
+        :param chunk: pd.DataFrame ，需要包含第一块中的全部数值列
+        :param parallel: joblib.Parallel ，并行计算不同的列块对
+        """
+        values = chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(values) == 0:
+            return
+
+        mask = ~np.isnan(values)
+        if self.complete is None and not mask.all():
+            # 之前的块中不存在缺失值，完整样本的统计量等于全部样本的统计量
+            self.complete = {tile: cross.copy() for tile, cross in self.cross.items()}
+            self.complete_rows, self.complete_sums, self.complete_squares = self.rows, self.sums.copy(), self.squares.copy()
+            self.complete_low, self.complete_high = self.low.copy(), self.high.copy()
+
+        if self.complete is not None:
+            rows = mask.all(axis=1)
+            self.complete_low = np.minimum(self.complete_low, values[rows].min(axis=0, initial=np.inf))
+            self.complete_high = np.maximum(self.complete_high, values[rows].max(axis=0, initial=-np.inf))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # 第一次出现有效值的列确定平移量和缩放量，之前的块在该列上没有有效值，不受影响
+            start = np.isnan(self.shift) & mask.any(axis=0)
+            if start.any():
+                self.shift[start] = np.nanmean(values[:, start], axis=0)
+                std = np.nanstd(values[:, start], axis=0)
+                self.scale[start] = np.where(std > 0, std, 1.)
+            self.low = np.minimum(self.low, np.where(mask, values, np.inf).min(axis=0))
+            self.high = np.maximum(self.high, np.where(mask, values, -np.inf).max(axis=0))
+
+        values -= np.nan_to_num(self.shift)
+        values /= self.scale
+        values = np.asfortranarray(values, dtype=self.dtype)
+        complete = mask.all(axis=0)
+        zeros = values if complete.all() else np.asfortranarray(np.where(mask, values, 0))
+        sums = zeros.sum(axis=0, dtype=np.float64)
+        squares = (zeros * zeros).sum(axis=0, dtype=np.float64)
+
+        full = None
+        if self.complete is not None:
+            full = values if rows.all() else np.asfortranarray(values[rows])
+            self.complete_rows += len(full)
+            self.complete_sums += full.sum(axis=0, dtype=np.float64)
+            self.complete_squares += (full * full).sum(axis=0, dtype=np.float64)
+
+        tasks = [(tile, values, zeros, mask, complete, sums, squares, full) for tile in self.tiles()]
+        if self.n_jobs == 1 or len(tasks) == 1:
+            for task in tasks:
+                self.update_tile(*task)
+        else:
+            parallel(delayed(self.update_tile)(*task) for task in tasks)
+
+        self.count += mask.sum(axis=0)
+        self.sums += sums
+        self.squares += squares
+        self.rows += len(values)
+
+    def update_tile(self, tile, values, zeros, mask, complete, sums, squares, full=None):
+        a, b = self.blocks[tile[0]], self.blocks[tile[1]]
+        if full is not None:
+            product = full[:, a].T @ full[:, b]
+            self.complete[tile] += product
+
+        if complete[a].all() and complete[b].all():
+            self.cross[tile] += product if full is values else values[:, a].T @ values[:, b]
+            if self.pairwise[tile] is not None:
+                count, sum_a, sum_b, square_a, square_b = self.pairwise[tile]
+                count += len(values)
+                sum_a += sums[a][:, None]
+                sum_b += sums[b][None, :]
+                square_a += squares[a][:, None]
+                square_b += squares[b][None, :]
+            return
+
+        if self.pairwise[tile] is None:
+            # 之前的块在这两个列块上都没有缺失值，逐对统计量等于每列的统计量
+            shape = self.cross[tile].shape
+            self.pairwise[tile] = (np.full(shape, float(self.rows)), np.repeat(self.sums[a][:, None], shape[1], axis=1), np.repeat(self.sums[b][None, :], shape[0], axis=0),
+                                   np.repeat(self.squares[a][:, None], shape[1], axis=1), np.repeat(self.squares[b][None, :], shape[0], axis=0))
+
+        count, sum_a, sum_b, square_a, square_b = self.pairwise[tile]
+        x, y = zeros[:, a], zeros[:, b]
+        mx, my = mask[:, a].astype(self.dtype), mask[:, b].astype(self.dtype)
+        count += mx.T @ my
+        sum_a += x.T @ my
+        sum_b += mx.T @ y
+        square_a += (x * x).T @ my
+        square_b += mx.T @ (y * y)
+        self.cross[tile] += x.T @ y
+
+    def tile(self, i, j):
+        """
+        根据累加的充分统计量计算第 i 个列块和第 j 个列块之间的相关系数
+
+        :return: float64 的相关系数矩阵，常数列或者有效样本数不足的变量对为 nan
+        """
+        a, b = self.blocks[i], self.blocks[j]
+        if self.pairwise[i, j] is None:
+            statistics = self.rows, self.sums[a][:, None], self.sums[b][None, :], self.squares[a][:, None], self.squares[b][None, :]
+        else:
+            statistics = self.pairwise[i, j]
+        return self.correlation(*statistics, self.cross[i, j], self.constant[a], self.constant[b], i == j)
+
+    @staticmethod
+    def correlation(count, sum_a, sum_b, square_a, square_b, cross, constant_a, constant_b, diagonal=False):
+        """
+        根据样本数、和、平方和、交叉乘积计算相关系数，常数列、有效样本数不足或方差不为正的变量对为 nan
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            denominator = (count * square_a - sum_a ** 2) * (count * square_b - sum_b ** 2)
+            corr = (count * cross - sum_a * sum_b) / np.sqrt(denominator)
+        corr = np.where((denominator > 0) & (np.asarray(count) >= 2), corr, np.nan)
+
+        corr[constant_a, :] = np.nan
+        corr[:, constant_b] = np.nan
+        np.clip(corr, -1, 1, out=corr)
+        if diagonal:
+            np.fill_diagonal(corr, np.where(constant_a, np.nan, 1.))
+        return corr
+
+    def tile_pairs(self, i, j, threshold):
+        corr = self.tile(i, j)
+        with np.errstate(invalid="ignore"):
+            selected = np.abs(corr) >= threshold
+        if i == j:
+            selected = np.triu(selected, k=1)
+        rows, cols = np.nonzero(selected)
+        return rows + self.blocks[i].start, cols + self.blocks[j].start, corr[rows, cols]
+
+    def parallel(self, func, *args):
+        tiles = self.tiles()
+        if self.n_jobs == 1 or len(tiles) == 1:
+            return [func(i, j, *args) for i, j in tiles]
+        return Parallel(n_jobs=self.n_jobs, prefer="threads")(delayed(func)(i, j, *args) for i, j in tiles)
+
+    def pairs(self, threshold=0.8):
+        """
+        相关系数绝对值不小于 threshold 的变量对，不生成完整的相关系数矩阵
+
+        :param threshold: 相关系数绝对值的阈值，默认 0.8
+        :return: pd.DataFrame ，包含 feature_a、feature_b、corr ，按相关系数绝对值从大到小排列
+        """
+        if self._matrix is not None:
+            results = [self.tile_pairs_from_matrix(threshold)]
+        else:
+            results = self.parallel(self.tile_pairs, threshold)
+
+        rows = np.concatenate([r for r, _, _ in results]) if results else np.array([], dtype=int)
+        cols = np.concatenate([c for _, c, _ in results]) if results else np.array([], dtype=int)
+        corr = np.concatenate([v for _, _, v in results]) if results else np.array([])
+        order = np.argsort(-np.abs(corr), kind="stable")
+        return pd.DataFrame({"feature_a": self.columns[rows[order]], "feature_b": self.columns[cols[order]], "corr": corr[order]})
+
+    def tile_pairs_from_matrix(self, threshold):
+        with np.errstate(invalid="ignore"):
+            rows, cols = np.nonzero(np.triu(np.abs(self._matrix) >= threshold, k=1))
+        return rows, cols, self._matrix[rows, cols]
+
+    def matrix(self):
+        """
+        完整的相关系数矩阵，p × p 的 float64 ，计算后缓存
+
+        :return: pd.DataFrame
+        """
+        if self._matrix is None:
+            matrix = np.empty((len(self.columns),) * 2)
+            for (i, j), corr in zip(self.tiles(), self.parallel(self.tile)):
+                a, b = self.blocks[i], self.blocks[j]
+                matrix[a, b] = corr
+                matrix[b, a] = corr.T
+            self._matrix = matrix
+        return pd.DataFrame(self._matrix, index=self.columns, columns=self.columns)
+
+    def complete_matrix(self):
+        """
+        只使用完整样本 (全部变量都不缺失的样本) 计算的相关系数矩阵，不存在缺失值时与 matrix 相同；逐对计算的相关系数矩阵可能不是半正定矩阵，VIF 使用该矩阵计算
+
+        :return: pd.DataFrame
+        """
+        if self.complete is None:
+            return self.matrix()
+
+        constant = ~(self.complete_high > self.complete_low)
+        matrix = np.empty((len(self.columns),) * 2)
+        for i, j in self.tiles():
+            a, b = self.blocks[i], self.blocks[j]
+            corr = self.correlation(self.complete_rows, self.complete_sums[a][:, None], self.complete_sums[b][None, :], self.complete_squares[a][:, None], self.complete_squares[b][None, :], self.complete[i, j], constant[a], constant[b], i == j)
+            matrix[a, b] = corr
+            matrix[b, a] = corr.T
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+    def vif(self, tol=1e-10):
+        """
+        方差膨胀因子，VIF_i 等于相关系数矩阵的逆矩阵的第 i 个对角元素，通过一次特征分解得到全部变量的 VIF ，不需要逐个变量做回归
+
+        存在完全共线性时，参与共线性 (在零特征值对应的特征向量上有载荷) 的变量 VIF 为 inf ，常数列为 nan ；
+        存在缺失值时使用 complete_matrix ，与只使用完整样本做回归的结果一致
+
+        :param tol: 特征值小于 tol × 最大特征值时视为零
+        :return: pd.Series ，按照 VIF 从大到小排列
+        """
+        if self.complete is not None:
+            if self.complete_rows < 2:
+                raise ValueError("不存在缺失值的样本少于 2 个，无法计算 VIF")
+            warnings.warn(f"存在缺失值，VIF 只使用 {self.complete_rows} 个完整样本计算")
+
+        matrix = self.complete_matrix().to_numpy()
+        valid = ~np.isnan(np.diag(matrix))
+        result = np.full(len(self.columns), np.nan)
+
+        if valid.any():
+            matrix = matrix[np.ix_(valid, valid)]
+            if np.isnan(matrix).any():
+                raise ValueError("相关系数矩阵中存在 nan ，无法计算 VIF")
+            values, vectors = np.linalg.eigh(matrix)
+            singular = values <= tol * max(values.max(), 1.)
+            inverse = (vectors[:, ~singular] ** 2 / values[~singular]).sum(axis=1)
+            inverse[(np.abs(vectors[:, singular]) > math.sqrt(tol)).any(axis=1)] = np.inf
+            result[valid] = inverse
+
+        return pd.Series(result, index=self.columns, name="vif").sort_values(ascending=False)
+
+
+def correlation_pairs(data, threshold=0.8, method="pearson", **kwargs):
+    """
+    相关系数绝对值不小于 threshold 的变量对
+
+    :param data: pd.DataFrame 或二维数组
+    :param threshold: 相关系数绝对值的阈值，默认 0.8
+    :param method: 相关系数，可选 pearson、spearman
+    :param kwargs: 透传至 Collinearity 的参数，例如 float32、n_jobs、block_size
+    :return: pd.DataFrame ，包含 feature_a、feature_b、corr
+    """
+    return Collinearity(data, method=method, **kwargs).pairs(threshold)
+
+
+def correlation_matrix(data, method="pearson", **kwargs):
+    """
+    分块计算的完整相关系数矩阵
+
+    :return: pd.DataFrame
+    """
+    return Collinearity(data, method=method, **kwargs).matrix()
+
+
+def vif(data, **kwargs):
+    """
+    通过相关系数矩阵的逆计算全部变量的方差膨胀因子
+
+    :return: pd.Series
+    """
+    return Collinearity(data, **kwargs).vif()
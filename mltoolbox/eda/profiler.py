@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 07:30
+@Author  : itlubber
+@Site    : itlubber.art
+
+单次遍历的数据探查，按数据块更新每列可合并的统计量，内存占用与行数无关
+
+>>> profiler = DataProfiler()
+>>> for chunk in read_dataset("data.csv", chunk_size=100000):
+...     profiler.update(chunk)
+>>> profiler.to_frame()
+>>> profiler.to_excel("eda.xlsx")
+
+多进程时每个进程统计一部分数据块，再通过 merge 合并，参考 profile_data
+"""
+
+import math
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+
+from .sketch import Moments, HyperLogLog, QuantileSketch, TopK
+
+
+PERCENTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+COLUMN_NAMES = {
+    "column": "变量名称", "dtype": "数据类型", "kind": "变量类型", "count": "样本数", "missing": "缺失数", "missing_rate": "缺失率", "zeros": "零值数", "zero_rate": "零值率",
+    "distinct": "不同取值数(近似)", "mean": "均值", "std": "标准差", "skew": "偏度", "kurt": "峰度", "min": "最小值", "max": "最大值", "top": "高频取值", "top_rate": "最高频取值占比",
+}
+
+
+def column_kind(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "categorical"
+
+
+class ColumnProfile:
+    """
+    单列的统计量：样本数、缺失数、零值数、Welford 矩、近似不同取值数、分位数草图和高频取值
+
+    数值列 (包括 bool) 统计全部统计量，日期列统计矩 (以纳秒时间戳计算) 、不同取值数和高频取值，其余列统计不同取值数和高频取值
+    """
+
+    def __init__(self, name, dtype, k=10, precision=14, relative_accuracy=0.01):
+        """
+        :param name: 列名
+        :param dtype: 第一个数据块中该列的数据类型
+        :param k: 高频取值的数量
+        :param precision: HyperLogLog 的精度
+        :param relative_accuracy: 分位数的相对误差
+        """
+        self.name = name
+        self.dtype = str(dtype)
+        self.kind = column_kind(dtype)
+        self.count = 0
+        self.missing = 0
+        self.zeros = 0
+        self.moments = Moments() if self.kind != "categorical" else None
+        self.quantiles = QuantileSketch(relative_accuracy) if self.kind == "numeric" else None
+        self.distinct = HyperLogLog(precision)
+        self.top = TopK(k)
+
+    def update(self, series):
+        kind = column_kind(series.dtype)
+        if kind != self.kind:
+            raise ValueError(f"列 {self.name} 在不同数据块中的类型不一致: {self.dtype} 和 {series.dtype} ，可以通过 DatasetReader 统一数据类型")
+
+        self.count += len(series)
+        if kind == "categorical":
+            values = series.dropna()
+            self.missing += len(series) - len(values)
+            values = values.to_numpy(dtype=object)
+            self.distinct.update(values)
+            self.top.update(values)
+            return self
+
+        if kind == "datetime":
+            values = series.dropna()
+            self.missing += len(series) - len(values)
+            values = values.to_numpy(dtype="datetime64[ns]").view(np.int64).astype(np.float64)
+        else:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            mask = np.isnan(values)
+            self.missing += int(mask.sum())
+            # 加 0. 将 -0. 统一为 0. ，否则两者的哈希值不同
+            values = values[~mask] + 0.
+            self.zeros += int(np.count_nonzero(values == 0))
+            self.quantiles.update(values)
+
+        self.moments.update(values)
+        self.distinct.update(values)
+        self.top.update(values)
+        return self
+
+    def merge(self, other):
+        if other.kind != self.kind:
+            raise ValueError(f"列 {self.name} 的类型不一致: {self.dtype} 和 {other.dtype}")
+
+        self.count += other.count
+        self.missing += other.missing
+        self.zeros += other.zeros
+        for name in ("moments", "quantiles", "distinct", "top"):
+            if getattr(self, name) is not None:
+                getattr(self, name).merge(getattr(other, name))
+        return self
+
+    def summary(self, percentiles=PERCENTILES):
+        """
+        :param percentiles: 需要估计的分位数
+        :return: dict
+        """
+        valid = self.count - self.missing
+        result = {
+            "column": self.name, "dtype": self.dtype, "kind": self.kind, "count": self.count, "missing": self.missing, "missing_rate": self.missing / self.count if self.count else math.nan,
+            "zeros": self.zeros, "zero_rate": self.zeros / valid if valid and self.kind == "numeric" else math.nan, "distinct": min(self.distinct.count(), valid),
+        }
+
+        if self.moments is not None and self.moments.n:
+            moments = self.moments
+            if self.kind == "datetime":
+                # 纳秒时间戳的均值受浮点误差影响，保留到秒
+                result.update(mean=pd.Timestamp(int(moments.mean)).round("s"), min=pd.Timestamp(int(moments.min)), max=pd.Timestamp(int(moments.max)))
+            else:
+                result.update(mean=moments.mean, std=moments.std, skew=moments.skew, kurt=moments.kurt, min=moments.min, max=moments.max)
+        if self.quantiles is not None:
+            result.update({f"{q:.0%}": value for q, value in zip(percentiles, self.quantiles.quantile(percentiles))})
+
+        top = self.top.top()
+        if self.kind == "datetime":
+            top = [(pd.Timestamp(int(value)), count) for value, count in top]
+        result["top"] = ", ".join(f"{value}({count})" for value, count in top)
+        result["top_rate"] = top[0][1] / valid if top else math.nan
+        return result
+
+
+class DataProfiler:
+    """
+    逐块更新的数据探查，一次遍历得到每列的描述统计、缺失率、零值率、近似不同取值数、近似分位数和高频取值
+    """
+
+    def __init__(self, columns=None, k=10, precision=14, relative_accuracy=0.01):
+        """
+        :param columns: 需要统计的列，默认 None ，统计第一个数据块的全部列
+        :param k: 每列保留的高频取值数量，默认 10
+        :param precision: HyperLogLog 的精度，默认 14 ，不同取值数的相对误差约 0.8% ，每列占用 16KiB
+        :param relative_accuracy: 分位数的相对误差，默认 0.01
+        """
+        self.columns = columns
+        self.k = k
+        self.precision = precision
+        self.relative_accuracy = relative_accuracy
+        self.rows = 0
+        self.profiles = {}
+
+    def update(self, chunk):
+        """
+        :param chunk: pd.DataFrame 数据块
+        :return: self
+        """
+        for column in (self.columns or chunk.columns):
+            if column not in self.profiles:
+                self.profiles[column] = ColumnProfile(column, chunk[column].dtype, k=self.k, precision=self.precision, relative_accuracy=self.relative_accuracy)
+            self.profiles[column].update(chunk[column])
+        self.rows += len(chunk)
+        return self
+
+    def fit(self, data, chunk_size=None):
+        """
+        :param data: pd.DataFrame 或者生成数据块的可迭代对象，例如分块读取的 DatasetReader
+        :param chunk_size: data 为 pd.DataFrame 时每次统计的行数，默认 None ，一次统计全部行；指定时转换数值列的临时数组只占用 chunk_size 行的内存
+        :return: self
+        """
+        for chunk in iter_chunks(data, chunk_size):
+            self.update(chunk)
+        return self
+
+    def merge(self, other):
+        """
+        合并另一个 DataProfiler 的统计结果，两者的参数需要一致
+
+        :return: self
+        """
+        for column, profile in other.profiles.items():
+            if column in self.profiles:
+                self.profiles[column].merge(profile)
+            else:
+                self.profiles[column] = profile
+        self.rows += other.rows
+        return self
+
+    def to_frame(self, percentiles=PERCENTILES):
+        """
+        :param percentiles: 数值列需要估计的分位数
+        :return: pd.DataFrame ，每行一列的统计结果
+        """
+        return pd.DataFrame([profile.summary(percentiles) for profile in self.profiles.values()])
+
+    def to_excel(self, excel_writer, sheet_name="数据探查", title="数据概览", percentiles=PERCENTILES, **kwargs):
+        """
+        将统计结果通过 dataframe2excel 写入报告
+
+        :param excel_writer: excel 文件路径或者 ExcelWriter
+        :param sheet_name: sheet 名称
+        :param title: 标题
+        :param percentiles: 数值列需要估计的分位数
+        :param kwargs: 透传至 dataframe2excel 的参数
+        :return: dataframe2excel 的返回值
+        """
+        from ..utils.writer import dataframe2excel
+
+        frame = self.to_frame(percentiles).rename(columns=COLUMN_NAMES)
+        for column in frame.columns:
+            if frame[column].dtype == object:
+                frame[column] = frame[column].map(lambda v: str(v) if isinstance(v, pd.Timestamp) else v)
+
+        params = dict(percent_cols=["缺失率", "零值率", "最高频取值占比"], condition_cols=["缺失率"], custom_cols=["均值", "标准差", "偏度", "峰度"] + [f"{q:.0%}" for q in percentiles], custom_format="#,##0.0000")
+        params.update(kwargs)
+        return dataframe2excel(frame, excel_writer, sheet_name=sheet_name, title=title, **params)
+
+
+def iter_chunks(data, chunk_size=None):
+    if isinstance(data, pd.DataFrame):
+        if chunk_size is None:
+            yield data
+        else:
+            for start in range(0, len(data), chunk_size):
+                yield data.iloc[start:start + chunk_size]
+    else:
+        yield from data
+
+
+def profile_chunk(chunk, params):
+    return DataProfiler(**params).update(chunk)
+
+
+def profile_data(data, chunk_size=100000, n_jobs=1, backend=None, **kwargs):
+    """
+    分块统计数据，n_jobs 不为 1 时在进程池中分别统计各个数据块，再将每块的统计结果合并，同一时间最多有 2 * n_jobs 个数据块在处理中
+
+    :param data: pd.DataFrame 、数据文件路径 (通过 DatasetReader 分块读取) 或者生成数据块的可迭代对象
+    :param chunk_size: 每块的行数，默认 100000
+    :param n_jobs: 并行的进程数，默认 1
+    :param backend: joblib 的并行后端，默认 None ，即 loky 进程池
+    :param kwargs: 透传至 DataProfiler 的参数
+    :return: DataProfiler
+    """
+    if isinstance(data, str):
+        from ..utils.reader import DatasetReader
+
+        # 不转换数据类型，转换需要先完整扫描一遍数据
+        data = DatasetReader(data, columns=kwargs.get("columns"), chunk_size=chunk_size, downcast=False)
+
+    profiler = DataProfiler(**kwargs)
+    chunks = iter_chunks(data, chunk_size)
+    if n_jobs == 1:
+        return profiler.fit(chunks)
+
+    batch_size = 2 * effective_n_jobs(n_jobs)
+    with Parallel(n_jobs=n_jobs, backend=backend) as parallel:
+        while True:
+            batch = list(islice(chunks, batch_size))
+            if not batch:
+                break
+            for partial in parallel(delayed(profile_chunk)(chunk, kwargs) for chunk in batch):
+                profiler.merge(partial)
+
+    return profiler
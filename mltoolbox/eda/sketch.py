@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 07:10
+@Author  : itlubber
+@Site    : itlubber.art
+
+可合并的单列统计量，按数据块更新，多个进程分别统计的结果可以通过 merge 合并，合并结果与一次统计全部数据一致 (近似统计量的误差界不变)
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class Moments:
+    """
+    样本数、均值、二到四阶中心矩之和以及最小值、最大值，逐块计算后使用 Chan / Pébay 的合并公式累加，是 Welford 在线算法按块向量化的形式，避免大数相减带来的精度损失
+    """
+
+    __slots__ = ("n", "mean", "m2", "m3", "m4", "min", "max")
+
+    def __init__(self, n=0, mean=0., m2=0., m3=0., m4=0., min=math.inf, max=-math.inf):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+        self.min = min
+        self.max = max
+
+    def update(self, values):
+        """
+        :param values: 不包含缺失值的 float64 数组
+        """
+        if len(values) == 0:
+            return self
+
+        mean = float(values.mean())
+        delta = values - mean
+        delta2 = delta * delta
+        return self.merge(Moments(len(values), mean, float(delta2.sum()), float((delta2 * delta).sum()), float((delta2 * delta2).sum()), float(values.min()), float(values.max())))
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return self
+
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+
+        m4 = self.m4 + other.m4 + delta * delta_n ** 3 * na * nb * (na * na - na * nb + nb * nb) + 6 * delta_n ** 2 * (na * na * other.m2 + nb * nb * self.m2) + 4 * delta_n * (na * other.m3 - nb * self.m3)
+        m3 = self.m3 + other.m3 + delta * delta_n ** 2 * na * nb * (na - nb) + 3 * delta_n * (na * other.m2 - nb * self.m2)
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, self.mean + delta_n * nb, m2, m3, m4
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.var) if self.n > 1 else math.nan
+
+    @property
+    def skew(self):
+        """
+        与 pd.Series.skew 一致的无偏偏度
+        """
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return math.nan
+        return n * math.sqrt(n - 1) / (n - 2) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurt(self):
+        """
+        与 pd.Series.kurt 一致的无偏超额峰度
+        """
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return math.nan
+        return n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2) - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+
+
+class HyperLogLog:
+    """
+    HyperLogLog 近似不同取值数量，2 ** precision 个寄存器 (每个 1 字节)，相对误差约为 1.04 / sqrt(2 ** precision)，precision=14 时约 0.8%
+
+    哈希使用 pd.util.hash_array ，在不同进程中结果一致，因此各进程的寄存器可以直接取最大值合并
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision 的取值范围为 4 到 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """
+        :param values: 不包含缺失值的数组，数值需要统一为 float64 ，避免同一个取值在不同数据块中因为类型不同得到不同的哈希值
+        """
+        if len(values) == 0:
+            return self
+
+        hashes = pd.util.hash_array(np.asarray(values))
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        # 剩余位中最高位 1 的位置，frexp 的指数即为二进制位数
+        _, exponent = np.frexp((hashes & np.uint64((1 << bits) - 1)).astype(np.float64))
+        rank = (bits + 1 - exponent).astype(np.uint8)
+        # 寄存器填满后大部分取值不会更新寄存器，先筛选再逐个取最大值，ufunc.at 很慢
+        update = rank > self.registers[index]
+        np.maximum.at(self.registers, index[update], rank[update])
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("precision 不同的 HyperLogLog 不能合并")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1., -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class BucketStore:
+    """
+    连续整数桶的计数，数组从最小的桶开始，新桶超出范围时扩展
+    """
+
+    __slots__ = ("offset", "counts")
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, offset, counts):
+        if not len(counts):
+            return self
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.astype(np.int64)
+            return self
+
+        lower = min(self.offset, offset)
+        upper = max(self.offset + len(self.counts), offset + len(counts))
+        if lower != self.offset or upper != self.offset + len(self.counts):
+            merged = np.zeros(upper - lower, dtype=np.int64)
+            merged[self.offset - lower:self.offset - lower + len(self.counts)] = self.counts
+            self.offset, self.counts = lower, merged
+        self.counts[offset - self.offset:offset - self.offset + len(counts)] += counts
+        return self
+
+    def update(self, keys):
+        if len(keys):
+            lower = int(keys.min())
+            self.add(lower, np.bincount(keys - lower))
+        return self
+
+    def merge(self, other):
+        return self.add(other.offset, other.counts)
+
+
+class QuantileSketch:
+    """
+    相对误差有界的分位数草图 (DDSketch)，按 log(|x|) 等比例分桶计数，任意分位数的估计值与真实值的相对误差不超过 relative_accuracy ，
+    桶的数量只与数据的取值范围有关，合并时对应桶的计数相加
+
+    绝对值小于 min_value 的数 (包括 0) 计入 0 桶
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy 的取值范围为 (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = BucketStore()
+        self.negative = BucketStore()
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def keys(self, values):
+        return np.ceil(np.log(values) / self.log_gamma).astype(np.int64)
+
+    def value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def update(self, values):
+        """
+        :param values: 不包含缺失值的 float64 数组
+        """
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.min, self.max = min(self.min, float(values.min())), max(self.max, float(values.max()))
+        self.positive.update(self.keys(values[values >= self.min_value]))
+        self.negative.update(self.keys(-values[values <= -self.min_value]))
+        self.zeros += int(np.count_nonzero(np.abs(values) < self.min_value))
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("relative_accuracy 不同的 QuantileSketch 不能合并")
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """
+        :param q: 分位数，0 到 1 之间的数或者数组
+        :return: 分位数的估计值，没有数据时为 nan
+        """
+        qs = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.count == 0:
+            result = np.full(len(qs), np.nan)
+            return result if np.ndim(q) else float(result[0])
+
+        # 从小到大排列：负数桶按绝对值从大到小、0 桶、正数桶
+        negative_keys = self.negative.offset + np.arange(len(self.negative.counts))
+        positive_keys = self.positive.offset + np.arange(len(self.positive.counts))
+        values = np.concatenate([-self.value(negative_keys[::-1]), [0.], self.value(positive_keys)])
+        counts = np.concatenate([self.negative.counts[::-1], [self.zeros], self.positive.counts])
+        cumulative = np.cumsum(counts)
+
+        ranks = qs * (self.count - 1)
+        result = values[np.searchsorted(cumulative, ranks, side="right")]
+        result = np.clip(result, self.min, self.max)
+        result[qs <= 0], result[qs >= 1] = self.min, self.max
+        return result if np.ndim(q) else float(result[0])
+
+
+class TopK:
+    """
+    近似的高频取值，最多保留 capacity 个取值的计数，超出时丢弃计数最小的取值，error 为任意取值被低估计数的上界
+    """
+
+    def __init__(self, k=10, capacity=None):
+        self.k = k
+        self.capacity = capacity or max(20 * k, 200)
+        self.counts = {}
+        self.error = 0
+
+    def trim(self):
+        if len(self.counts) > self.capacity:
+            items = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+            self.error += items[self.capacity][1]
+            self.counts = dict(items[:self.capacity])
+        return self
+
+    def add(self, counts, error=0):
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        self.error += error
+        return self.trim()
+
+    def update(self, values):
+        """
+        :param values: 不包含缺失值的数组
+        """
+        counts = pd.Series(values).value_counts(sort=True)
+        error = int(counts.iloc[self.capacity]) if len(counts) > self.capacity else 0
+        return self.add(counts.iloc[:self.capacity].to_dict(), error)
+
+    def merge(self, other):
+        return self.add(other.counts, other.error)
+
+    def top(self, k=None):
+        """
+        :return: [(取值, 计数), ...] ，按计数从大到小排列，计数相同时按取值排列，结果与数据块的顺序无关
+        """
+        items = list(self.counts.items())
+        try:
+            items.sort(key=lambda item: item[0])
+        except TypeError:
+            items.sort(key=lambda item: str(item[0]))
+        items.sort(key=lambda item: item[1], reverse=True)
+        return items[:k or self.k]
@@ -4,3 +4,24 @@
 @Author  : itlubber
 @Site    : itlubber.art
 """
+
+import importlib
+
+_submodules = ["dependence", "permutation"]
+_exports = {
+    "PermutationImportance": "permutation",
+    "permutation_importance": "permutation",
+    "PartialDependence": "dependence",
+}
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _exports:
+        return getattr(importlib.import_module(f"{__name__}.{_exports[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | set(_exports))
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 10:00
+@Author  : itlubber
+@Site    : itlubber.art
+
+部分依赖 (PDP) 和个体条件期望 (ICE)，一个特征的全部网格点纵向拼接在复用的缓冲区中一次预测，按 max_rows 分块控制内存
+
+>>> explainer = PartialDependence(model, max_samples=1000, seed=42).fit(X_test, y_test)
+>>> explainer.partial_dependence("age")
+>>> explainer.interaction("age", "income")
+>>> explainer.to_excel(writer, features=["age", "income"], interactions=[("age", "income")])
+"""
+
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn.base import is_classifier
+
+from ..cv.engine import predict
+from ..utils.setter import task_seed
+from .permutation import stratified_sample, column, set_column, tile, head
+
+
+def feature_grid(values, grid_resolution=20, percentiles=(0.05, 0.95)):
+    """
+    特征的网格点，不同取值数不超过 grid_resolution 时使用全部取值，数值特征取 percentiles 范围内的等间隔分位数，整数特征取整后去重，
+    其余特征取出现次数最多的 grid_resolution 个取值
+
+    :param values: pd.Series
+    :return: np.ndarray
+    """
+    values = values.dropna()
+    uniques = values.unique()
+    if len(uniques) <= grid_resolution:
+        try:
+            return np.sort(uniques)
+        except TypeError:
+            return uniques
+
+    if not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        return values.value_counts().index[:grid_resolution].to_numpy()
+
+    grid = np.unique(np.quantile(values.to_numpy(dtype=np.float64), np.linspace(percentiles[0], percentiles[1], grid_resolution)))
+    if pd.api.types.is_integer_dtype(values.dtype):
+        grid = np.unique(np.round(grid)).astype(values.dtype)
+    return grid
+
+
+def format_value(value):
+    return f"{value:.4g}" if isinstance(value, (float, np.floating)) else str(value)
+
+
+class PartialDependence:
+    """
+    部分依赖和个体条件期望
+
+    抽样后的数据按 slots 份纵向拼接为复用的缓冲区，每份把特征整列设置为一个网格点，slots 份一次预测，slots 由 max_rows 确定；
+    计算完成后还原特征列，缓冲区在不同特征之间复用。二维交互使用相同的方式，网格点为两个特征网格的笛卡尔积
+
+    抽样数据的原始预测 (base) 在 fit 时计算一次，作为中心化 ICE 的基准和 ICE 图中样本实际取值处的点；
+    每个特征的 ICE 和每对特征的交互结果计算后缓存，作图和写入报告时不会重复预测
+    """
+
+    def __init__(self, estimator, method=None, class_index=None, grid_resolution=20, percentiles=(0.05, 0.95), max_samples=1000, max_rows=2 ** 20, seed=None):
+        """
+        :param estimator: 训练好的模型
+        :param method: 预测方法，默认 None ，分类模型有 predict_proba 时使用 predict_proba (二分类只保留正类概率)，否则使用 predict
+        :param class_index: 多分类概率预测时使用的类别下标，默认 None
+        :param grid_resolution: 每个特征最多的网格点数，默认 20
+        :param percentiles: 数值特征网格的分位数范围，默认 (0.05, 0.95)
+        :param max_samples: 计算使用的样本数，小于 1 的浮点数表示比例，默认 1000 ，传入 y 时按类别分层抽样，None 使用全部样本
+        :param max_rows: 一次预测的最大行数，默认 2 ** 20
+        :param seed: 抽样的随机种子，默认 None
+        """
+        self.estimator = estimator
+        self.method = method
+        self.class_index = class_index
+        self.grid_resolution = grid_resolution
+        self.percentiles = percentiles
+        self.max_samples = max_samples
+        self.max_rows = max_rows
+        self.seed = seed
+
+    def fit(self, X, y=None):
+        """
+        :param X: 计算使用的数据，pd.DataFrame 或 np.ndarray
+        :param y: 目标，默认 None ，传入时按类别分层抽样
+        :return: self
+        """
+        n = len(X)
+        random_state = None if self.seed is None else task_seed(self.seed, "sample")
+        index = stratified_sample(np.zeros(n) if y is None else np.asarray(y), self.max_samples, random_state=random_state, stratify=y is not None)
+        if index is not None:
+            X = X.iloc[index] if isinstance(X, pd.DataFrame) else np.asarray(X)[index]
+
+        self.X = X.reset_index(drop=True) if isinstance(X, pd.DataFrame) else np.asarray(X)
+        self.names = list(self.X.columns) if isinstance(self.X, pd.DataFrame) else list(range(self.X.shape[1]))
+        self.predict_method = self.method or ("predict_proba" if is_classifier(self.estimator) and hasattr(self.estimator, "predict_proba") else "predict")
+        self.base = self.predict(self.X)
+        self.grids = {}
+        self.cache = {}
+        self._buffer, self._slots = None, 0
+        return self
+
+    def predict(self, X):
+        pred = np.asarray(predict(self.estimator, X, self.predict_method), dtype=np.float64)
+        if pred.ndim == 2:
+            if self.class_index is None:
+                raise ValueError("多分类概率预测需要指定 class_index")
+            pred = pred[:, self.class_index]
+        return pred
+
+    def position(self, feature):
+        return self.names.index(feature)
+
+    def grid(self, feature):
+        if feature not in self.grids:
+            values = self.X[feature] if isinstance(self.X, pd.DataFrame) else pd.Series(self.X[:, feature])
+            self.grids[feature] = feature_grid(values, self.grid_resolution, self.percentiles)
+        return self.grids[feature]
+
+    def buffer(self, slots):
+        if self._buffer is None or self._slots < slots:
+            self._buffer, self._slots = tile(self.X, slots), slots
+        return self._buffer
+
+    def grid_predictions(self, features, points):
+        """
+        :param features: 特征列表
+        :param points: 网格点列表，每个网格点为与 features 对应的取值
+        :return: np.ndarray ，形状为 (网格点数, 样本数)
+        """
+        n = len(self.X)
+        positions = [self.position(f) for f in features]
+        slots = max(1, min(len(points), self.max_rows // n))
+        buffer = self.buffer(slots)
+        result = np.empty((len(points), n))
+
+        for start in range(0, len(points), slots):
+            batch = points[start:start + slots]
+            for slot, values in enumerate(batch):
+                for j, value in zip(positions, values):
+                    set_column(buffer, slice(slot * n, (slot + 1) * n), j, value)
+            result[start:start + len(batch)] = self.predict(head(buffer, len(batch) * n)).reshape(len(batch), n)
+
+        used = min(slots, len(points)) * n
+        for j in positions:
+            set_column(buffer, slice(0, used), j, np.tile(column(self.X, j), min(slots, len(points))))
+        return result
+
+    def ice(self, feature, centered=False):
+        """
+        个体条件期望，每个样本在各网格点上的预测
+
+        :param feature: 特征
+        :param centered: 是否减去每个样本的原始预测 (base) ，默认 False ，中心化后为特征取各网格点时预测相对于样本实际取值的变化
+        :return: pd.DataFrame ，行为样本，列为网格点
+        """
+        key = (feature,)
+        if key not in self.cache:
+            grid = self.grid(feature)
+            self.cache[key] = pd.DataFrame(self.grid_predictions([feature], [(value,) for value in grid]).T, columns=pd.Index(grid, name=feature))
+        return self.cache[key].sub(self.base, axis=0) if centered else self.cache[key]
+
+    def partial_dependence(self, feature):
+        """
+        部分依赖，各网格点上预测的均值
+
+        :return: pd.Series
+        """
+        return self.ice(feature).mean(axis=0).rename("partial_dependence")
+
+    def interaction(self, feature_x, feature_y):
+        """
+        两个特征的二维部分依赖
+
+        :return: pd.DataFrame ，行为 feature_x 的网格点，列为 feature_y 的网格点
+        """
+        key = (feature_x, feature_y)
+        if key not in self.cache:
+            grid_x, grid_y = self.grid(feature_x), self.grid(feature_y)
+            result = self.grid_predictions([feature_x, feature_y], list(product(grid_x, grid_y))).mean(axis=1)
+            self.cache[key] = pd.DataFrame(result.reshape(len(grid_x), len(grid_y)), index=pd.Index(grid_x, name=feature_x), columns=pd.Index(grid_y, name=feature_y))
+        return self.cache[key]
+
+    def plot(self, feature, ice=True, max_lines=100, centered=False, color="#2639E9", figsize=(8, 4)):
+        """
+        ICE 曲线和部分依赖曲线
+
+        :param feature: 特征
+        :param ice: 是否绘制 ICE 曲线，默认 True
+        :param max_lines: 最多绘制的 ICE 曲线数量，默认 100
+        :param centered: 是否减去每个样本的原始预测，默认 False ，参考 ice
+        :param color: 曲线颜色
+        :param figsize: 图片大小
+        :return: matplotlib 的 Figure
+        """
+        from matplotlib.figure import Figure
+
+        curves = self.ice(feature, centered=centered)
+        grid = curves.columns.to_numpy()
+        numeric = pd.api.types.is_numeric_dtype(curves.columns.dtype) and not pd.api.types.is_bool_dtype(curves.columns.dtype)
+        x = grid if numeric else np.arange(len(grid))
+        values = curves.to_numpy()
+
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
+        if ice:
+            ax.plot(x, values[:max_lines].T, color=color, alpha=0.15, linewidth=0.6)
+            if numeric and not centered:
+                # 样本的实际取值和原始预测，即未改动特征时 ICE 曲线经过的点
+                actual = column(self.X, self.position(feature))[:max_lines]
+                ax.scatter(actual, self.base[:max_lines], color=color, s=6, alpha=0.6, zorder=3)
+        ax.plot(x, values.mean(axis=0), color=color, linewidth=2.5, marker="o", markersize=3, label="PDP")
+        if not numeric:
+            ax.set_xticks(x)
+            ax.set_xticklabels([format_value(v) for v in grid], rotation=30, ha="right")
+        ax.set_xlabel(str(feature))
+        ax.set_ylabel("预测值" + ("变化" if centered else ""))
+        ax.set_title(f"{feature} 部分依赖")
+        ax.legend(loc="best", frameon=False)
+        fig.tight_layout()
+        return fig
+
+    def plot_interaction(self, feature_x, feature_y, cmap="Blues", figsize=(6, 5)):
+        """
+        二维部分依赖热力图
+
+        :return: matplotlib 的 Figure
+        """
+        from matplotlib.figure import Figure
+
+        table = self.interaction(feature_x, feature_y)
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
+        image = ax.imshow(table.to_numpy().T, aspect="auto", origin="lower", cmap=cmap)
+        ax.set_xticks(np.arange(len(table.index)))
+        ax.set_xticklabels([format_value(v) for v in table.index], rotation=45, ha="right")
+        ax.set_yticks(np.arange(len(table.columns)))
+        ax.set_yticklabels([format_value(v) for v in table.columns])
+        ax.set_xlabel(str(feature_x))
+        ax.set_ylabel(str(feature_y))
+        ax.set_title(f"{feature_x} × {feature_y} 部分依赖")
+        fig.colorbar(image, ax=ax)
+        fig.tight_layout()
+        return fig
+
+    def to_excel(self, excel_writer, features=None, interactions=None, sheet_name="部分依赖", title="部分依赖", figsize=(600, 300), centered=False, **kwargs):
+        """
+        将每个特征的 ICE / PDP 图和部分依赖表写入报告，图片通过 ExcelWriter.insert_pic2sheet 插入，表格写在图片右侧
+
+        :param excel_writer: excel 文件路径或者 ExcelWriter
+        :param features: 需要写入的特征，默认 None ，全部特征
+        :param interactions: 需要写入的二维交互 [(feature_x, feature_y), ...] ，默认 None
+        :param sheet_name: sheet 名称
+        :param title: 标题
+        :param figsize: 插入图片的大小
+        :param centered: ICE 曲线是否中心化
+        :param kwargs: 透传至 plot 的参数
+        :return: 返回插入元素最后一列之后、最后一行之后的位置
+        """
+        from ..utils.writer import ExcelWriter, dataframe2excel
+
+        writer = excel_writer if isinstance(excel_writer, ExcelWriter) else ExcelWriter()
+        worksheet = writer.get_sheet_by_name(sheet_name)
+        color = f"#{writer.theme_color}"
+
+        start_row, end_col = writer.insert_value2sheet(worksheet, (2, 2), value=title, style="header")
+        start_row += 1
+        for feature in (self.names if features is None else features):
+            pic_row, pic_col = writer.insert_pic2sheet(worksheet, self.plot(feature, centered=centered, color=color, **kwargs), (start_row, 2), figsize=figsize)
+            table = self.partial_dependence(feature).reset_index().rename(columns={feature: "网格点", "partial_dependence": "部分依赖"})
+            table["网格点"] = table["网格点"].map(format_value)
+            table_row, end_col = dataframe2excel(table, writer, sheet_name=worksheet, start_row=start_row, start_col=pic_col + 1, custom_cols=["部分依赖"], custom_format="0.0000", theme_color=writer.theme_color)
+            start_row = max(pic_row, table_row) + 2
+
+        for feature_x, feature_y in interactions or []:
+            start_row, end_col = writer.insert_pic2sheet(worksheet, self.plot_interaction(feature_x, feature_y), (start_row, 2), figsize=(figsize[1] * 5 // 4, figsize[1]))
+            start_row += 2
+
+        if not isinstance(excel_writer, ExcelWriter):
+            writer.save(excel_writer)
+
+        return start_row, end_col
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 09:10
+@Author  : itlubber
+@Site    : itlubber.art
+
+置换重要性，每个 (特征, 重复) 在复用的缓冲区中打乱一列，评估后还原该列，不复制整张表；多个打乱后的副本纵向拼接后一次预测
+
+>>> explainer = PermutationImportance(model, n_repeats=5, max_samples=50000, n_jobs=4, seed=42).fit(X_test, y_test)
+>>> explainer.importances
+"""
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy import stats
+from sklearn.base import is_classifier
+from sklearn.metrics import roc_auc_score, accuracy_score, r2_score
+from sklearn.utils.multiclass import type_of_target
+
+from ..cv.engine import predict
+from ..utils.setter import task_seed
+
+
+COLUMN_NAMES = {"feature": "变量名称", "importance": "重要性", "std": "标准差", "ci_lower": "置信区间下限", "ci_upper": "置信区间上限"}
+
+
+def stratified_sample(y, size, random_state=None, stratify=True):
+    """
+    按类别比例抽样，各类别的样本数按比例取整后，剩余的名额分配给小数部分最大的类别
+
+    :param y: 目标
+    :param size: 样本数，小于 1 的浮点数表示比例
+    :param random_state: 随机种子
+    :param stratify: 是否分层，默认 True ，目标不是分类时直接随机抽样
+    :return: 从小到大排列的下标，不需要抽样时为 None
+    """
+    n = len(y)
+    if size is None:
+        return None
+    size = int(round(size * n)) if isinstance(size, float) and size < 1 else int(size)
+    if size >= n:
+        return None
+
+    rng = np.random.RandomState(random_state)
+    if not stratify or type_of_target(y) not in ("binary", "multiclass"):
+        return np.sort(rng.choice(n, size, replace=False))
+
+    _, inverse = np.unique(y, return_inverse=True)
+    counts = np.bincount(inverse)
+    quotas = counts * size / n
+    sizes = np.floor(quotas).astype(np.int64)
+    sizes[np.argsort(sizes - quotas, kind="stable")[:size - sizes.sum()]] += 1
+    index = np.concatenate([rng.choice(np.flatnonzero(inverse == k), s, replace=False) for k, s in enumerate(sizes)])
+    return np.sort(index)
+
+
+def column(X, j):
+    return X.iloc[:, j].to_numpy() if isinstance(X, pd.DataFrame) else X[:, j]
+
+
+def set_column(buffer, rows, j, values):
+    if isinstance(buffer, pd.DataFrame):
+        buffer.iloc[rows, j] = values
+    else:
+        buffer[rows, j] = values
+
+
+def tile(X, k):
+    if isinstance(X, pd.DataFrame):
+        return pd.concat([X] * k, ignore_index=True) if k > 1 else X.reset_index(drop=True)
+    return np.tile(X, (k, 1))
+
+
+def head(buffer, rows):
+    if len(buffer) == rows:
+        return buffer
+    return buffer.iloc[:rows] if isinstance(buffer, pd.DataFrame) else buffer[:rows]
+
+
+def permutation_scores(estimator, X, y, sample_weight, tasks, method, scoring, batch_size, seed):
+    """
+    在同一个进程中评估一组 (特征下标, 重复次数)，缓冲区为 batch_size 份 X 的纵向拼接，每份打乱一列，预测后还原
+
+    :return: 每个任务打乱后的得分
+    """
+    n = len(y)
+    batch_size = max(1, min(batch_size, len(tasks)))
+    buffer = tile(X, batch_size)
+    scores = np.empty(len(tasks))
+    params = {} if sample_weight is None else {"sample_weight": sample_weight}
+
+    for start in range(0, len(tasks), batch_size):
+        batch = tasks[start:start + batch_size]
+        for slot, (j, repeat) in enumerate(batch):
+            permutation = np.random.default_rng(task_seed(seed, "permutation", j, repeat)).permutation(n)
+            set_column(buffer, slice(slot * n, (slot + 1) * n), j, column(X, j)[permutation])
+
+        pred = np.asarray(predict(estimator, head(buffer, len(batch) * n), method))
+        for slot, (j, _) in enumerate(batch):
+            scores[start + slot] = scoring(y, pred[slot * n:(slot + 1) * n], **params)
+            set_column(buffer, slice(slot * n, (slot + 1) * n), j, column(X, j))
+
+    return scores
+
+
+class PermutationImportance:
+    """
+    置换重要性：特征打乱后模型得分的下降
+
+    每个 (特征, 重复) 的打乱顺序由 task_seed(seed, "permutation", 特征下标, 重复次数) 决定，结果与 n_jobs 、 batch_size 无关；
+    特征按组分配给进程池，每个进程只接收一次数据和模型，在自己的缓冲区中依次评估
+    """
+
+    def __init__(self, estimator, scoring=None, greater_is_better=True, method=None, n_repeats=5, max_samples=None, stratify=True, batch_size=None, max_batch_bytes=256 * 1024 ** 2, n_jobs=1, backend=None, seed=None, confidence=0.95):
+        """
+        :param estimator: 训练好的模型
+        :param scoring: 评估函数 func(y_true, y_pred) ，默认 None ，概率预测使用 AUC ，其余分类使用准确率，回归使用 R2
+        :param greater_is_better: scoring 是否越大越好，默认 True
+        :param method: 预测方法，默认 None ，二分类模型有 predict_proba 时使用正类概率，否则使用 predict
+        :param n_repeats: 每个特征打乱的次数，默认 5
+        :param max_samples: 评估使用的样本数，小于 1 的浮点数表示比例，默认 None ，使用全部样本
+        :param stratify: 抽样时是否按类别分层，默认 True
+        :param batch_size: 一次预测拼接的副本数，默认 None ，按 max_batch_bytes 确定；模型的预测结果与同一批中的其他样本有关时设置为 1
+        :param max_batch_bytes: 自动确定 batch_size 时缓冲区的最大字节数，默认 256MiB
+        :param n_jobs: 并行的进程数，默认 1
+        :param backend: joblib 的并行后端，默认 None ，即 loky 进程池
+        :param seed: 主种子，用于抽样和打乱，默认 None ，每次 fit 随机生成
+        :param confidence: 重要性置信区间的置信水平，默认 0.95 ，按照各次重复的 t 分布计算，只反映打乱带来的波动
+        """
+        self.estimator = estimator
+        self.scoring = scoring
+        self.greater_is_better = greater_is_better
+        self.method = method
+        self.n_repeats = n_repeats
+        self.max_samples = max_samples
+        self.stratify = stratify
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.seed = seed
+        self.confidence = confidence
+
+    def default_scoring(self, y, method):
+        if method == "predict_proba":
+            return roc_auc_score
+        return accuracy_score if is_classifier(self.estimator) else r2_score
+
+    def fit(self, X, y, sample_weight=None, features=None):
+        """
+        :param X: 评估数据，pd.DataFrame 或 np.ndarray
+        :param y: 目标
+        :param sample_weight: 样本权重，透传至 scoring
+        :param features: 需要评估的特征，列名或列下标，默认 None ，评估全部特征
+        :return: self
+        """
+        y = np.asarray(y)
+        seed = np.random.randint(2 ** 31) if self.seed is None else self.seed
+        index = stratified_sample(y, self.max_samples, random_state=task_seed(seed, "sample"), stratify=self.stratify)
+        if index is not None:
+            X = X.iloc[index] if isinstance(X, pd.DataFrame) else X[index]
+            y = y[index]
+            sample_weight = None if sample_weight is None else np.asarray(sample_weight)[index]
+
+        if not isinstance(X, pd.DataFrame):
+            X = np.asarray(X)
+        names = list(X.columns) if isinstance(X, pd.DataFrame) else list(range(X.shape[1]))
+        positions = list(range(len(names))) if features is None else [names.index(f) if f in names else int(f) for f in features]
+
+        method = self.method or ("predict_proba" if type_of_target(y) == "binary" and hasattr(self.estimator, "predict_proba") else "predict")
+        scoring = self.scoring or self.default_scoring(y, method)
+        params = {} if sample_weight is None else {"sample_weight": sample_weight}
+        self.baseline = float(scoring(y, np.asarray(predict(self.estimator, X, method)), **params))
+
+        batch_size = self.batch_size
+        if batch_size is None:
+            nbytes = X.memory_usage(index=False).sum() if isinstance(X, pd.DataFrame) else X.nbytes
+            batch_size = max(1, int(self.max_batch_bytes // max(nbytes, 1)))
+
+        # 同一特征的全部重复分配给同一个进程
+        groups = [group for group in np.array_split(np.asarray(positions), min(effective_n_jobs(self.n_jobs), len(positions))) if len(group)]
+        tasks = [[(int(j), repeat) for j in group for repeat in range(self.n_repeats)] for group in groups]
+        params = dict(estimator=self.estimator, X=X, y=y, sample_weight=sample_weight, method=method, scoring=scoring, batch_size=batch_size, seed=seed)
+        if len(tasks) == 1:
+            results = [permutation_scores(tasks=tasks[0], **params)]
+        else:
+            results = Parallel(n_jobs=self.n_jobs, backend=self.backend)(delayed(permutation_scores)(tasks=group, **params) for group in tasks)
+
+        scores = np.concatenate(results).reshape(len(positions), self.n_repeats)
+        self.features = [names[j] for j in positions]
+        self.scores = pd.DataFrame(scores, index=self.features, columns=[f"repeat_{r}" for r in range(self.n_repeats)])
+        self.sample_size = len(y)
+        return self
+
+    @property
+    def importances(self):
+        """
+        每个特征的重要性均值、标准差和置信区间，按重要性从大到小排列
+
+        :return: pd.DataFrame
+        """
+        drops = (self.baseline - self.scores) if self.greater_is_better else (self.scores - self.baseline)
+        mean, std = drops.mean(axis=1), drops.std(axis=1, ddof=1)
+        margin = stats.t.ppf((1 + self.confidence) / 2, self.n_repeats - 1) * std / np.sqrt(self.n_repeats)
+        frame = pd.DataFrame({"feature": self.features, "importance": mean.to_numpy(), "std": std.to_numpy(), "ci_lower": (mean - margin).to_numpy(), "ci_upper": (mean + margin).to_numpy()})
+        return frame.sort_values("importance", ascending=False, kind="stable").reset_index(drop=True)
+
+    def to_excel(self, excel_writer, sheet_name="置换重要性", title="置换重要性", **kwargs):
+        """
+        将 importances 通过 dataframe2excel 写入报告
+
+        :param excel_writer: excel 文件路径或者 ExcelWriter
+        :param sheet_name: sheet 名称
+        :param title: 标题
+        :param kwargs: 透传至 dataframe2excel 的参数
+        :return: dataframe2excel 的返回值
+        """
+        from ..utils.writer import dataframe2excel
+
+        params = dict(condition_cols=["重要性"], custom_cols=["重要性", "标准差", "置信区间下限", "置信区间上限"], custom_format="#,##0.0000")
+        params.update(kwargs)
+        return dataframe2excel(self.importances.rename(columns=COLUMN_NAMES), excel_writer, sheet_name=sheet_name, title=title, **params)
+
+
+def permutation_importance(estimator, X, y, sample_weight=None, features=None, **kwargs):
+    """
+    计算置换重要性
+
+    :param estimator: 训练好的模型
+    :param X: 评估数据
+    :param y: 目标
+    :param kwargs: 透传至 PermutationImportance 的参数，例如 n_repeats 、 max_samples 、 n_jobs 、 seed
+    :return: pd.DataFrame ，参考 PermutationImportance.importances
+    """
+    return PermutationImportance(estimator, **kwargs).fit(X, y, sample_weight=sample_weight, features=features).importances
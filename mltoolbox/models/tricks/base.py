@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 01:10
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+import numpy as np
+from scipy import optimize, special
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+_jit_kernels = {}
+
+
+def jit_kernel(point):
+    """
+    将单个样本的梯度计算函数编译为并行的 numba 循环，同一个函数只编译一次，未安装 numba 时返回 None
+
+    :param point: point(pt, params) -> (G, H) ，只能使用 math 模块和基础运算
+    :return: kernel(p, negative, at, az, params, grad, hess)
+    """
+    if numba is None:
+        return None
+
+    if point not in _jit_kernels:
+        compiled = numba.njit(point)
+
+        @numba.njit(parallel=True)
+        def kernel(p, negative, at, az, params, grad, hess):
+            for i in numba.prange(p.shape[0]):
+                pt = min(max(p[i], 1e-15), 1 - 1e-15)
+                if negative[i]:
+                    pt = 1 - pt
+                g, h = compiled(pt, params)
+                grad[i] = g * az[i]
+                hess[i] = h * at[i]
+
+        _jit_kernels[point] = kernel
+
+    return _jit_kernels[point]
+
+
+class BinaryObjective:
+    """
+    二分类自定义目标函数的公共计算部分
+
+    记 pt 为真实类别的预测概率，at 为类别权重与样本权重的乘积，y 取 -1 或 1 ，本模块中的目标函数对原始得分的梯度和 hessian 都可以写成
+    grad = at * y * G(pt) 、hess = at * H(pt) ，公共部分负责 pt 的计算、标签相关权重的缓存、缓冲区复用、初始得分以及 LightGBM 和 XGBoost 的接口，
+    子类只需要实现 loss(pt) 和 kernel(pt, 1 - pt, grad, hess) 计算 G 和 H ，安装 numba 时可以额外提供单个样本的 point(pt, params) 编译为并行循环
+    """
+
+    name = "objective"
+    point = None
+
+    def __init__(self, dtype=np.float64, jit=False):
+        """
+        :param dtype: 计算梯度时使用的精度，默认 np.float64 ，设置为 np.float32 时内存减半，且返回结果不需要 LightGBM 再转换一次
+        :param jit: 是否使用 numba 编译的并行循环计算梯度，默认 False ，未安装 numba 时使用 numpy 计算
+        """
+        self.dtype = np.dtype(dtype)
+        self.jit = jit
+        self._buffers = {}
+        self._labels = {}
+        self._dmatrices = {}
+
+    def class_weights(self):
+        """
+        正负样本的权重 (正样本权重, 负样本权重)，返回 None 时不加权
+        """
+        return None
+
+    def params(self):
+        """
+        传入 point 的参数，需要是浮点数组成的 tuple
+        """
+        return (0.,)
+
+    def prepare(self, y_true, sample_weight=None):
+        """
+        第一次计算之前根据标签初始化的内容，例如根据样本数量计算类别权重
+        """
+
+    def loss(self, pt):
+        raise NotImplementedError
+
+    def kernel(self, pt, q, grad, hess):
+        """
+        根据 pt 和 q = 1 - pt 计算 G 和 H ，结果写入 grad 和 hess
+        """
+        raise NotImplementedError
+
+    def at(self, y):
+        weights = self.class_weights()
+        if weights is None:
+            return np.ones_like(y)
+        return np.where(y, *weights)
+
+    def pt(self, y, p):
+        p = np.clip(p, 1e-15, 1 - 1e-15)
+        return np.where(y, p, 1 - p)
+
+    @staticmethod
+    def weighted(values, sample_weight=None):
+        return values if sample_weight is None else values * sample_weight
+
+    def __call__(self, y_true, y_pred, sample_weight=None):
+        self.prepare(y_true, sample_weight)
+        return self.weighted(self.at(y_true) * self.loss(self.pt(y_true, y_pred)), sample_weight)
+
+    def label_weights(self, y_true, sample_weight=None):
+        """
+        获取标签相关的权重 at 和 at * y (y 取 -1 或 1)，同一份标签和样本权重只计算一次，训练过程中每一轮直接复用
+
+        :param y_true: 标签
+        :param sample_weight: 样本权重，默认 None
+        :return: 负样本的掩码、at (类别权重和样本权重都为 None 时返回 None)、at * y
+        """
+        key = (id(y_true), id(sample_weight), self.dtype)
+        if key not in self._labels:
+            self.prepare(y_true, sample_weight)
+            # 同时持有标签和样本权重的引用，避免被回收后 id 被复用
+            if len(self._labels) >= 8:
+                self._labels.clear()
+
+            mask = np.asarray(y_true) != 0
+            at = self.at(mask).astype(self.dtype) if self.class_weights() is not None else None
+            if sample_weight is not None:
+                at = np.asarray(sample_weight, dtype=self.dtype) * (at if at is not None else 1)
+            az = np.where(mask, 1, -1).astype(self.dtype)
+            if at is not None:
+                az *= at
+            self._labels[key] = (y_true, sample_weight, ~mask, at, az)
+
+        return self._labels[key][2:]
+
+    def buffer(self, name, size):
+        """
+        获取预分配的缓冲区，长度和精度相同的缓冲区在每一轮之间复用
+        """
+        key = (name, size, self.dtype)
+        if key not in self._buffers:
+            self._buffers[key] = np.empty(size, dtype=self.dtype)
+        return self._buffers[key]
+
+    def grad_hess(self, y_true, y_pred, sample_weight=None):
+        """
+        一次计算 grad 和 hess ，所有中间结果写入预分配的缓冲区，不产生临时数组
+
+        :param y_true: 标签
+        :param y_pred: 预测概率
+        :param sample_weight: 样本权重，默认 None
+        :return: grad 和 hess ，返回的数组在下一次调用时会被覆盖
+        """
+        negative, at, az = self.label_weights(y_true, sample_weight)
+        n = len(y_pred)
+        grad, hess = self.buffer("grad", n), self.buffer("hess", n)
+
+        kernel = jit_kernel(type(self).point) if self.jit and type(self).point is not None else None
+        if kernel is not None:
+            if at is None:
+                at = self.buffer("ones", n)
+                at.fill(1)
+            kernel(np.asarray(y_pred, dtype=self.dtype), negative, at, az, tuple(float(v) for v in self.params()), grad, hess)
+            return grad, hess
+
+        pt, q = self.buffer("pt", n), self.buffer("q", n)
+        np.clip(y_pred, 1e-15, 1 - 1e-15, out=pt)
+        np.subtract(1, pt, out=pt, where=negative)
+        np.subtract(1, pt, out=q)
+        self.kernel(pt, q, grad, hess)
+
+        grad *= az
+        if at is not None:
+            hess *= at
+
+        return grad, hess
+
+    def grad(self, y_true, y_pred, sample_weight=None):
+        return self.grad_hess(y_true, y_pred, sample_weight)[0].copy()
+
+    def hess(self, y_true, y_pred, sample_weight=None):
+        return self.grad_hess(y_true, y_pred, sample_weight)[1].copy()
+
+    def init_score(self, y_true, sample_weight=None):
+        """
+        计算使损失最小的常数初始得分
+
+        常数概率 p 下的总损失只和正负样本的 (加权) 数量有关，先将标签汇总为正负样本的权重之和，再在汇总结果上求解，耗时与样本量无关
+
+        :param y_true: 标签
+        :param sample_weight: 样本权重，默认 None
+        :return: 初始得分，即 log(p / (1 - p))
+        """
+        self.prepare(y_true, sample_weight)
+        positive = np.asarray(y_true) != 0
+        if sample_weight is None:
+            w1, w0 = np.count_nonzero(positive), len(positive) - np.count_nonzero(positive)
+        else:
+            sample_weight = np.asarray(sample_weight, dtype=float)
+            w1 = np.dot(positive, sample_weight)
+            w0 = sample_weight.sum() - w1
+
+        weights = self.class_weights()
+        if weights is not None:
+            w1, w0 = w1 * weights[0], w0 * weights[1]
+
+        def loss(p):
+            p = np.clip(p, 1e-15, 1 - 1e-15)
+            return w1 * self.loss(p) + w0 * self.loss(1 - p)
+
+        res = optimize.minimize_scalar(loss, bounds=(0, 1), method='bounded')
+        p = res.x
+        log_odds = np.log(p / (1 - p))
+        return log_odds
+
+    def lgb_obj(self, preds, train_data):
+        y = train_data.get_label()
+        p = special.expit(preds, out=self.buffer("p", len(preds)))
+        return self.grad_hess(y, p, train_data.get_weight())
+
+    def lgb_eval(self, preds, train_data):
+        y = train_data.get_label()
+        p = special.expit(preds)
+        is_higher_better = False
+        return self.name, np.average(self(y, p), weights=train_data.get_weight()), is_higher_better
+
+    @staticmethod
+    def xgb_weight(dtrain):
+        # 没有设置样本权重时 xgboost 返回空数组
+        weight = dtrain.get_weight()
+        return weight if weight is not None and len(weight) > 0 else None
+
+    @staticmethod
+    def xgb_data(cache, dtrain):
+        """
+        DMatrix 的标签和样本权重，按 DMatrix 对象缓存
+
+        DMatrix.get_label 每次调用都会返回新的数组，按数组 id 缓存的 label_weights 在每一轮都无法命中，
+        缓存后同一个 DMatrix 每一轮返回同一份数组；训练过程中不支持通过 set_label 修改同一个 DMatrix 的标签
+
+        :param cache: 保存结果的 dict
+        :param dtrain: xgboost.DMatrix
+        :return: 标签和样本权重 (没有设置时为 None)
+        """
+        key = id(dtrain)
+        if key not in cache:
+            if len(cache) >= 8:
+                cache.clear()
+            # 同时持有 DMatrix 的引用，避免被回收后 id 被复用
+            cache[key] = (dtrain, dtrain.get_label(), BinaryObjective.xgb_weight(dtrain))
+        return cache[key][1:]
+
+    def xgb_obj(self, preds, dtrain):
+        """
+        xgboost.train 的 obj 参数，preds 为原始得分
+        """
+        y, weight = self.xgb_data(self._dmatrices, dtrain)
+        p = special.expit(preds, out=self.buffer("p", len(preds)))
+        return self.grad_hess(y, p, weight)
+
+    def xgb_eval(self, preds, dtrain):
+        """
+        xgboost.train 的 feval / custom_metric 参数，使用自定义目标函数时 preds 为原始得分
+        """
+        y, weight = self.xgb_data(self._dmatrices, dtrain)
+        p = special.expit(preds)
+        return self.name, float(np.average(self(y, p), weights=weight))
@@ -4,11 +4,27 @@
 @Author  : itlubber
 @Site    : itlubber.art
 """
+import math
+
 import numpy as np
-from scipy import optimize, special
+from scipy import special
+
+from .base import BinaryObjective
+
+
+def focal_point(pt, params):
+    """
+    单个样本的 focal loss 梯度，numba 编译使用，与 FocalLoss.kernel 的结果一致
+    """
+    g = params[0]
+    q = 1 - pt
+    lp = math.log(pt)
+    w = q ** g
+    v = g * pt * lp - q
+    return w * v, pt * w * (q * (g * lp + g + 1) - g * v)
 
 
-class FocalLoss:
+class FocalLoss(BinaryObjective):
     """
     https://maxhalford.github.io/blog/lightgbm-focal-loss/#benchmarks
     https://github.com/jrzaurin/LightGBM-with-Focal-Loss
@@ -16,32 +32,39 @@ class FocalLoss:
     http://www.joca.cn/article/2022/1001-9081/1001-9081-2022-42-7-2256.shtml
     """
 
-    def __init__(self, gamma=2., alpha=None):
+    name = "focal_loss"
+    point = staticmethod(focal_point)
+
+    def __init__(self, gamma=2., alpha=None, dtype=np.float64, jit=False):
+        """
+        :param gamma: 聚焦参数，越大越关注难分样本
+        :param alpha: 正样本的权重，负样本的权重为 1 - alpha ，默认 None ，即不加权
+        :param dtype: lgb_obj 计算梯度时使用的精度，默认 np.float64 ，设置为 np.float32 时内存减半，且返回结果不需要 LightGBM 再转换一次
+        :param jit: 是否使用 numba 编译的并行循环计算梯度，默认 False
+        """
+        super().__init__(dtype=dtype, jit=jit)
         self.alpha = alpha
         self.gamma = gamma
 
-    def at(self, y):
-        if self.alpha is None:
-            return np.ones_like(y)
-        return np.where(y, self.alpha, 1 - self.alpha)
+    def class_weights(self):
+        return None if self.alpha is None else (self.alpha, 1 - self.alpha)
 
-    def pt(self, y, p):
-        p = np.clip(p, 1e-15, 1 - 1e-15)
-        return np.where(y, p, 1 - p)
+    def params(self):
+        return (float(self.gamma),)
 
-    def __call__(self, y_true, y_pred):
-        at = self.at(y_true)
-        pt = self.pt(y_true, y_pred)
-        return -at * (1 - pt) ** self.gamma * np.log(pt)
+    def loss(self, pt):
+        return -(1 - pt) ** self.gamma * np.log(pt)
 
-    def grad(self, y_true, y_pred):
+    def grad(self, y_true, y_pred, sample_weight=None):
+        self.prepare(y_true, sample_weight)
         y = 2 * y_true - 1  # {0, 1} -> {-1, 1}
         at = self.at(y_true)
         pt = self.pt(y_true, y_pred)
         g = self.gamma
-        return at * y * (1 - pt) ** g * (g * pt * np.log(pt) + pt - 1)
+        return self.weighted(at * y * (1 - pt) ** g * (g * pt * np.log(pt) + pt - 1), sample_weight)
 
-    def hess(self, y_true, y_pred):
+    def hess(self, y_true, y_pred, sample_weight=None):
+        self.prepare(y_true, sample_weight)
         y = 2 * y_true - 1  # {0, 1} -> {-1, 1}
         at = self.at(y_true)
         pt = self.pt(y_true, y_pred)
@@ -52,28 +75,241 @@ class FocalLoss:
         v = g * pt * np.log(pt) + pt - 1
         dv = g * np.log(pt) + g + 1
 
-        return (du * v + u * dv) * y * (pt * (1 - pt))
+        return self.weighted((du * v + u * dv) * y * (pt * (1 - pt)), sample_weight)
+
+    def kernel(self, pt, q, grad, hess):
+        """
+        pt、1 - pt、log(pt)、(1 - pt) ** gamma 只计算一次，所有中间结果写入预分配的缓冲区，不产生临时数组
+
+        hess 化简为 at * pt * (1 - pt) ** gamma * ((1 - pt) * (gamma * log(pt) + gamma + 1) - gamma * v) ，其中 v = gamma * pt * log(pt) + pt - 1 ，与 hess 方法的结果一致
+        """
+        g, n = self.gamma, len(pt)
+        lp, w = self.buffer("lp", n), self.buffer("w", n)
+        np.log(pt, out=lp)
+
+        if g == 0:
+            w.fill(1)
+        elif g == 1:
+            w[:] = q
+        elif g == 2:
+            np.multiply(q, q, out=w)
+        else:
+            np.power(q, g, out=w)
+
+        # v = gamma * pt * log(pt) + pt - 1
+        np.multiply(pt, lp, out=grad)
+        grad *= g
+        grad -= q
+
+        # (1 - pt) * (gamma * log(pt) + gamma + 1) - gamma * v
+        np.multiply(lp, g, out=hess)
+        hess += g + 1
+        hess *= q
+        np.multiply(grad, g, out=lp)
+        hess -= lp
+        hess *= pt
+        hess *= w
+
+        grad *= w
+
+
+class MultiClassFocalLoss:
+    """
+    多分类的 focal loss ，基于数值稳定的 softmax ，一次遍历 (n, k) 的概率矩阵同时计算梯度和对角 hessian
+
+    记 pt 为真实类别的概率，F = at * (gamma * (1 - pt) ** (gamma - 1) * pt * log(pt) - (1 - pt) ** gamma) ，则
+    grad_j = F * (δ_j - p_j) ，hess_j = D * ((δ_j - p_j) / (1 - pt)) ** 2 - F * p_j * (1 - p_j) ，
+    其中 D = at * gamma * pt * (1 - pt) ** gamma * ((1 - pt) * (log(pt) + 2) - (gamma - 1) * pt * log(pt))
+    """
+
+    def __init__(self, gamma=2., alpha=None, dtype=np.float64):
+        """
+        :param gamma: 聚焦参数，越大越关注难分样本，为 0 时等价于 softmax 交叉熵
+        :param alpha: 每个类别的权重，长度与类别数相同，默认 None ，即不加权
+        :param dtype: 计算梯度时使用的精度，默认 np.float64
+        """
+        self.gamma = gamma
+        self.alpha = alpha
+        self.dtype = np.dtype(dtype)
+        self._buffers = {}
+        self._labels = {}
+        self._dmatrices = {}
+
+    def buffer(self, name, shape, transpose=False):
+        """
+        获取预分配的缓冲区，transpose 为 True 时按 (k, n) 分配并返回 (n, k) 的转置视图，与 LightGBM 按类别展开的预测结果布局一致
+        """
+        key = (name, shape, transpose, self.dtype)
+        if key not in self._buffers:
+            self._buffers[key] = np.empty(shape[::-1], dtype=self.dtype).T if transpose else np.empty(shape, dtype=self.dtype)
+        return self._buffers[key]
+
+    def label_weights(self, y_true, num_class, sample_weight=None):
+        """
+        获取标签的 one-hot 掩码和每个样本的权重，同一份标签和样本权重只计算一次
+
+        :param y_true: 标签，取值为 0 到 num_class - 1
+        :param num_class: 类别数
+        :param sample_weight: 样本权重，默认 None
+        :return: one-hot 掩码 (n, k) 和每个样本的权重 at * sample_weight (alpha 和 sample_weight 都为 None 时返回 None)
+        """
+        key = (id(y_true), id(sample_weight), num_class, self.dtype)
+        if key not in self._labels:
+            if len(self._labels) >= 8:
+                self._labels.clear()
+
+            y = np.asarray(y_true).astype(int)
+            onehot = np.zeros((len(y), num_class), dtype=bool)
+            onehot[np.arange(len(y)), y] = True
+            at = np.asarray(self.alpha, dtype=self.dtype)[y] if self.alpha is not None else None
+            if sample_weight is not None:
+                at = np.asarray(sample_weight, dtype=self.dtype) * (at if at is not None else 1)
+            self._labels[key] = (y_true, sample_weight, onehot, at)
+
+        return self._labels[key][2:]
+
+    def softmax(self, logits, out=None):
+        """
+        数值稳定的 softmax ，每行减去最大值后再计算指数
+
+        :param logits: 原始得分 (n, k)
+        :param out: 保存结果的数组，默认新建
+        :return: 概率 (n, k)
+        """
+        if out is None:
+            out = np.empty(logits.shape, dtype=self.dtype)
+        row = self.buffer("row", (logits.shape[0],))
+        np.max(logits, axis=1, out=row)
+        np.subtract(logits, row[:, None], out=out)
+        np.exp(out, out=out)
+        np.sum(out, axis=1, out=row)
+        out /= row[:, None]
+        return out
+
+    def pt(self, y_true, y_pred, sample_weight=None):
+        onehot, at = self.label_weights(y_true, y_pred.shape[1], sample_weight)
+        pt = np.sum(y_pred, axis=1, where=onehot)
+        return np.clip(pt, 1e-15, 1 - 1e-15), at
+
+    def __call__(self, y_true, y_pred, sample_weight=None):
+        pt, at = self.pt(y_true, y_pred, sample_weight)
+        loss = -(1 - pt) ** self.gamma * np.log(pt)
+        return loss * at if at is not None else loss
+
+    def grad_hess(self, y_true, y_pred, sample_weight=None):
+        """
+        一次计算 (n, k) 的梯度和对角 hessian ，所有中间结果写入预分配的缓冲区
+
+        :param y_true: 标签，取值为 0 到 k - 1
+        :param y_pred: 预测概率 (n, k)
+        :param sample_weight: 样本权重，默认 None
+        :return: grad 和 hess ，与 y_pred 的内存布局相同，返回的数组在下一次调用时会被覆盖
+        """
+        n, k = y_pred.shape
+        g, transpose = self.gamma, not y_pred.flags.c_contiguous and y_pred.flags.f_contiguous
+        onehot, at = self.label_weights(y_true, k, sample_weight)
+        pt, q, lp, w, f, d = [self.buffer(name, (n,)) for name in ("pt", "q", "lp", "w", "f", "d")]
+        grad, hess, work = [self.buffer(name, (n, k), transpose=transpose) for name in ("grad", "hess", "work")]
+
+        np.sum(y_pred, axis=1, where=onehot, out=pt)
+        np.clip(pt, 1e-15, 1 - 1e-15, out=pt)
+        np.subtract(1, pt, out=q)
+        np.log(pt, out=lp)
+        np.power(q, g, out=w)
 
-    def init_score(self, y_true):
-        res = optimize.minimize_scalar(
-            lambda p: self(y_true, p).sum(),
-            bounds=(0, 1),
-            method='bounded'
-        )
-        p = res.x
-        log_odds = np.log(p / (1 - p))
-        return log_odds
+        # F = gamma * (1 - pt) ** (gamma - 1) * pt * log(pt) - (1 - pt) ** gamma
+        np.multiply(pt, lp, out=f)
+        f *= w
+        f /= q
+        f *= g
+        f -= w
+
+        # D = gamma * pt * (1 - pt) ** gamma * ((1 - pt) * (log(pt) + 2) - (gamma - 1) * pt * log(pt))
+        np.add(lp, 2, out=d)
+        d *= q
+        np.multiply(pt, lp, out=lp)
+        lp *= g - 1
+        d -= lp
+        d *= pt
+        d *= w
+        d *= g
+
+        if at is not None:
+            f *= at
+            d *= at
+
+        # δ - p
+        np.negative(y_pred, out=hess)
+        np.add(hess, 1, out=hess, where=onehot)
+        np.multiply(hess, f[:, None], out=grad)
+
+        hess /= q[:, None]
+        hess *= hess
+        hess *= d[:, None]
+        np.subtract(1, y_pred, out=work)
+        work *= y_pred
+        work *= f[:, None]
+        hess -= work
+
+        return grad, hess
+
+    def grad(self, y_true, y_pred, sample_weight=None):
+        return self.grad_hess(y_true, y_pred, sample_weight)[0].copy()
+
+    def hess(self, y_true, y_pred, sample_weight=None):
+        return self.grad_hess(y_true, y_pred, sample_weight)[1].copy()
+
+    def lgb_logits(self, preds, train_data):
+        """
+        将 LightGBM 的预测结果转为 (n, k) 的视图，LightGBM 4.0 之前多分类的预测结果按类别展开为一维，即 preds[j * n + i]
+        """
+        if preds.ndim == 2:
+            return preds
+        n = train_data.num_data()
+        return preds.reshape(-1, n).T
 
     def lgb_obj(self, preds, train_data):
         y = train_data.get_label()
-        p = special.expit(preds)
-        return self.grad(y, p), self.hess(y, p)
+        logits = self.lgb_logits(preds, train_data)
+        p = self.softmax(logits, out=self.buffer("p", logits.shape, transpose=preds.ndim == 1))
+        grad, hess = self.grad_hess(y, p, train_data.get_weight())
+        # 一维输入时缓冲区按 (k, n) 分配，展开后与 LightGBM 的布局一致，不需要复制
+        if preds.ndim == 1:
+            return grad.T.ravel(), hess.T.ravel()
+        return grad, hess
 
     def lgb_eval(self, preds, train_data):
         y = train_data.get_label()
-        p = special.expit(preds)
+        logits = self.lgb_logits(preds, train_data)
+        p = self.softmax(logits, out=self.buffer("p", logits.shape, transpose=preds.ndim == 1))
         is_higher_better = False
-        return 'focal_loss', self(y, p).mean(), is_higher_better
+        return 'multiclass_focal_loss', np.average(self(y, p), weights=train_data.get_weight()), is_higher_better
+
+    def xgb_logits(self, preds, dtrain):
+        """
+        将 xgboost 的预测结果转为 (n, k) 的视图，旧版本 xgboost 多分类的预测结果按样本展开为一维，即 preds[i * k + j]
+        """
+        if preds.ndim == 2:
+            return preds
+        return preds.reshape(dtrain.num_row(), -1)
+
+    def xgb_obj(self, preds, dtrain):
+        """
+        xgboost.train 的 obj 参数，preds 为原始得分，返回结果与 preds 的形状一致
+        """
+        y, weight = BinaryObjective.xgb_data(self._dmatrices, dtrain)
+        logits = self.xgb_logits(preds, dtrain)
+        p = self.softmax(logits, out=self.buffer("p", logits.shape))
+        grad, hess = self.grad_hess(y, p, weight)
+        if preds.ndim == 1:
+            return grad.ravel(), hess.ravel()
+        return grad, hess
+
+    def xgb_eval(self, preds, dtrain):
+        y, weight = BinaryObjective.xgb_data(self._dmatrices, dtrain)
+        logits = self.xgb_logits(preds, dtrain)
+        p = self.softmax(logits, out=self.buffer("p", logits.shape))
+        return 'multiclass_focal_loss', float(np.average(self(y, p), weights=weight))
 
 
 if __name__ == '__main__':
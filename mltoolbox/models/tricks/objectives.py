@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 01:30
+@Author  : itlubber
+@Site    : itlubber.art
+
+LightGBM 和 XGBoost 自定义目标函数，所有二分类目标函数与 FocalLoss 共用 BinaryObjective 的计算流程
+
+>>> loss = WeightedLogLoss(pos_weight=5.)
+>>> model = lgb.train({"objective": loss.lgb_obj, ...}, train_set, feval=loss.lgb_eval, init_score=...)
+>>> booster = xgb.train(params, dtrain, obj=loss.xgb_obj, custom_metric=loss.xgb_eval)
+"""
+import numpy as np
+
+from .base import BinaryObjective
+from .focal_loss import FocalLoss
+
+
+def logloss_point(pt, params):
+    q = 1 - pt
+    return -q, pt * q
+
+
+def smoothing_point(pt, params):
+    return pt - params[0], pt * (1 - pt)
+
+
+class WeightedLogLoss(BinaryObjective):
+    """
+    加权 (非对称) 对数损失，正负样本分别使用不同的权重，常用于坏样本漏判代价远大于误判的信贷场景
+
+    loss = -at * log(pt) ，G = pt - 1 ，H = pt * (1 - pt)
+    """
+
+    name = "weighted_logloss"
+    point = staticmethod(logloss_point)
+
+    def __init__(self, pos_weight=1., neg_weight=1., dtype=np.float64, jit=False):
+        """
+        :param pos_weight: 正样本 (漏判) 的权重，默认 1
+        :param neg_weight: 负样本 (误判) 的权重，默认 1 ，两个权重都为 1 时等价于 binary logloss
+        :param dtype: 计算梯度时使用的精度，默认 np.float64
+        :param jit: 是否使用 numba 编译的并行循环计算梯度，默认 False
+        """
+        super().__init__(dtype=dtype, jit=jit)
+        self.pos_weight = pos_weight
+        self.neg_weight = neg_weight
+
+    def class_weights(self):
+        if self.pos_weight == 1 and self.neg_weight == 1:
+            return None
+        return self.pos_weight, self.neg_weight
+
+    def loss(self, pt):
+        return -np.log(pt)
+
+    def kernel(self, pt, q, grad, hess):
+        np.negative(q, out=grad)
+        np.multiply(pt, q, out=hess)
+
+
+class LabelSmoothingLoss(BinaryObjective):
+    """
+    标签平滑的对数损失，标签由 {0, 1} 平滑为 {smoothing / 2, 1 - smoothing / 2} ，降低对标签噪声和极端预测的过拟合
+
+    记 s = 1 - smoothing / 2 ，loss = -at * (s * log(pt) + (1 - s) * log(1 - pt)) ，G = pt - s ，H = pt * (1 - pt)
+    """
+
+    name = "label_smoothing_logloss"
+    point = staticmethod(smoothing_point)
+
+    def __init__(self, smoothing=0.1, pos_weight=1., neg_weight=1., dtype=np.float64, jit=False):
+        """
+        :param smoothing: 平滑系数，取值范围 [0, 1) ，默认 0.1 ，为 0 时等价于 binary logloss
+        :param pos_weight: 正样本的权重，默认 1
+        :param neg_weight: 负样本的权重，默认 1
+        :param dtype: 计算梯度时使用的精度，默认 np.float64
+        :param jit: 是否使用 numba 编译的并行循环计算梯度，默认 False
+        """
+        if not 0 <= smoothing < 1:
+            raise ValueError("smoothing 的取值范围为 [0, 1)")
+
+        super().__init__(dtype=dtype, jit=jit)
+        self.smoothing = smoothing
+        self.pos_weight = pos_weight
+        self.neg_weight = neg_weight
+
+    @property
+    def target(self):
+        return 1 - self.smoothing / 2
+
+    def class_weights(self):
+        if self.pos_weight == 1 and self.neg_weight == 1:
+            return None
+        return self.pos_weight, self.neg_weight
+
+    def params(self):
+        return (float(self.target),)
+
+    def loss(self, pt):
+        s = self.target
+        return -(s * np.log(pt) + (1 - s) * np.log(1 - pt))
+
+    def kernel(self, pt, q, grad, hess):
+        np.subtract(pt, self.target, out=grad)
+        np.multiply(pt, q, out=hess)
+
+
+class ClassBalancedLoss(FocalLoss):
+    """
+    基于有效样本数的类别平衡损失，类别权重为 (1 - beta) / (1 - beta ** n_c) ，并归一化为权重之和等于类别数，gamma 为 0 时为类别平衡的 logloss
+
+    https://arxiv.org/abs/1901.05555
+
+    未传入 samples_per_class 时使用第一次计算时的标签统计各类别的样本数，即训练集，之后的验证集不会重新统计，需要重新统计时调用 fit
+    """
+
+    name = "class_balanced_loss"
+
+    def __init__(self, beta=0.999, gamma=0., samples_per_class=None, dtype=np.float64, jit=False):
+        """
+        :param beta: 有效样本数的超参数，取值范围 [0, 1) ，越接近 1 对少数类的加权越大，为 0 时不加权
+        :param gamma: focal loss 的聚焦参数，默认 0
+        :param samples_per_class: 负样本和正样本的数量 (n_0, n_1) ，默认 None ，从标签中统计
+        :param dtype: 计算梯度时使用的精度，默认 np.float64
+        :param jit: 是否使用 numba 编译的并行循环计算梯度，默认 False
+        """
+        if not 0 <= beta < 1:
+            raise ValueError("beta 的取值范围为 [0, 1)")
+
+        super().__init__(gamma=gamma, dtype=dtype, jit=jit)
+        self.beta = beta
+        self.samples_per_class = samples_per_class
+        self.weights = None
+        if samples_per_class is not None:
+            self.weights = self.effective_weights(samples_per_class)
+
+    def effective_weights(self, samples_per_class):
+        """
+        根据每个类别的样本数计算类别权重
+
+        :param samples_per_class: 负样本和正样本的数量 (n_0, n_1)
+        :return: (正样本权重, 负样本权重)
+        """
+        n = np.asarray(samples_per_class, dtype=float)
+        weights = (1 - self.beta) / (1 - np.power(self.beta, np.maximum(n, 1)))
+        weights = weights / weights.sum() * len(weights)
+        return float(weights[1]), float(weights[0])
+
+    def fit(self, y_true, sample_weight=None):
+        """
+        根据标签统计各类别的样本数并计算类别权重，样本权重不参与统计
+
+        :param y_true: 标签
+        :param sample_weight: 样本权重，不使用
+        :return: self
+        """
+        positive = np.count_nonzero(np.asarray(y_true) != 0)
+        self.weights = self.effective_weights((len(y_true) - positive, positive))
+        self._labels.clear()
+        return self
+
+    def prepare(self, y_true, sample_weight=None):
+        if self.weights is None:
+            self.fit(y_true, sample_weight)
+
+    def class_weights(self):
+        if self.weights is None:
+            raise ValueError("类别权重未初始化，请先调用 fit 或传入 samples_per_class")
+        return self.weights
+
@@ -4,3 +4,42 @@
 @Author  : itlubber
 @Site    : itlubber.art
 """
+
+import importlib
+
+# 常用接口在第一次访问时才导入所在的模块，例如只使用日志和模型加载的打分进程不会加载 pandas 、 matplotlib 和 openpyxl
+_submodules = ["logger", "profiler", "reader", "setter", "writer", "xlsx"]
+_exports = {
+    "init_logger": "logger",
+    "load_pickle": "reader",
+    "load_artifact": "reader",
+    "read_dataset": "reader",
+    "DatasetReader": "reader",
+    "init_setting": "setter",
+    "seed_everything": "setter",
+    "seed_task": "setter",
+    "task_seed": "setter",
+    "task_rng": "setter",
+    "spawn_seeds": "setter",
+    "worker_initializer": "setter",
+    "register_font": "setter",
+    "profiler": "profiler",
+    "stage": "profiler",
+    "profile": "profiler",
+    "save_pickle": "writer",
+    "save_artifact": "writer",
+    "ExcelWriter": "writer",
+    "dataframe2excel": "writer",
+}
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _exports:
+        return getattr(importlib.import_module(f"{__name__}.{_exports[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | set(_exports))
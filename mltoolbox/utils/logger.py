@@ -7,16 +7,186 @@
 
 import os
 import sys
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+import queue
+import atexit
+import multiprocessing
+from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler, QueueHandler, QueueListener
 from logging import getLogger, StreamHandler, Formatter, DEBUG, INFO, ERROR
 
 
-def init_logger(filename=None, stream=True, fmt="[ %(asctime)s ][ %(levelname)s ][ %(filename)s:%(funcName)s:%(lineno)d ] %(message)s", datefmt=None):
-    logger = getLogger("scorecardpipeline")
+LOGGER_NAME = "scorecardpipeline"
+
+# 异步模式下每个进程只有一个监听线程 {logger 名称: (进程号, 队列, QueueListener)}
+_listeners = {}
+
+
+def handler_key(handler):
+    return getattr(handler, "_mltoolbox_key", None)
+
+
+def installed_handlers(logger):
+    """
+    logger 上以及当前进程的监听线程中已经添加的 handler
+    """
+    handlers = list(logger.handlers)
+    listener = get_listener(logger.name)
+    if listener is not None:
+        handlers.extend(listener[2].handlers)
+    return {handler_key(h): h for h in handlers if handler_key(h) is not None}
+
+
+def get_listener(name=LOGGER_NAME):
+    listener = _listeners.get(name)
+    # fork 出的子进程会继承父进程的监听信息，但监听线程不会被继承
+    if listener is not None and listener[0] != os.getpid():
+        return None
+    return listener
+
+
+def start_listener(logger, multiprocess=False):
+    """
+    为 logger 启动监听线程，logger 只保留一个 QueueHandler ，日志的格式化以外的 IO 全部在监听线程中完成
+
+    :param logger: logging.Logger
+    :param multiprocess: 是否使用 multiprocessing.Queue ，进程池中的子进程可以通过 worker_logger 将日志转发到当前进程
+    :return: (进程号, 队列, QueueListener)
+    """
+    listener = get_listener(logger.name)
+    if listener is not None and (not multiprocess or not isinstance(listener[1], queue.SimpleQueue)):
+        return listener
+
+    handlers = []
+    if listener is not None:
+        # 已有的监听线程使用 queue.SimpleQueue ，子进程无法写入，写出剩余日志后使用 multiprocessing.Queue 重建，handler 保持不变
+        _, _, listener = _listeners.pop(logger.name)
+        listener.stop()
+        handlers.extend(listener.handlers)
+
+    # 移除同步模式添加的 handler 以及从父进程继承的 QueueHandler ，同步模式的 handler 转移到监听线程中
+    for handler in list(logger.handlers):
+        key = handler_key(handler)
+        if key is None:
+            continue
+        logger.removeHandler(handler)
+        if key[0] != "queue":
+            handlers.append(handler)
+
+    records = multiprocessing.Queue(-1) if multiprocess else queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+
+    handler = QueueHandler(records)
+    handler._mltoolbox_key = ("queue",)
+    logger.addHandler(handler)
+
+    _listeners[logger.name] = (os.getpid(), records, listener)
+    return _listeners[logger.name]
+
+
+def stop_logger(name=LOGGER_NAME):
+    """
+    停止异步模式的监听线程，写出队列中剩余的日志并关闭全部 handler ，进程退出时自动调用
+    """
+    listener = get_listener(name)
+    if listener is None:
+        return
+
+    _, records, listener = _listeners.pop(name)
+    listener.stop()
+    logger = getLogger(name)
+    for handler in list(logger.handlers):
+        if handler_key(handler) == ("queue",):
+            logger.removeHandler(handler)
+    for handler in listener.handlers:
+        handler.close()
+    if hasattr(records, "join_thread"):
+        records.close()
+        records.join_thread()
+
+
+@atexit.register
+def stop_loggers():
+    for name in list(_listeners):
+        stop_logger(name)
+
+
+def restore_after_fork():
+    """
+    fork 出的子进程不会继承监听线程，使用 queue.SimpleQueue 的 logger 在子进程中恢复为直接写入 handler ，否则日志只会堆积在队列中；
+    使用 multiprocessing.Queue 的 logger 保留 QueueHandler ，子进程的日志仍然由父进程的监听线程写出
+    """
+    for name, (_, records, listener) in list(_listeners.items()):
+        if not isinstance(records, queue.SimpleQueue):
+            continue
+        _listeners.pop(name)
+        logger = getLogger(name)
+        for handler in list(logger.handlers):
+            if handler_key(handler) == ("queue",):
+                logger.removeHandler(handler)
+        for handler in listener.handlers:
+            logger.addHandler(handler)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restore_after_fork)
+
+
+def logger_queue(name=LOGGER_NAME):
+    """
+    当前进程监听线程的日志队列，作为 worker_logger 的参数传给进程池的 initializer
+
+    >>> logger = init_logger("train.log", asynchronous=True, multiprocess=True)
+    >>> with ProcessPoolExecutor(4, initializer=worker_logger, initargs=(logger_queue(),)) as pool:
+    ...     pool.map(func, tasks)
+    """
+    listener = get_listener(name)
+    return listener[1] if listener is not None else None
+
+
+def worker_logger(records, level=DEBUG, name=LOGGER_NAME):
+    """
+    在子进程中调用，移除子进程中全部 handler 并只保留一个写入 records 的 QueueHandler ，日志由父进程的监听线程统一写出，
+    子进程写日志时只将日志放入队列，不会因为文件锁阻塞，也不会出现多个进程同时轮转同一个日志文件的问题
+
+    :param records: 父进程中 logger_queue 返回的 multiprocessing.Queue
+    :param level: 子进程 logger 的日志级别
+    :param name: logger 名称
+    :return: logging.Logger
+    """
+    logger = getLogger(name)
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    handler = QueueHandler(records)
+    handler._mltoolbox_key = ("queue",)
+    logger.addHandler(handler)
+    return logger
+
+
+def init_logger(filename=None, stream=True, fmt="[ %(asctime)s ][ %(levelname)s ][ %(filename)s:%(funcName)s:%(lineno)d ] %(message)s", datefmt=None, asynchronous=False, multiprocess=False):
+    """
+    初始化日志，重复调用时相同的文件和标准输出只会添加一次
+
+    :param filename: 日志文件路径，默认 None ，不写入文件
+    :param stream: 是否输出到标准输出，默认 True
+    :param fmt: 日志格式
+    :param datefmt: 日期格式
+    :param asynchronous: 是否使用异步模式，日志先放入队列，由单独的监听线程写入文件和标准输出，默认 False ，开启后同一个进程中之后的调用都使用异步模式
+    :param multiprocess: 异步模式下是否使用进程间队列，开启后可以通过 logger_queue 和 worker_logger 让进程池中的子进程将日志转发到当前进程，默认 False
+    :return: logging.Logger
+    """
+    logger = getLogger(LOGGER_NAME)
     logger.setLevel(DEBUG)
     formatter = Formatter(fmt, datefmt=datefmt)
 
-    if filename:
+    if asynchronous:
+        start_listener(logger, multiprocess=multiprocess)
+
+    installed = installed_handlers(logger)
+    handlers = []
+
+    if filename and ("file", os.path.abspath(filename)) not in installed:
         if os.path.dirname(filename) != "" and not os.path.exists(os.path.dirname(filename)):
             try:
                 os.makedirs(os.path.dirname(filename))
@@ -28,15 +198,23 @@ def init_logger(filename=None, stream=True, fmt="[ %(asctime)s ][ %(levelname)s
         fh = RotatingFileHandler(filename=filename, mode='a', maxBytes=10 * 1024 ** 2, backupCount=0, encoding="utf-8")
         fh.setLevel(INFO)
         fh.setFormatter(formatter)
-        logger.addHandler(fh)
-        fh.close()
+        fh._mltoolbox_key = ("file", os.path.abspath(filename))
+        handlers.append(fh)
 
-    if stream:
+    if stream and ("stream",) not in installed:
         ch = StreamHandler(sys.stdout)
         ch.setLevel(INFO)
         ch.setFormatter(formatter)
-        logger.addHandler(ch)
-        ch.close()
+        ch._mltoolbox_key = ("stream",)
+        handlers.append(ch)
+
+    listener = get_listener(logger.name)
+    for handler in handlers:
+        if listener is not None:
+            # 监听线程每处理一条日志都会重新读取 handlers ，整体替换元组不需要停止监听线程
+            listener[2].handlers = listener[2].handlers + (handler,)
+        else:
+            logger.addHandler(handler)
 
     return logger
 
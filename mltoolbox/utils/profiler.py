@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 03:30
+@Author  : itlubber
+@Site    : itlubber.art
+
+按阶段记录耗时、CPU 时间和内存峰值，默认关闭，关闭时 stage 返回同一个空上下文、profile 装饰的函数只多一次属性判断
+
+>>> from mltoolbox.utils.profiler import profiler, stage, profile
+>>> profiler.enable(memory=True)
+>>> with stage("特征工程"):
+...     ...
+>>> @profile("模型训练")
+... def fit(...): ...
+>>> profiler.to_excel("profile.xlsx")
+
+设置环境变量 MLTOOLBOX_PROFILE=1 时在导入时开启
+"""
+
+import os
+import time
+import queue
+import functools
+import threading
+import tracemalloc
+import multiprocessing
+from contextlib import nullcontext
+
+
+COLUMNS = ["stage", "name", "depth", "pid", "thread", "start", "wall", "cpu", "peak_memory"]
+COLUMN_NAMES = {"stage": "阶段", "calls": "调用次数", "wall": "总耗时(秒)", "wall_mean": "平均耗时(秒)", "wall_max": "最大耗时(秒)", "wall_ratio": "耗时占比", "cpu": "CPU时间(秒)", "cpu_ratio": "CPU利用率", "peak_memory": "内存峰值(MiB)", "processes": "进程数", "threads": "线程数"}
+
+_null_stage = nullcontext()
+
+
+class Stage:
+    """
+    单个阶段的计时上下文，嵌套的阶段记录为 父阶段/子阶段 ，内存峰值为阶段内 python 对象相对于阶段开始时的最大增量
+    """
+
+    __slots__ = ("profiler", "name", "path", "depth", "start", "wall", "cpu", "memory", "peak")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler.stack()
+        parent = stack[-1] if stack else None
+        self.path = f"{parent.path}/{self.name}" if parent else self.name
+        self.depth = len(stack)
+
+        if self.profiler.memory and tracemalloc.is_tracing():
+            # reset_peak 是全局的，重置前先把当前峰值记到父阶段上
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.peak = max(parent.peak, peak)
+            # python 3.9 之前没有 reset_peak ，峰值为开始记录以来的累计峰值，阶段的内存峰值可能偏大
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            self.memory = self.peak = current
+        else:
+            self.memory = None
+
+        stack.append(self)
+        self.start = time.time()
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        stack = self.profiler.stack()
+        stack.pop()
+
+        peak_memory = float("nan")
+        if self.memory is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(self.peak, peak)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            peak_memory = (peak - self.memory) / 1024 ** 2
+
+        self.profiler.add((self.path, self.name, self.depth, os.getpid(), threading.current_thread().name, self.start, wall, cpu, peak_memory))
+        return False
+
+
+class Profiler:
+    """
+    收集各阶段的耗时、CPU 时间 (当前线程) 和内存峰值 (tracemalloc ，开启后有额外开销)，多个线程的记录直接汇总，
+    进程池中的子进程通过 worker_profiler 将记录发送到父进程，父进程调用 collect 汇总
+    """
+
+    def __init__(self, enabled=False, memory=False):
+        """
+        :param enabled: 是否开启，默认 False
+        :param memory: 是否记录内存峰值，默认 False
+        """
+        self.enabled = False
+        self.memory = False
+        self.records = []
+        self.queue = None
+        self._queue_owner = None
+        self._local = threading.local()
+        self._tracing = False
+        if enabled:
+            self.enable(memory=memory)
+
+    def enable(self, memory=False, multiprocess=False):
+        """
+        开启记录
+
+        :param memory: 是否使用 tracemalloc 记录内存峰值，默认 False
+        :param multiprocess: 是否创建进程间队列，通过 worker_profiler 收集进程池中子进程的记录，默认 False
+        :return: self
+        """
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        if multiprocess and self.queue is None:
+            self.queue = multiprocessing.Queue(-1)
+            self._queue_owner = os.getpid()
+        self.memory = memory
+        self.enabled = True
+        return self
+
+    def disable(self):
+        """
+        关闭记录，已有的记录保留
+        """
+        self.enabled = False
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        return self
+
+    def reset(self):
+        self.collect()
+        self.records = []
+        return self
+
+    def stack(self):
+        # fork 出的子进程会继承父进程线程的调用栈，进程号不同时重新开始
+        pid, stack = getattr(self._local, "stack", (None, None))
+        if pid != os.getpid():
+            stack = []
+            self._local.stack = (os.getpid(), stack)
+        return stack
+
+    def add(self, record):
+        # list.append 是线程安全的，子进程 (包括 fork 出的进程) 中写入队列由父进程汇总
+        if self.queue is not None and self._queue_owner != os.getpid():
+            self.queue.put(record)
+        else:
+            self.records.append(record)
+
+    def stage(self, name):
+        """
+        记录一个阶段的上下文，关闭时返回空上下文
+
+        :param name: 阶段名称
+        """
+        if not self.enabled:
+            return _null_stage
+        return Stage(self, name)
+
+    def profile(self, name=None):
+        """
+        记录函数耗时的装饰器，可以直接使用 @profile 或者 @profile("阶段名称")，默认使用函数的 __qualname__
+        """
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Stage(self, label):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        if callable(name):
+            func, name = name, None
+            return decorator(func)
+
+        return decorator
+
+    def collect(self):
+        """
+        读取子进程发送到队列中的记录
+
+        :return: 全部记录
+        """
+        if self.queue is not None:
+            while True:
+                try:
+                    self.records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+        return self.records
+
+    def merge(self, records):
+        """
+        合并其他进程导出的记录，例如子进程返回的 profiler.records
+        """
+        self.records.extend(tuple(r) for r in records)
+        return self
+
+    def to_frame(self, aggregate=True):
+        """
+        导出为 DataFrame
+
+        :param aggregate: 是否按阶段汇总，默认 True ，False 时返回每次调用的明细
+        :return: pd.DataFrame ，汇总结果按阶段第一次开始的时间排序，wall_ratio 为相对于全部最外层阶段总耗时的占比
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame(self.collect(), columns=COLUMNS)
+        if not aggregate:
+            return frame
+
+        total = frame.loc[frame["depth"] == 0, "wall"].sum()
+        frame = frame.groupby("stage", sort=False).agg(
+            start=("start", "min"), calls=("wall", "size"), wall=("wall", "sum"), wall_mean=("wall", "mean"), wall_max=("wall", "max"),
+            cpu=("cpu", "sum"), peak_memory=("peak_memory", "max"), processes=("pid", "nunique"), threads=("thread", "nunique"),
+        )
+        frame["wall_ratio"] = frame["wall"] / total if total > 0 else float("nan")
+        frame["cpu_ratio"] = frame["cpu"] / frame["wall"].where(frame["wall"] > 0)
+        frame = frame.sort_values("start").drop(columns="start").reset_index()
+        return frame[["stage", "calls", "wall", "wall_mean", "wall_max", "wall_ratio", "cpu", "cpu_ratio", "peak_memory", "processes", "threads"]]
+
+    def to_excel(self, excel_writer, sheet_name="性能分析", title="各阶段耗时及内存峰值", **kwargs):
+        """
+        将汇总结果通过 dataframe2excel 写入报告
+
+        :param excel_writer: excel 文件路径或者 ExcelWriter
+        :param sheet_name: sheet 名称
+        :param title: 标题
+        :param kwargs: 透传至 dataframe2excel 的参数
+        :return: dataframe2excel 的返回值
+        """
+        from .writer import dataframe2excel
+
+        frame = self.to_frame().rename(columns=COLUMN_NAMES)
+        params = dict(percent_cols=["耗时占比", "CPU利用率"], condition_cols=["总耗时(秒)"], custom_cols=["总耗时(秒)", "平均耗时(秒)", "最大耗时(秒)", "CPU时间(秒)", "内存峰值(MiB)"], custom_format="0.000")
+        params.update(kwargs)
+        return dataframe2excel(frame, excel_writer, sheet_name=sheet_name, title=title, **params)
+
+
+def worker_profiler(records, memory=False, target=None):
+    """
+    进程池的 initializer ，在子进程中开启记录，记录写入父进程 profiler.queue ，由父进程的 collect 汇总
+
+    >>> profiler.enable(multiprocess=True)
+    >>> with ProcessPoolExecutor(4, initializer=worker_profiler, initargs=(profiler.queue,)) as pool:
+    ...     pool.map(func, tasks)
+    >>> profiler.to_frame()
+
+    :param records: 父进程的 profiler.queue
+    :param memory: 子进程中是否记录内存峰值
+    :param target: 子进程中使用的 Profiler ，默认模块级别的 profiler
+    """
+    target = target or profiler
+    target.queue = records
+    target._queue_owner = None
+    target.records = []
+    target.enable(memory=memory)
+    return target
+
+
+profiler = Profiler(enabled=os.environ.get("MLTOOLBOX_PROFILE", "0") not in ("", "0"))
+stage = profiler.stage
+profile = profiler.profile
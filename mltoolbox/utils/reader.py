@@ -5,8 +5,478 @@
 @Site    : itlubber.art
 """
 
-import joblib
+import os
+import io
+import pickle
+
+
+ARTIFACT_MAGIC = b"MLTA\x01"
+ARTIFACT_COMPRESSORS = ["none", "zlib", "gzip", "bz2", "lzma"]
+
+# 进程内已加载的 artifact 和内存映射的数组 {(文件路径, 修改时间): 对象}
+_artifacts = {}
+_arrays = {}
 
 
 def load_pickle(file):
+    # joblib 的导入耗时较长，只在加载时导入
+    import joblib
+
     return joblib.load(file)
+
+
+def artifact_path(store, key):
+    """
+    artifact 的文件路径，按照哈希值的前两位分目录保存
+
+    :param store: artifact 仓库的根目录
+    :param key: save_artifact 返回的哈希值
+    """
+    return os.path.join(store, "objects", key[:2], key)
+
+
+def array_path(store, key):
+    """
+    单独保存的大数组的文件路径，按照数组内容的哈希值命名，多个 artifact 中相同的数组只保存一份
+    """
+    return os.path.join(store, "arrays", key[:2], f"{key}.npy")
+
+
+def decompress_bytes(method, content):
+    if method == "none":
+        return content
+    if method == "zlib":
+        import zlib
+        return zlib.decompress(content)
+    if method == "gzip":
+        import gzip
+        return gzip.decompress(content)
+    if method == "bz2":
+        import bz2
+        return bz2.decompress(content)
+    import lzma
+    return lzma.decompress(content)
+
+
+class ArtifactUnpickler(pickle.Unpickler):
+    """
+    加载 artifact 时将单独保存的数组还原为只读的内存映射，多个进程打开同一个文件时共享操作系统的页缓存
+    """
+
+    def __init__(self, file, store, mmap_mode="r", cache=True):
+        super().__init__(file)
+        self.store = store
+        self.mmap_mode = mmap_mode
+        self.cache = cache
+
+    def persistent_load(self, pid):
+        kind, key = pid
+        if kind != "ndarray":
+            raise pickle.UnpicklingError(f"不支持的外部对象类型: {kind}")
+        return load_array(self.store, key, mmap_mode=self.mmap_mode, cache=self.cache)
+
+
+def load_array(store, key, mmap_mode="r", cache=True):
+    import numpy as np
+
+    path = array_path(store, key)
+    if not cache:
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    cache_key = (path, os.stat(path).st_mtime_ns, mmap_mode)
+    if cache_key not in _arrays:
+        _arrays[cache_key] = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    return _arrays[cache_key]
+
+
+def load_artifact(key, store, mmap_mode="r", cache=True):
+    """
+    加载 save_artifact 保存的对象，同一个进程中按照哈希值和文件修改时间缓存，重复加载直接返回同一个对象
+
+    :param key: save_artifact 返回的哈希值
+    :param store: artifact 仓库的根目录
+    :param mmap_mode: 单独保存的大数组的打开方式，默认 r ，即只读的内存映射，为 None 时读入内存
+    :param cache: 是否使用进程内缓存，默认 True ，临时目录中的 artifact 应当关闭缓存，避免删除目录后缓存仍然持有内存映射
+    :return: 保存的对象，开启缓存时多次加载返回同一个对象，不要原地修改
+    """
+    path = artifact_path(store, key)
+    cache_key = (path, os.stat(path).st_mtime_ns, mmap_mode)
+    if cache and cache_key in _artifacts:
+        return _artifacts[cache_key]
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    if not content.startswith(ARTIFACT_MAGIC):
+        raise ValueError(f"不是有效的 artifact 文件: {path}")
+
+    method = ARTIFACT_COMPRESSORS[content[len(ARTIFACT_MAGIC)]]
+    content = decompress_bytes(method, memoryview(content)[len(ARTIFACT_MAGIC) + 1:])
+    obj = ArtifactUnpickler(io.BytesIO(content), store, mmap_mode=mmap_mode, cache=cache).load()
+
+    if cache:
+        _artifacts[cache_key] = obj
+    return obj
+
+
+def clear_artifact_cache():
+    """
+    清空进程内缓存的 artifact 和内存映射
+    """
+    _artifacts.clear()
+    _arrays.clear()
+
+
+DATASET_FORMATS = {".csv": "csv", ".txt": "csv", ".gz": "csv", ".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather"}
+FILTER_OPERATORS = {
+    "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+    ">": lambda s, v: s > v, ">=": lambda s, v: s >= v, "<": lambda s, v: s < v, "<=": lambda s, v: s <= v,
+    "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def filter_frame(data, filters):
+    """
+    按条件筛选行
+
+    :param data: pd.DataFrame
+    :param filters: 筛选条件，可以是返回布尔掩码的函数、DataFrame.query 的表达式或者 [(列名, 操作符, 值), ...] ，多个条件之间为且的关系，操作符可选 ==、!=、>、>=、<、<=、in、not in
+    :return: 筛选后的 pd.DataFrame
+    """
+    if filters is None:
+        return data
+    if callable(filters):
+        return data[filters(data)]
+    if isinstance(filters, str):
+        return data.query(filters)
+
+    mask = None
+    for column, operator, value in filters:
+        condition = FILTER_OPERATORS[operator](data[column], value)
+        mask = condition if mask is None else mask & condition
+    return data if mask is None else data[mask]
+
+
+def smallest_int_dtype(lower, upper):
+    import numpy as np
+
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lower and upper <= info.max:
+            return np.dtype(dtype)
+    return None
+
+
+def categorical_object_memory(series):
+    """
+    由 category 列反推其转换前 object 列的深度内存占用，与 memory_usage(deep=True) 的统计口径一致：每行一个指针加上每个元素对象的大小，缺失值为 float nan
+
+    :param series: category 类型的 pd.Series
+    :return: int
+    """
+    import numpy as np
+
+    categories = series.cat.categories
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes.astype(np.int64) + 1, minlength=len(categories) + 1)
+    sizes = np.array([float("nan").__sizeof__()] + [value.__sizeof__() for value in categories], dtype=np.int64)
+    return int(codes.size * np.dtype(object).itemsize + counts @ sizes)
+
+
+class ColumnStats:
+    """
+    单列的统计信息，分块读取时逐块更新，用于推断所有块统一使用的最小安全数据类型
+    """
+
+    __slots__ = ("dtype", "rows", "nulls", "lower", "upper", "integral", "float32", "values", "strings")
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.rows = 0
+        self.nulls = 0
+        self.lower = None
+        self.upper = None
+        self.integral = True
+        self.float32 = True
+        self.values = set()
+        self.strings = True
+
+    def promote(self, dtype):
+        """
+        各块的数据类型可能不同，例如缺失值在后面的块中才出现的整数列、前面的块全部缺失 (读取为 float64) 的字符串列，
+        数值类型之间按照 np.result_type 提升，其余情况提升为 object
+        """
+        import numpy as np
+
+        if self.dtype == dtype:
+            return
+        if self.dtype.kind in "iuf" and dtype.kind in "iuf":
+            self.dtype = np.result_type(self.dtype, dtype)
+        else:
+            self.dtype = np.dtype(object)
+
+    def update(self, series, max_categories):
+        import numpy as np
+
+        self.rows += len(series)
+        self.promote(series.dtype)
+        kind = series.dtype.kind
+
+        if kind in "iuf":
+            values = series.to_numpy()
+            mask = np.isnan(values) if kind == "f" else None
+            finite = values[~mask] if mask is not None else values
+            self.nulls += int(mask.sum()) if mask is not None else 0
+            if len(finite):
+                lower, upper = finite.min(), finite.max()
+                self.lower = lower if self.lower is None else min(self.lower, lower)
+                self.upper = upper if self.upper is None else max(self.upper, upper)
+                # 与字符串混合的列不是纯字符串列
+                self.strings = self.strings and self.dtype.kind != "O"
+            with np.errstate(all="ignore"):
+                if kind == "f":
+                    self.integral = self.integral and bool(np.all(np.mod(finite, 1) == 0))
+                # 整数块也需要检查，后续块提升为浮点数时超过 2 ** 24 的整数不能无损转为 float32
+                self.float32 = self.float32 and bool(np.array_equal(values.astype(np.float32).astype(values.dtype), values, equal_nan=kind == "f"))
+        elif kind == "O" and self.strings:
+            self.nulls += int(series.isna().sum())
+            self.strings = self.lower is None
+            if self.strings and len(self.values) <= max_categories:
+                values = series.dropna().unique()
+                self.strings = all(isinstance(v, str) for v in values)
+                self.values.update(values)
+
+    def infer(self, categorical_ratio=0.5, max_categories=1024, float32=False):
+        """
+        推断最小的安全数据类型，无法转换时返回 None
+
+        整数列使用能容纳最小值和最大值的最小整数类型，取值全为整数且没有缺失值的浮点列转为整数，能够无损转换为 float32 的浮点列转为 float32 ，
+        不同取值数量不超过 max_categories 且不超过总行数 categorical_ratio 倍的字符串列转为 category
+        """
+        import numpy as np
+        import pandas as pd
+
+        kind = self.dtype.kind
+        if kind in "iu" and self.nulls == 0:
+            return smallest_int_dtype(self.lower, self.upper) if self.lower is not None else np.dtype(np.int8)
+
+        if kind == "f":
+            if self.lower is not None and self.integral and self.nulls == 0:
+                dtype = smallest_int_dtype(self.lower, self.upper)
+                if dtype is not None:
+                    return dtype
+            if self.dtype != np.float32 and (self.float32 or float32):
+                return np.dtype(np.float32)
+            return None
+
+        if kind == "O" and self.strings and len(self.values) <= max_categories and len(self.values) <= categorical_ratio * max(self.rows - self.nulls, 1):
+            return pd.CategoricalDtype(sorted(self.values))
+
+        return None
+
+
+class DatasetReader:
+    """
+    读取 csv、parquet 和 feather 数据集，支持列投影、行筛选、按固定行数分块读取，并将数值列转为最小的安全数据类型、低基数字符串列转为 category
+
+    >>> reader = DatasetReader("data.csv", columns=["id", "score", "city"], filters=[("score", ">", 0)], chunk_size=100000)
+    >>> for chunk in reader:
+    ...     ...
+    >>> reader.report
+
+    分块读取时所有块使用相同的数据类型和类别，未传入 dtypes 时先完整扫描一遍数据推断数据类型，之后可以将 reader.dtypes 传给其他 reader 复用；
+    parquet 和 feather 需要安装 pyarrow
+    """
+
+    def __init__(self, path, columns=None, filters=None, chunk_size=None, downcast=True, categorical_ratio=0.5, max_categories=1024, float32=False, dtypes=None, format=None, **kwargs):
+        """
+        :param path: 数据集路径
+        :param columns: 需要读取的列，默认 None ，读取全部列
+        :param filters: 行筛选条件，参考 filter_frame
+        :param chunk_size: 每块的行数，默认 None ，一次读取全部数据，筛选后的数据会重新按照 chunk_size 分块，除最后一块外每块行数相同
+        :param downcast: 是否转换数据类型，默认 True
+        :param categorical_ratio: 不同取值数量不超过非空行数的该比例时字符串列转为 category ，默认 0.5
+        :param max_categories: 转为 category 的字符串列最多的不同取值数量，默认 1024
+        :param float32: 是否将所有浮点列转为 float32 ，默认 False ，只转换能够无损转换的列
+        :param dtypes: 指定的数据类型 {列名: 数据类型}，分块读取时跳过扫描
+        :param format: 文件格式，可选 csv、parquet、feather ，默认根据文件后缀判断
+        :param kwargs: 透传至 pd.read_csv 的参数
+        """
+        self.path = path
+        self.columns = columns
+        self.filters = filters
+        self.chunk_size = chunk_size
+        self.downcast = downcast
+        self.categorical_ratio = categorical_ratio
+        self.max_categories = max_categories
+        self.float32 = float32
+        self.dtypes = dtypes
+        self.format = format or DATASET_FORMATS.get(os.path.splitext(str(path))[1].lower(), "csv")
+        self.kwargs = kwargs
+        self.memory = {}
+        self.converted = None
+
+        if self.format not in ("csv", "parquet", "feather"):
+            raise ValueError("format 可选 csv、parquet、feather")
+
+    def raw_chunks(self):
+        """
+        按文件格式读取原始数据块，只读取 columns 中的列
+        """
+        import pandas as pd
+
+        if self.format == "csv":
+            if self.chunk_size is None:
+                yield pd.read_csv(self.path, usecols=self.columns, **self.kwargs)
+            else:
+                yield from pd.read_csv(self.path, usecols=self.columns, chunksize=self.chunk_size, **self.kwargs)
+            return
+
+        if self.format == "parquet":
+            if self.chunk_size is None:
+                yield pd.read_parquet(self.path, columns=self.columns)
+            else:
+                import pyarrow.parquet as pq
+
+                for batch in pq.ParquetFile(self.path).iter_batches(batch_size=self.chunk_size, columns=self.columns):
+                    yield batch.to_pandas()
+            return
+
+        import pyarrow.feather as feather
+
+        table = feather.read_table(self.path, columns=self.columns, memory_map=True)
+        if self.chunk_size is None:
+            yield table.to_pandas()
+        else:
+            for batch in table.to_batches(max_chunksize=self.chunk_size):
+                yield batch.to_pandas()
+
+    def filtered_chunks(self):
+        for chunk in self.raw_chunks():
+            yield filter_frame(chunk, self.filters)
+
+    def infer_dtypes(self, chunks=None):
+        """
+        扫描数据推断每列的数据类型，分块读取时逐块统计，内存中只保留当前块
+
+        :param chunks: 需要统计的数据块，默认 None ，完整读取一遍数据集
+        :return: {列名: 数据类型}，不需要转换的列不在结果中
+        """
+        stats = {}
+        for chunk in (self.filtered_chunks() if chunks is None else chunks):
+            for column, series in chunk.items():
+                if column not in stats:
+                    stats[column] = ColumnStats(series.dtype)
+                stats[column].update(series, self.max_categories)
+
+        dtypes = {column: stat.infer(self.categorical_ratio, self.max_categories, self.float32) for column, stat in stats.items()}
+        return {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+
+    def convert(self, chunk):
+        """
+        按照 dtypes 转换数据类型，并累计转换前后每列的内存占用
+
+        字符串列的深度内存统计需要逐个访问对象，转为 category 的列根据类别的出现次数计算原始内存占用，未转换的列只统计一次
+        """
+        dtypes = {c: d for c, d in (self.dtypes or {}).items() if c in chunk.columns and chunk[c].dtype != d}
+        converted = chunk.astype(dtypes, copy=False) if dtypes else chunk
+        after = converted.memory_usage(index=False, deep=True)
+
+        for column in chunk.columns:
+            memory = int(after[column])
+            if column not in dtypes:
+                before = memory
+            elif chunk[column].dtype.kind == "O" and converted[column].dtype.name == "category":
+                before = categorical_object_memory(converted[column])
+            else:
+                before = int(chunk[column].memory_usage(index=False, deep=True))
+
+            original, total = self.memory.get(column, (0, 0))
+            self.memory[column] = (original + before, total + memory)
+        self.converted = converted.dtypes
+        return converted
+
+    def rechunk(self, chunks):
+        """
+        将筛选后行数不一的数据块重新按照 chunk_size 分块
+        """
+        import pandas as pd
+
+        buffer, rows = [], 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            rows += len(chunk)
+            while rows >= self.chunk_size:
+                data = pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+                yield data.iloc[:self.chunk_size]
+                rest = data.iloc[self.chunk_size:]
+                buffer, rows = ([rest], len(rest)) if len(rest) else ([], 0)
+
+        if rows:
+            yield pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+
+    def __iter__(self):
+        if self.chunk_size is None:
+            yield self.read()
+            return
+
+        self.memory = {}
+        if self.downcast and self.dtypes is None:
+            self.dtypes = self.infer_dtypes()
+
+        for chunk in self.rechunk(self.filtered_chunks()):
+            yield self.convert(chunk) if self.downcast else chunk
+
+    def read(self):
+        """
+        读取全部数据
+
+        :return: pd.DataFrame
+        """
+        import pandas as pd
+
+        if self.chunk_size is not None:
+            chunks = list(self)
+            return pd.concat(chunks) if chunks else pd.DataFrame(columns=self.columns)
+
+        self.memory = {}
+        data = next(self.filtered_chunks())
+        if not self.downcast:
+            return data
+
+        if self.dtypes is None:
+            self.dtypes = self.infer_dtypes([data])
+
+        return self.convert(data)
+
+    @property
+    def report(self):
+        """
+        每列转换前后的内存占用，最后一行为合计
+
+        :return: pd.DataFrame ，包含 column、dtype、original_memory、memory、saved、saved_ratio
+        """
+        import pandas as pd
+
+        dtypes = self.converted if self.converted is not None else {}
+        report = pd.DataFrame([(column, str(dtypes.get(column, "")), original, memory) for column, (original, memory) in self.memory.items()], columns=["column", "dtype", "original_memory", "memory"])
+        total = pd.DataFrame([("合计", "", report["original_memory"].sum(), report["memory"].sum())], columns=report.columns)
+        report = pd.concat([report, total], ignore_index=True)
+        report["saved"] = report["original_memory"] - report["memory"]
+        report["saved_ratio"] = report["saved"] / report["original_memory"].where(report["original_memory"] > 0)
+        return report
+
+
+def read_dataset(path, columns=None, filters=None, chunk_size=None, **kwargs):
+    """
+    读取数据集，参考 DatasetReader
+
+    :param path: 数据集路径
+    :param columns: 需要读取的列
+    :param filters: 行筛选条件
+    :param chunk_size: 每块的行数，默认 None ，返回 pd.DataFrame ，否则返回数据块的迭代器
+    :param kwargs: 透传至 DatasetReader 的参数
+    :return: pd.DataFrame 或者数据块的迭代器
+    """
+    reader = DatasetReader(path, columns=columns, filters=filters, chunk_size=chunk_size, **kwargs)
+    return reader.read() if chunk_size is None else iter(reader)
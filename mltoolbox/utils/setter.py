@@ -10,13 +10,18 @@ import warnings
 warnings.filterwarnings("ignore")
 
 import os
+import json
+import zlib
 import random
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
 
-from .utils.logger import init_logger
+from .logger import init_logger
+
+
+FONT_URL = "https://itlubber.art/upload/matplot_chinese.ttf"
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matplot_chinese.ttf')
+
+# 当前进程中已注册的字体 {字体路径: 字体名称}
+_registered_fonts = {}
 
 
 def seed_torch(seed):
@@ -39,6 +44,8 @@ def seed_tensorflow(seed):
 
 
 def seed_everything(seed: int, freeze_torch=False, freeze_tf=False):
+    import numpy as np
+
     random.seed(seed)
     os.environ['PYTHONHASHSEED'] = str(seed)
     np.random.seed(seed)
@@ -50,9 +57,175 @@ def seed_everything(seed: int, freeze_torch=False, freeze_tf=False):
         seed_tensorflow(seed)
 
 
+def seed_sequence(seed, *key):
+    """
+    根据主种子和任务标识生成 np.random.SeedSequence ，同一个主种子下不同任务的随机数序列相互独立，且与任务在哪个进程或线程中执行无关
+
+    :param seed: 主种子，为 None 时使用系统熵
+    :param key: 任务标识，例如 ("cv", fold) 、 ("bagging", i) ，字符串使用 crc32 转为整数，保证在不同进程中一致
+    :return: np.random.SeedSequence
+    """
+    import numpy as np
+
+    spawn_key = tuple(zlib.crc32(str(k).encode("utf-8")) if not isinstance(k, (int, np.integer)) else int(k) for k in key)
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(seed.entropy, spawn_key=tuple(seed.spawn_key) + spawn_key, pool_size=seed.pool_size)
+    return np.random.SeedSequence(seed, spawn_key=spawn_key)
+
+
+def task_seed(seed, *key):
+    """
+    根据主种子和任务标识生成 32 位整数种子，可以直接传给 random_state 参数或 seed_everything
+
+    :param seed: 主种子
+    :param key: 任务标识
+    :return: 0 到 2 ** 32 - 1 之间的整数
+    """
+    return int(seed_sequence(seed, *key).generate_state(1)[0])
+
+
+def spawn_seeds(seed, n, *key):
+    """
+    生成 n 个相互独立的子种子，第 i 个子种子等于 task_seed(seed, *key, i)
+
+    :param seed: 主种子
+    :param n: 子种子数量
+    :param key: 任务标识
+    :return: 整数种子列表
+    """
+    return [task_seed(seed, *key, i) for i in range(n)]
+
+
+def task_rng(seed, *key):
+    """
+    根据主种子和任务标识生成独立的 np.random.Generator ，线程池中的任务不能使用全局随机状态，需要使用各自的 Generator
+
+    :param seed: 主种子
+    :param key: 任务标识
+    :return: np.random.Generator
+    """
+    import numpy as np
+
+    return np.random.default_rng(seed_sequence(seed, *key))
+
+
+def seed_task(seed, *key, freeze_torch=False, freeze_tf=False):
+    """
+    在任务开始时调用，使用任务对应的子种子设置 random 、 numpy 、 torch 和 tensorflow 的全局随机状态，任务的结果只与主种子和任务标识有关
+
+    :param seed: 主种子
+    :param key: 任务标识
+    :param freeze_torch: 是否设置 torch 的随机种子
+    :param freeze_tf: 是否设置 tensorflow 的随机种子
+    :return: 任务的子种子
+    """
+    child = task_seed(seed, *key)
+    seed_everything(child, freeze_torch=freeze_torch, freeze_tf=freeze_tf)
+    return child
+
+
+def worker_initializer(seed, freeze_torch=False, freeze_tf=False):
+    """
+    进程池的 initializer ，使用进程编号对应的子种子设置每个工作进程的全局随机状态，避免 fork 出的工作进程重复同一个随机数序列
+
+    >>> with ProcessPoolExecutor(4, initializer=worker_initializer, initargs=(42,)) as pool:
+    ...     pool.map(func, tasks)
+
+    进程编号只能保证各进程的随机数序列相互独立，任务分配到哪个进程与调度有关，需要逐位一致的结果时在任务中调用 seed_task 或使用 task_rng
+
+    :param seed: 主种子
+    :param freeze_torch: 是否设置 torch 的随机种子
+    :param freeze_tf: 是否设置 tensorflow 的随机种子
+    :return: 工作进程的子种子
+    """
+    import multiprocessing
+
+    identity = multiprocessing.current_process()._identity or (os.getpid(),)
+    return seed_task(seed, "worker", *identity, freeze_torch=freeze_torch, freeze_tf=freeze_tf)
+
+
+def font_cache_file():
+    """
+    字体注册信息的缓存文件，位于 matplotlib 的缓存目录下
+    """
+    import matplotlib
+
+    return os.path.join(matplotlib.get_cachedir(), "mltoolbox_fonts.json")
+
+
+def load_font_cache(cache_file):
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_font_cache(cache, cache_file):
+    # 先写临时文件再替换，多个进程同时启动时不会读到写了一半的文件，缓存目录不可写时忽略
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+
+
+def register_font(font_path=None, cache_file=None, download=True):
+    """
+    向 matplotlib 注册字体并返回字体名称
+
+    第一次注册时解析字体文件，并将字体属性按照字体路径、修改时间和文件大小缓存到本地，之后的进程直接使用缓存的属性注册，不再打开字体文件；
+    同一个进程中重复调用直接返回，只有内置的中文字体不存在时才会从网络下载
+
+    :param font_path: 字体文件路径，默认使用内置的中文字体
+    :param cache_file: 字体注册信息的缓存文件，默认位于 matplotlib 的缓存目录下
+    :param download: 内置的中文字体不存在时是否下载，默认 True
+    :return: 字体名称
+    """
+    font_path = os.path.abspath(font_path or FONT_PATH)
+    if font_path in _registered_fonts:
+        return _registered_fonts[font_path]
+
+    from matplotlib import font_manager
+
+    if not os.path.isfile(font_path):
+        if font_path != FONT_PATH or not download:
+            raise FileNotFoundError(f"字体文件不存在: {font_path}")
+
+        import wget
+        font_path = os.path.abspath(wget.download(FONT_URL, FONT_PATH))
+
+    cache_file = cache_file or font_cache_file()
+    cache = load_font_cache(cache_file)
+    stat = os.stat(font_path)
+    key = [stat.st_mtime_ns, stat.st_size]
+
+    entry = cache.get(font_path)
+    if entry and entry.get("key") == key:
+        font = font_manager.FontEntry(**entry["font"])
+    else:
+        font = font_manager.ttfFontProperty(font_manager.ft2font.FT2Font(font_path))
+        cache[font_path] = {"key": key, "font": {name: getattr(font, name) for name in ("fname", "name", "style", "variant", "weight", "stretch", "size")}}
+        save_font_cache(cache, cache_file)
+
+    fname = os.path.normcase(font_path)
+    if not any(os.path.normcase(f.fname) == fname for f in font_manager.fontManager.ttflist):
+        font_manager.fontManager.ttflist.append(font)
+        font_manager.fontManager._findfont_cached.cache_clear()
+
+    _registered_fonts[font_path] = font.name
+    return font.name
+
+
 def init_setting(font_path=None, seed=None, freeze_torch=False, freeze_tf=False, logger=False, **kwargs):
     warnings.filterwarnings("ignore")
 
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
     pd.options.display.float_format = '{:.4f}'.format
     pd.set_option("display.max_colwidth", 300)
 
@@ -61,21 +234,7 @@ def init_setting(font_path=None, seed=None, freeze_torch=False, freeze_tf=False,
     else:
         plt.style.use('seaborn-v0_8-ticks')
 
-    font_path = font_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matplot_chinese.ttf')
-
-    if font_path.lower() in [font.fname.lower() for font in font_manager.fontManager.ttflist]:
-        plt.rcParams['font.family'] = font_path
-    else:
-        if not os.path.isfile(font_path):
-            import wget
-            font_path = wget.download(
-                "https://itlubber.art/upload/matplot_chinese.ttf"
-                , os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matplot_chinese.ttf')
-            )
-
-        font_manager.fontManager.addfont(font_path)
-        plt.rcParams['font.family'] = font_manager.FontProperties(fname=font_path).get_name()
-
+    plt.rcParams['font.family'] = register_font(font_path)
     plt.rcParams['axes.unicode_minus'] = False
 
     if seed:
@@ -7,38 +7,272 @@
 
 import re
 import os
-import json
+import pickle
+import hashlib
+import threading
+from copy import copy
+from io import BytesIO
+from itertools import chain, islice
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 import joblib
+from joblib import Parallel, delayed
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from PIL import Image as PILImage
 
 from openpyxl.cell.cell import Cell
 from openpyxl.drawing.image import Image
 from openpyxl import load_workbook, Workbook
 from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.utils.dataframe import dataframe_to_rows, expand_index
 from openpyxl.formatting.rule import DataBarRule, ColorScaleRule
-from openpyxl.utils import get_column_letter, column_index_from_string
+from openpyxl.utils import get_column_letter, column_index_from_string, coordinate_to_tuple, range_boundaries
 from openpyxl.styles import NamedStyle, Border, Side, Alignment, PatternFill, Font
 
+from .profiler import profile
+from .reader import ARTIFACT_MAGIC, ARTIFACT_COMPRESSORS, artifact_path, array_path
+from .xlsx import append_workbook, concat_workbooks, save_workbook
+
 
 def save_pickle(obj, file):
     joblib.dump(obj, file)
 
 
+def write_atomic(path, content):
+    # 先写临时文件再替换，多个进程同时保存同一个 artifact 时不会读到写了一半的文件
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        if callable(content):
+            content(f)
+        else:
+            f.write(content)
+    os.replace(tmp, path)
+
+
+def compress_bytes(method, level, content):
+    if method == "none":
+        return content
+    if method == "zlib":
+        import zlib
+        return zlib.compress(content, level)
+    if method == "gzip":
+        import gzip
+        return gzip.compress(content, level, mtime=0)
+    if method == "bz2":
+        import bz2
+        return bz2.compress(content, level)
+    import lzma
+    return lzma.compress(content, preset=level)
+
+
+def array_digest(array):
+    """
+    数组内容的哈希值，包含数据类型和形状
+    """
+    digest = hashlib.sha1(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(memoryview(np.ascontiguousarray(array)).cast("B"))
+    return digest.hexdigest()
+
+
+class ArtifactPickler(pickle.Pickler):
+    """
+    保存 artifact 时将不小于 mmap_threshold 字节的数组单独保存为 .npy 文件，pickle 中只保留数组的哈希值
+    """
+
+    def __init__(self, file, store, mmap_threshold=1024 ** 2):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.store = store
+        self.mmap_threshold = mmap_threshold
+
+    def persistent_id(self, obj):
+        if type(obj) not in (np.ndarray, np.memmap) or obj.dtype.hasobject or obj.nbytes < self.mmap_threshold:
+            return None
+
+        key = array_digest(obj)
+        path = array_path(self.store, key)
+        if not os.path.exists(path):
+            write_atomic(path, lambda f: np.save(f, np.asarray(obj), allow_pickle=False))
+        return "ndarray", key
+
+
+def save_artifact(obj, store, compress=3, mmap_threshold=1024 ** 2):
+    """
+    按内容哈希保存对象，内容相同的对象只保存一份，返回的哈希值用于 load_artifact 加载
+
+    不小于 mmap_threshold 字节的 numpy 数组 (包括 DataFrame 内部的数组) 不压缩，单独保存为按内容哈希命名的 .npy 文件，加载时以只读的内存映射打开，
+    多个打分进程加载同一个模型时共享同一份物理内存，其余内容 pickle 后按照 compress_method 压缩
+
+    :param obj: 需要保存的对象
+    :param store: artifact 仓库的根目录
+    :param compress: 压缩方式，与 joblib.dump 的 compress 参数一致，可以是 0 到 9 的整数 (zlib 的压缩等级，0 或 None 为不压缩)、
+                     压缩方法 zlib、gzip、bz2、lzma 或者 (压缩方法, 压缩等级)，默认 3 ；哈希值与压缩方式无关，内容相同时保留第一次保存的文件
+    :param mmap_threshold: 单独保存并以内存映射加载的数组的最小字节数，默认 1MiB
+    :return: 对象的哈希值
+    """
+    if isinstance(compress, (tuple, list)):
+        method, level = compress
+    elif isinstance(compress, str):
+        method, level = compress, 3
+    else:
+        method, level = ("zlib", int(compress)) if compress else ("none", 0)
+
+    if method not in ARTIFACT_COMPRESSORS:
+        raise ValueError(f"压缩方法可选 {ARTIFACT_COMPRESSORS}")
+
+    buffer = BytesIO()
+    ArtifactPickler(buffer, store, mmap_threshold=mmap_threshold).dump(obj)
+    content = buffer.getvalue()
+
+    key = hashlib.sha1(content).hexdigest()
+    path = artifact_path(store, key)
+    if not os.path.exists(path):
+        write_atomic(path, ARTIFACT_MAGIC + bytes([ARTIFACT_COMPRESSORS.index(method)]) + compress_bytes(method, level, content))
+
+    return key
+
+
+class StreamWorksheet:
+    """
+    流式写入的 sheet，对 openpyxl write-only sheet 的封装
+
+    单元格按行缓存，写入的行号向后推进时将之前缓存的行写入磁盘并释放内存，已经写入磁盘的行不能再修改，
+    列宽需要在第一次写入磁盘之前设置，条件格式、合并单元格、图片等在保存时统一写入
+    """
+
+    def __init__(self, worksheet, buffer_rows=1000):
+        """
+        :param worksheet: write-only 模式下的 sheet
+        :param buffer_rows: 内存中最多缓存的行数，缓存的行数超过该值时写入磁盘
+        """
+        self.worksheet = worksheet
+        self.buffer_rows = buffer_rows
+        self._cells = {}
+        self._current_row = 0
+        self._flushed_row = 0
+
+    def __getattr__(self, name):
+        return getattr(self.worksheet, name)
+
+    def cell(self, row, column, value=None):
+        if row <= self._flushed_row:
+            raise ValueError(f"流式写入模式下第 {row} 行已经写入磁盘，不能再修改")
+
+        if (row, column) not in self._cells:
+            self._cells[(row, column)] = Cell(self, row=row, column=column)
+            self._current_row = max(row, self._current_row)
+
+        cell = self._cells[(row, column)]
+        if value is not None:
+            cell.value = value
+
+        return cell
+
+    def __getitem__(self, key):
+        if ":" not in key:
+            return self.cell(*coordinate_to_tuple(key))
+
+        min_col, min_row, max_col, max_row = range_boundaries(key)
+        return tuple(tuple(self.cell(row, col) for col in range(min_col, max_col + 1)) for row in range(min_row, max_row + 1))
+
+    def __setitem__(self, key, value):
+        self[key].value = value
+
+    def merge_cells(self, range_string):
+        """
+        合并单元格，被合并的单元格如果还在缓存中则清空内容
+
+        :param range_string: 合并单元格的范围
+        """
+        min_col, min_row, max_col, max_row = range_boundaries(range_string)
+        for (row, col), cell in self._cells.items():
+            if min_row <= row <= max_row and min_col <= col <= max_col and (row, col) != (min_row, min_col):
+                cell.value = None
+
+        self.worksheet.merged_cells.add(range_string)
+
+    def flush(self, row=None):
+        """
+        将 row 之前缓存的行写入磁盘，缓存的行数小于 buffer_rows 时不写入
+
+        :param row: 写入磁盘的截止行（不包含），为 None 时写入全部缓存的行
+        """
+        if row is None:
+            row = self._current_row + 1
+        elif row - 1 - self._flushed_row < self.buffer_rows:
+            return
+
+        rows = defaultdict(list)
+        for (r, c) in sorted(k for k in self._cells if k[0] < row):
+            rows[r].append(self._cells.pop((r, c)))
+
+        for r in range(self._flushed_row + 1, row):
+            cells = rows.get(r, [])
+            values = [None] * (cells[-1].column if cells else 0)
+            for cell in cells:
+                values[cell.column - 1] = cell
+            self.worksheet.append(values)
+
+        self._flushed_row = max(row - 1, self._flushed_row)
+
+
+class FigureImage(Image):
+    """
+    直接使用内存中图片内容的 openpyxl 图片，内容可以是 bytes 或者后台线程渲染中的 Future ，保存工作簿时才读取，
+    内容相同的图片在保存时只写入一份
+    """
+
+    def __init__(self, content, width, height, format="png"):
+        """
+        :param content: 图片内容，bytes 或者结果为 bytes 的 Future
+        :param width: 图片在 excel 中的宽度
+        :param height: 图片在 excel 中的高度
+        :param format: 图片格式，默认 png
+        """
+        self.ref = content
+        self.width, self.height = width, height
+        self.format = format
+        self._digest = None
+
+    def _data(self):
+        if isinstance(self.ref, Future):
+            self.ref = self.ref.result()
+        return self.ref
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha1(self._data()).hexdigest()
+        return self._digest
+
+
 class ExcelWriter:
 
-    def __init__(self, style_excel=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.xlsx'), style_sheet_name="初始化", mode="replace", fontsize=10, font='楷体', theme_color='2639E9', opacity=0.85):
+    # 进程内缓存的样式模版，key 为 (模版路径, 模版修改时间, 样式sheet名称, 字体, 字号, 主题色, 透明度)，value 为注册好样式的工作簿序列化后的结果和样式名称
+    templates = {}
+    # excel 单个 sheet 的最大行数，分块写入的内容超过该行数时自动写入后续的 sheet
+    max_rows = 1048576
+
+    def __init__(self, style_excel=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.xlsx'), style_sheet_name="初始化", mode="replace", fontsize=10, font='楷体', theme_color='2639E9', opacity=0.85, engine="memory", buffer_rows=1000, max_column_width=50, auto_width_sample=None, cache_template=True, render_workers=0):
         """
         excel 文件内容写入公共方法
 
         :param style_excel: 样式模版文件，默认当前路径下的 template.xlsx ，如果项目路径调整需要进行相应的调整
         :param style_sheet_name: 模版文件内初始样式sheet名称，默认即可
+        :param mode: excel写入的模式，可选 append 和 replace ，默认 replace ，选择 append 时保存会将新写入的 sheet 拼接到已有的excel文件中，同名 sheet 会被替换，其余 sheet 保持不变
         :param fontsize: 插入excel文件中内容的字体大小，默认 10
         :param font: 插入excel文件中内容的字体，默认 楷体
         :param theme_color: 主题色，默认 2639E9，注意不包含 #
         :param opacity: 写入dataframe时使用颜色填充主题色的透明度设置，默认 0.85
+        :param engine: 写入引擎，可选 memory 和 stream ，默认 memory ，stream 会使用 openpyxl 的 write-only 模式边写入边落盘，内存占用不随行数增长，但只能从上往下写入内容
+        :param buffer_rows: stream 模式下每个 sheet 在内存中缓存的行数，默认 1000
+        :param max_column_width: 自动调整列宽时的最大列宽，默认 50
+        :param auto_width_sample: 自动调整列宽时每列每次最多抽样测量的内容数量，默认 None ，即测量全部内容，超长表格可以设置抽样提升速度
+        :param cache_template: 是否在进程内缓存加载好样式的模版，默认 True ，批量生成大量小报告时可以省去每次解析模版和注册样式的开销
+        :param render_workers: 在后台线程中渲染 matplotlib 图片的线程数，默认 0 ，即在调用 insert_pic2sheet 时直接渲染，matplotlib 不是线程安全的，开启后插入的 Figure 在保存之前不能再修改
         """
         # english_width，chinese_width
         self.english_width = 0.12
@@ -48,14 +282,67 @@ class ExcelWriter:
         self.opacity = opacity
         self.fontsize = fontsize
         self.theme_color = theme_color
-        self.workbook = load_workbook(style_excel)
-        self.style_sheet = self.workbook[style_sheet_name]
+        self.engine = engine
+        self.buffer_rows = buffer_rows
+        self.max_column_width = max_column_width
+        self.auto_width_sample = auto_width_sample
+        self.stream_sheets = {}
+        self.style_excel = style_excel
+        self.style_sheet_name = style_sheet_name
+        self.cache_template = cache_template
+        self.render_workers = render_workers
+        self.executor = None
+        self.reset()
+
+    def reset(self):
+        """
+        丢弃当前 writer 中写入的全部内容，从模版重新初始化工作簿，同一个 writer 保存后可以调用该方法继续生成下一个 excel 文件
+        """
+        template = self.load_template()
+        self.stream_sheets = {}
+        self.images = {}
+
+        if self.engine == "stream":
+            self.style_sheet = template[self.style_sheet_name]
+            self.workbook = Workbook(write_only=True)
+            for style in template._named_styles:
+                if style.name not in self.workbook.style_names:
+                    self.workbook.add_named_style(copy(style))
+        else:
+            self.workbook = template
+            self.style_sheet = self.workbook[self.style_sheet_name]
+
+    def load_template(self):
+        """
+        加载样式模版并注册 writer 使用的 NamedStyle，相同模版文件、字体、字号、主题色和透明度的工作簿会序列化后缓存在进程内，后续的 writer 直接反序列化得到一个全新的副本，不再重复解析模版和计算样式
 
+        :return: 已经注册好样式的模版工作簿
+        """
+        key = (os.path.abspath(self.style_excel), os.path.getmtime(self.style_excel), self.style_sheet_name, self.font, self.fontsize, self.theme_color, self.opacity)
+        if self.cache_template and key in ExcelWriter.templates:
+            content, style_names = ExcelWriter.templates[key]
+            workbook = pickle.loads(content)
+            self.name_styles = [workbook._named_styles[name] for name in style_names]
+            return workbook
+
+        workbook = load_workbook(self.style_excel)
         self.name_styles = []
-        self.init_style(font, fontsize, theme_color)
+        self.init_style(self.font, self.fontsize, self.theme_color)
         for style in self.name_styles:
-            if style.name not in self.workbook.style_names:
-                self.workbook.add_named_style(style)
+            if style.name not in workbook.style_names:
+                workbook.add_named_style(style)
+
+        if self.cache_template:
+            ExcelWriter.templates[key] = (pickle.dumps(workbook, protocol=pickle.HIGHEST_PROTOCOL), [style.name for style in self.name_styles])
+
+        return workbook
+
+    @staticmethod
+    def clear_template_cache():
+        """
+        清空进程内缓存的样式模版
+        """
+        ExcelWriter.templates.clear()
 
     def add_conditional_formatting(self, worksheet, start_space, end_space):
         """
@@ -104,6 +391,9 @@ class ExcelWriter:
 
         :param name: 需要获取的工作簿名称
         """
+        if self.engine == "stream":
+            return self.get_stream_sheet_by_name(name)
+
         if name not in self.workbook.sheetnames:
             worksheet = self.workbook.copy_worksheet(self.style_sheet)
             worksheet.title = name
@@ -112,6 +402,22 @@ class ExcelWriter:
 
         return worksheet
 
+    def get_stream_sheet_by_name(self, name):
+        """
+        stream 模式下获取sheet名称为name的工作簿，如果不存在，则新建一个并沿用初始模版sheet的列宽、行高及视图设置
+
+        :param name: 需要获取的工作簿名称
+        """
+        if name not in self.stream_sheets:
+            worksheet = self.workbook.create_sheet(name)
+            worksheet.sheet_format = copy(self.style_sheet.sheet_format)
+            worksheet.views = copy(self.style_sheet.views)
+            for key, dimension in self.style_sheet.column_dimensions.items():
+                worksheet.column_dimensions[key].width = dimension.width
+            self.stream_sheets[name] = StreamWorksheet(worksheet, buffer_rows=self.buffer_rows)
+
+        return self.stream_sheets[name]
+
     def insert_value2sheet(self, worksheet, insert_space, value="", style="content", auto_width=False):
         """
         向sheet中的某个单元格插入某种样式的内容
@@ -135,20 +441,21 @@ class ExcelWriter:
         cell.style =  style
 
         if auto_width:
-            curr_width = worksheet.column_dimensions[start_col].width
-            auto_width = min(max([(self.check_contain_chinese(value)[1] * self.english_width + self.check_contain_chinese(value)[2] * self.chinese_width) * self.fontsize, 10, curr_width]), 50)
-            worksheet.column_dimensions[start_col].width = auto_width
+            self.set_column_auto_width(worksheet, start_col, self.get_text_width([value]))
 
         return start_row + 1, column_index_from_string(start_col) + 1
 
-    def insert_pic2sheet(self, worksheet, fig, insert_space, figsize=(600, 250)):
+    @profile
+    def insert_pic2sheet(self, worksheet, fig, insert_space, figsize=(600, 250), cache=True, savefig_params=None):
         """
         向excel中插入图片内容
 
         :param worksheet: 需要插入内容的sheet
-        :param fig: 需要插入的图片路径
+        :param fig: 需要插入的图片，可以是图片路径、bytes、BytesIO 等文件对象或者 matplotlib 的 Figure
         :param insert_space: 插入图片的起始单元格
         :param figsize: 图片大小设置
+        :param cache: 是否缓存图片路径和图片内容的读取结果，默认 True ，同一个文件或者相同内容的图片只读取、转换一次；Figure 每次插入都重新渲染，不受该参数影响，相同内容的图片在 excel 中只保存一份
+        :param savefig_params: 渲染 Figure 时透传至 Figure.savefig 的参数，默认 dict(format="png", bbox_inches="tight")
         :return 返回插入元素最后一列之后、最后一行之后的位置
         """
         if isinstance(insert_space, str):
@@ -158,38 +465,306 @@ class ExcelWriter:
             start_row, start_col = insert_space
             start_col = get_column_letter(start_col)
 
-        image = Image(fig)
-        image.width, image.height = figsize
+        content, _format = self.load_image(fig, cache=cache, savefig_params=savefig_params)
+        image = FigureImage(content, *figsize, format=_format)
         worksheet.add_image(image, f"{start_col}{start_row}")
 
         return start_row + int(figsize[1] / 17.5), column_index_from_string(start_col) + 8
 
+    def load_image(self, fig, cache=True, savefig_params=None):
+        """
+        读取或者渲染需要插入的图片内容
+
+        :param fig: 图片路径、bytes、BytesIO 等文件对象或者 matplotlib 的 Figure
+        :param cache: 是否使用 writer 内缓存的图片内容，只对图片路径和图片内容生效，路径按文件的修改时间和大小判断是否变化
+        :param savefig_params: 渲染 Figure 时透传至 Figure.savefig 的参数
+        :return: 图片内容 (bytes 或者后台渲染中的 Future) 和图片格式
+        """
+        if isinstance(fig, Figure):
+            # Figure 每次插入时都重新渲染，重绘后的 Figure 不会使用旧的内容，相同内容的图片保存时由 digest 去重
+            savefig_params = {"format": "png", "bbox_inches": "tight", **(savefig_params or {})}
+            if self.render_workers:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(self.render_workers, thread_name_prefix="insert_pic2sheet")
+                return self.executor.submit(self.render_figure, fig, savefig_params), savefig_params["format"]
+            return self.render_figure(fig, savefig_params), savefig_params["format"]
+
+        if isinstance(fig, (str, os.PathLike)):
+            stat = os.stat(fig)
+            key = (os.path.abspath(fig), stat.st_mtime_ns, stat.st_size)
+            if cache and key in self.images:
+                return self.images[key]
+            with open(fig, "rb") as f:
+                content = f.read()
+        else:
+            content = bytes(fig) if isinstance(fig, (bytes, bytearray, memoryview)) else fig.read()
+            key = hashlib.sha1(content).hexdigest()
+            if cache and key in self.images:
+                return self.images[key]
+
+        result = self.image_format(content)
+        if cache:
+            self.images[key] = result
+
+        return result
+
+    @staticmethod
+    def render_figure(fig, savefig_params):
+        """
+        将 matplotlib 的 Figure 渲染为图片内容
+
+        :param fig: matplotlib 的 Figure
+        :param savefig_params: 透传至 Figure.savefig 的参数
+        :return: 图片内容，bytes
+        """
+        buffer = BytesIO()
+        fig.savefig(buffer, **savefig_params)
+        return buffer.getvalue()
+
+    @staticmethod
+    def image_format(content):
+        """
+        识别图片格式，excel 不支持的格式转换为 png
+
+        :param content: 图片内容，bytes
+        :return: 图片内容和图片格式
+        """
+        with PILImage.open(BytesIO(content)) as image:
+            _format = (image.format or "png").lower()
+            if _format in ("gif", "jpeg", "png"):
+                return content, _format
+
+            buffer = BytesIO()
+            image.save(buffer, format="png")
+            return buffer.getvalue(), "png"
+
     def insert_rows(self, worksheet, row, row_index, col_index, merge_rows=None, style="", auto_width=False, style_only=False):
         curr_col = column_index_from_string(col_index)
+        styles = self.get_row_styles(len(row), style=style, merge=merge_rows is not None and row_index + 1 not in merge_rows, style_only=style_only)
         for j, v in enumerate(row):
-            if merge_rows is not None and row_index + 1 not in merge_rows:
-                if j == 0:
-                    self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style="merge_left", auto_width=auto_width)
-                elif j == len(row) - 1:
-                    self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style="merge_right", auto_width=auto_width)
-                else:
-                    self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style="merge_middle", auto_width=auto_width)
-            elif style_only or len(row) <= 1:
-                self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style=style or "middle", auto_width=auto_width)
-            else:
-                if j == 0:
-                    self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style=f"{style}_left" if style else "left", auto_width=auto_width)
-                elif j == len(row) - 1:
-                    self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style=f"{style}_right" if style else "right", auto_width=auto_width)
+            self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style=styles[j], auto_width=auto_width)
+
+    @staticmethod
+    def get_row_styles(length, style="", merge=False, style_only=False):
+        """
+        获取一行中每个位置单元格对应的样式名称
+
+        :param length: 行的长度
+        :param style: 行样式前缀，为空时使用 left / middle / right
+        :param merge: 是否为需要分组显示的行
+        :param style_only: 是否整行使用同一个样式
+        :return 每个位置的样式名称列表
+        """
+        if merge:
+            prefix = "merge_"
+        elif style_only or length <= 1:
+            return [style or "middle"] * length
+        else:
+            prefix = f"{style}_" if style else ""
+
+        return [f"{prefix}left" if j == 0 else (f"{prefix}right" if j == length - 1 else f"{prefix}middle") for j in range(length)]
+
+    @staticmethod
+    def get_row_style(i, length, header=True, fill=False):
+        """
+        获取 dataframe 写入时第 i 行对应的样式
+
+        :param i: 行号，header 为第 0 行
+        :param length: dataframe 的行数
+        :param header: 是否存储dataframe的header
+        :param fill: 是否使用颜色填充而非边框
+        :return (style, style_only, merge)，merge 表示该行是否参与 merge_column 分组显示
+        """
+        is_last = (header and i == length) or (not header and i + 1 == length)
+
+        if i == 0:
+            if header:
+                return "header", False, False
+            return ("middle_even_first", True, False) if fill else ("first", False, False)
+
+        if fill:
+            style = "middle_odd" if i % 2 == 1 else "middle_even"
+            return f"{style}_last" if is_last else style, True, False
+
+        if is_last:
+            return "last", False, False
+
+        return "", False, True
+
+    def insert_columns(self, worksheet, data, start_row, start_col, merge_rows=None, header=True, index=False, auto_width=False, fill=False, number_formats=None, format_rows=None, chunksize=10000, row_offset=0, length=None):
+        """
+        按列批量写入 dataframe 数据，与逐个单元格写入的结果保持一致
+
+        每列的数据转换方式、每种行类型在每个位置的样式只计算一次，写入时不再解析单元格地址，数据按 chunksize 行分块转换，
+        写入 StreamWorksheet 时每写完一块就尝试将之前的行写入磁盘
+
+        :param worksheet: 需要插入内容的sheet
+        :param data: 需要插入的dataframe
+        :param start_row: 插入内容的起始行
+        :param start_col: 插入内容的起始列，index
+        :param merge_rows: 分组显示的分界行
+        :param header: 是否存储dataframe的header
+        :param index: 是否存储dataframe的index
+        :param auto_width: 是否自动调整列宽
+        :param fill: 是否使用颜色填充而非边框
+        :param number_formats: 需要设置数值显示格式的列，{列的 index: 显示格式}
+        :param format_rows: 设置数值显示格式的行范围，(开始行, 结束行)
+        :param chunksize: 每次转换的行数
+        :param row_offset: 分块写入时当前块之前已经写入的行数（包含表头），大于 0 时不再写入表头，行样式接着之前的行计算
+        :param length: 计算行样式时整个表格的行数，默认 len(data) ，分块写入时非最后一块传入 np.inf ，即当前块不包含最后一行
+        """
+        prefix = [] if row_offset else [[self.astype_insertvalue(v) for v in row] for row in dataframe_to_rows(data.iloc[:0], header=header, index=index)]
+        length = len(data) if length is None else length
+
+        # 流式写入时列宽需要在写入磁盘之前确定，所以先计算列宽再写入内容
+        if auto_width:
+            self.set_columns_auto_width(worksheet, data, start_col, prefix=prefix, header=header, index=index, chunksize=chunksize)
+
+        merge_rows = set(merge_rows) if merge_rows is not None else None
+        number_formats = {col: self.get_number_format_id(worksheet, _format) for col, _format in (number_formats or {}).items()}
+        style_arrays = {}
+
+        def row_style_arrays(i, width):
+            style, style_only, merge = self.get_row_style(row_offset + i, length, header=header, fill=fill)
+            merge = merge and merge_rows is not None and start_row + i + 1 not in merge_rows
+            key = (style, style_only, merge, width)
+            if key not in style_arrays:
+                style_arrays[key] = [self.get_style_array(worksheet, s) for s in self.get_row_styles(width, style=style, merge=merge, style_only=style_only)]
+            return style_arrays[key]
+
+        cells = worksheet._cells
+        flush = getattr(worksheet, "flush", None)
+        rows = chain(prefix, chain.from_iterable(zip(*columns) for columns in self.iter_column_blocks(data, index=index, chunksize=chunksize)))
+        for i, row in enumerate(rows):
+            row_index = start_row + i
+            if flush is not None and i % chunksize == 0:
+                flush(row_index)
+
+            formatted = number_formats and format_rows[0] <= row_index <= format_rows[1]
+            for j, (v, style_array) in enumerate(zip(row, row_style_arrays(i, len(row)))):
+                cell = Cell(worksheet, row=row_index, column=start_col + j, value=v)
+                cell._style = copy(style_array)
+                if formatted and start_col + j in number_formats:
+                    cell._style.numFmtId = number_formats[start_col + j]
+                cells[(row_index, start_col + j)] = cell
+
+        worksheet._current_row = max(worksheet._current_row, start_row + len(prefix) + len(data) - 1)
+
+    def iter_column_blocks(self, data, index=False, chunksize=10000):
+        """
+        按 chunksize 行分块获取 dataframe 需要写入 excel 的每一列内容
+
+        :param data: 需要插入的dataframe
+        :param index: 是否存储dataframe的index
+        :param chunksize: 每块的行数
+        :return 每块返回一个列表，包含该块每一列转换后的内容
+        """
+        index_rows = expand_index(data.index) if index and data.index.nlevels > 1 else None
+
+        for start in range(0, len(data), chunksize):
+            block = data.iloc[start:start + chunksize]
+            columns = []
+            if index:
+                if index_rows is not None:
+                    rows = list(islice(index_rows, len(block)))
+                    columns.extend(self.astype_insertvalues([row[level] for row in rows]) for level in range(data.index.nlevels))
                 else:
-                    self.insert_value2sheet(worksheet, f'{get_column_letter(curr_col + j)}{row_index}', self.astype_insertvalue(v), style=f"{style}_middle" if style else "middle", auto_width=auto_width)
+                    columns.append(self.astype_insertvalues(block.index.tolist()))
+
+            columns.extend(self.astype_insertvalues(block.iloc[:, j].tolist(), dtype=block.dtypes.iloc[j]) for j in range(block.shape[1]))
+            yield columns
+
+    @staticmethod
+    def get_style_array(worksheet, style):
+        """
+        获取命名样式对应的单元格样式数组
+
+        :param worksheet: 样式所在的sheet
+        :param style: 样式名称
+        """
+        cell = Cell(worksheet)
+        cell.style = style
+        return cell._style
+
+    @staticmethod
+    def get_number_format_id(worksheet, _format):
+        """
+        获取数值显示格式在工作簿中的编号
+
+        :param worksheet: 显示格式所在的sheet
+        :param _format: 显示格式，参考 openpyxl
+        """
+        cell = Cell(worksheet)
+        cell.number_format = _format
+        return cell._style.numFmtId
+
+    def get_text_width(self, values):
+        """
+        计算一组内容中最长内容的显示宽度，对去重后的字符串向量化统计中文与非中文字符数，结果与逐个调用 check_contain_chinese 一致
 
-    def insert_df2sheet(self, worksheet, data, insert_space, merge_column=None, header=True, index=False, auto_width=False, fill=False, merge=False):
+        :param values: 需要计算宽度的内容
+        """
+        values = pd.Series(values, dtype=object)
+        if self.auto_width_sample and len(values) > self.auto_width_sample:
+            values = values.sample(n=self.auto_width_sample, random_state=0)
+
+        texts = values.map(str).drop_duplicates()
+        if len(texts) == 0:
+            return 0
+
+        chinese = texts.str.count("[\u4e00-\u9fff]")
+        return float(((texts.str.len() - chinese) * self.english_width + chinese * self.chinese_width).max() * self.fontsize)
+
+    def set_columns_auto_width(self, worksheet, data, start_col, prefix=None, header=True, index=False, chunksize=10000):
+        """
+        dataframe 写入完成或写入之前按列一次性计算并调整列宽，每列只测量一次内容宽度
+
+        :param worksheet: 需要调整列宽的sheet
+        :param data: 写入的dataframe
+        :param start_col: 写入内容的起始列，index
+        :param prefix: 表头等 dataframe 数据之前的行，为 None 时根据 header 和 index 生成
+        :param header: 是否存储dataframe的header
+        :param index: 是否存储dataframe的index
+        :param chunksize: 每次测量的行数
+        """
+        if prefix is None:
+            prefix = [[self.astype_insertvalue(v) for v in row] for row in dataframe_to_rows(data.iloc[:0], header=header, index=index)]
+
+        widths = defaultdict(float)
+        for row in prefix:
+            for j, v in enumerate(row):
+                widths[j] = max(widths[j], self.get_text_width([v]))
+
+        for columns in self.iter_column_blocks(data, index=index, chunksize=chunksize):
+            for j, values in enumerate(columns):
+                if widths[j] < self.max_column_width:
+                    widths[j] = max(widths[j], self.get_text_width(values))
+
+            # 所有列都已经达到列宽上限时不再继续测量
+            if all(width >= self.max_column_width for width in widths.values()):
+                break
+
+        for j, width in widths.items():
+            self.set_column_auto_width(worksheet, start_col + j, width)
+
+    def set_column_auto_width(self, worksheet, column, width):
+        """
+        根据内容宽度调整列宽，列宽不小于 10 且不超过 max_column_width，与逐个单元格开启 auto_width 的结果一致
+
+        :param worksheet: 需要调整列宽的sheet
+        :param column: 列，可以直接输入 index 或者 字母
+        :param width: 该列内容的最大显示宽度
+        """
+        column = column if isinstance(column, str) else get_column_letter(column)
+        worksheet.column_dimensions[column].width = min(max(width, 10, worksheet.column_dimensions[column].width), self.max_column_width)
+
+    @profile
+    def insert_df2sheet(self, worksheet, data, insert_space, merge_column=None, header=True, index=False, auto_width=False, fill=False, merge=False, bulk=False, number_formats=None):
         """
         向excel文件中插入指定样式的dataframe数据
 
         :param worksheet: 需要插入内容的sheet
-        :param data: 需要插入的dataframe
+        :param data: 需要插入的dataframe，也可以是 dataframe 的迭代器，分块写入时不支持 merge_column ，参考 insert_chunks2sheet
         :param insert_space: 插入内容的起始单元格位置
         :param merge_column: 需要分组显示的列，index或者列名
         :param header: 是否存储dataframe的header，暂不支持多级表头
@@ -197,10 +772,18 @@ class ExcelWriter:
         :param auto_width: 是否自动调整列宽
         :param fill: 是否使用颜色填充而非边框
         :param merge: 是否合并单元格，配合 merge_column 一起使用，当前版本仅在 merge_column 只有一列时有效
-        
+        :param bulk: 是否按列批量写入，大表写入时速度更快，输出结果与逐个单元格写入一致，StreamWorksheet 始终按列批量写入
+        :param number_formats: 需要设置数值显示格式的列，{列名: 显示格式}，写入内容时同时设置，仅修改显示格式，不更改数值
+
         返回插入元素最后一列之后、最后一行之后的位置
         """
-        df = data.copy()
+        if not isinstance(data, pd.DataFrame) or (not merge_column and self.exceed_max_rows(data, insert_space, header=header)):
+            if merge_column:
+                raise ValueError("分块写入时不支持 merge_column")
+            blocks, columns = self.insert_chunks2sheet(worksheet, data if not isinstance(data, pd.DataFrame) else [data], insert_space, header=header, index=index, auto_width=auto_width, fill=fill, number_formats=number_formats, bulk=bulk, merge=merge)
+            return blocks[-1][2], blocks[-1][3]
+
+        df = data
 
         if isinstance(insert_space, str):
             start_row = int(re.findall("\d+", insert_space)[0])
@@ -224,30 +807,21 @@ class ExcelWriter:
             merge_cols = None
             merge_rows = None
 
-        for i, row in enumerate(dataframe_to_rows(df, header=header, index=index)):
-            if fill:
-                if i == 0:
-                    if header:
-                        self.insert_rows(worksheet, row, start_row + i, start_col, style="header", auto_width=auto_width)
-                    else:
-                        self.insert_rows(worksheet, row, start_row + i, start_col, style="middle_even_first", auto_width=auto_width, style_only=True)
-                else:
-                    if i % 2 == 1:
-                        style = "middle_odd_last" if (header and i == len(df)) or (not header and i + 1 == len(df)) else "middle_odd"
-                    else:
-                        style = "middle_even_last" if (header and i == len(df)) or (not header and i + 1 == len(df)) else "middle_even"
-                    
-                    self.insert_rows(worksheet, row, start_row + i, start_col, style=style, auto_width=auto_width, style_only=True)
-            else:
-                if i == 0:
-                    if header:
-                        self.insert_rows(worksheet, row, start_row + i, start_col, style="header", auto_width=auto_width)
-                    else:
-                        self.insert_rows(worksheet, row, start_row + i, start_col, style="first", auto_width=auto_width)
-                elif (header and i == len(df)) or (not header and i + 1 == len(df)):
-                    self.insert_rows(worksheet, row, start_row + i, start_col, style="last", auto_width=auto_width)
-                else:
-                    self.insert_rows(worksheet, row, start_row + i, start_col, auto_width=auto_width, merge_rows=merge_rows)
+        end_row = start_row + len(data) + 1 if header else start_row + len(data)
+        number_formats = {column_index_from_string(start_col) + data.columns.get_loc(c): _format for c, _format in (number_formats or {}).items() if c in data.columns}
+
+        if bulk or isinstance(worksheet, StreamWorksheet):
+            self.insert_columns(worksheet, df, start_row, column_index_from_string(start_col), merge_rows=merge_rows, header=header, index=index, auto_width=auto_width, fill=fill, number_formats=number_formats, format_rows=(end_row - len(data), end_row - 1))
+        else:
+            for i, row in enumerate(dataframe_to_rows(df, header=header, index=index)):
+                style, style_only, use_merge = self.get_row_style(i, len(df), header=header, fill=fill)
+                self.insert_rows(worksheet, row, start_row + i, start_col, style=style, style_only=style_only, merge_rows=merge_rows if use_merge else None)
+
+            if auto_width:
+                self.set_columns_auto_width(worksheet, df, column_index_from_string(start_col), header=header, index=index)
+
+            for col, _format in number_formats.items():
+                self.set_number_format(worksheet, f"{get_column_letter(col)}{end_row - len(data)}:{get_column_letter(col)}{end_row - 1}", _format)
 
         # 合并单元格, 仅支持单列, 两列及其以上不进行合并
         if merge and merge_column and merge_cols and len(merge_cols) == 1:
@@ -261,10 +835,83 @@ class ExcelWriter:
                     for merge_col in merge_cols:
                         worksheet.merge_cells(f"{merge_col}{s-1}:{merge_col}{e-1}")
 
-        end_row = start_row + len(data) + 1 if header else start_row + len(data)
-
         return (end_row, column_index_from_string(start_col) + len(data.columns))
 
+    def exceed_max_rows(self, data, insert_space, header=True):
+        """
+        判断 dataframe 写入后是否超过单个 sheet 的最大行数
+        """
+        start_row = coordinate_to_tuple(insert_space)[0] if isinstance(insert_space, str) else insert_space[0]
+        return start_row + len(data) + int(header) - 1 > self.max_rows
+
+    def insert_chunks2sheet(self, worksheet, chunks, insert_space, header=True, index=False, auto_width=False, fill=False, number_formats=None, bulk=True, merge=False):
+        """
+        向excel文件中逐块插入 dataframe 数据，每块数据到达后直接写入，不需要将全部数据加载到内存，超过 sheet 最大行数时自动写入名称为 sheet名称_2、sheet名称_3 ... 的后续 sheet ，
+        后续 sheet 在相同的位置重复写入表头，跨块的行样式、数值显示格式与一次性写入完整的 dataframe 保持一致
+
+        :param worksheet: 需要插入内容的sheet
+        :param chunks: dataframe 的迭代器，例如 pd.read_csv(..., chunksize=100000)，每块的列需要保持一致
+        :param insert_space: 插入内容的起始单元格位置
+        :param header: 是否存储dataframe的header
+        :param index: 是否存储dataframe的index
+        :param auto_width: 是否自动调整列宽，stream 模式下列宽只根据每个 sheet 的第一块数据计算
+        :param fill: 是否使用颜色填充而非边框
+        :param number_formats: 需要设置数值显示格式的列，{列名: 显示格式}
+        :param bulk: 与 insert_df2sheet 的参数保持一致，分块写入始终按列批量写入
+        :param merge: 与 insert_df2sheet 的参数保持一致，合并单元格需要配合 merge_column 使用，分块写入时不生效
+        :return: 写入数据的每个 sheet 对应的 (sheet, 数据开始行, 数据结束行之后的行, 最后一列之后的列) 列表，以及 dataframe 的列名
+        """
+        if isinstance(insert_space, str):
+            start_row, start_col = coordinate_to_tuple(insert_space)
+        else:
+            start_row, start_col = insert_space
+
+        chunks = iter(chunks)
+        current = next(chunks, None)
+        if current is None:
+            raise ValueError("没有需要写入的数据")
+
+        columns = current.columns
+        prefix_rows = len(list(dataframe_to_rows(current.iloc[:0], header=header, index=index)))
+        capacity = self.max_rows - start_row + 1 - prefix_rows
+        if capacity <= 0:
+            raise ValueError(f"起始行 {start_row} 之后没有足够的行写入数据")
+
+        number_formats = {start_col + columns.get_loc(c): _format for c, _format in (number_formats or {}).items() if c in columns}
+        end_col = start_col + len(columns)
+        chunks = (chunk for chunk in chunks if len(chunk) > 0)
+        following = next(chunks, None)
+
+        blocks = [[worksheet, start_row + prefix_rows, start_row + prefix_rows, end_col]]
+        written, offset = 0, 0
+        while current is not None:
+            if written == capacity:
+                worksheet = self.get_sheet_by_name(self.continuation_sheet_name(blocks[0][0].title, len(blocks) + 1))
+                blocks.append([worksheet, start_row + prefix_rows, start_row + prefix_rows, end_col])
+                written, offset = 0, 0
+
+            piece, current = current.iloc[:capacity - written], current.iloc[capacity - written:]
+            last = written + len(piece) == capacity or (len(current) == 0 and following is None)
+            # stream 模式下写入磁盘之后不能再调整列宽，只根据每个 sheet 的第一块数据计算列宽
+            self.insert_columns(worksheet, piece, start_row + offset, start_col, header=header, index=index, auto_width=auto_width and (offset == 0 or not isinstance(worksheet, StreamWorksheet)), fill=fill,
+                                number_formats=number_formats, format_rows=(start_row + prefix_rows, self.max_rows), row_offset=offset, length=written + len(piece) if last else np.inf)
+            written += len(piece)
+            offset = prefix_rows + written
+            blocks[-1][2] = start_row + offset
+
+            if len(current) == 0:
+                current, following = following, next(chunks, None)
+
+        return [tuple(block) for block in blocks], columns
+
+    @staticmethod
+    def continuation_sheet_name(name, n):
+        """
+        超过最大行数时后续 sheet 的名称，excel 中 sheet 名称最长 31 个字符
+        """
+        suffix = f"_{n}"
+        return f"{name[:31 - len(suffix)]}{suffix}"
+
     @staticmethod
     def check_contain_chinese(check_str):
         out = []
@@ -284,6 +931,38 @@ class ExcelWriter:
         else:
             return value
 
+    @staticmethod
+    def astype_insertvalues(values, dtype=None, decimal_point=4):
+        """
+        批量转换一列需要插入的内容，与逐个调用 astype_insertvalue 的结果一致
+
+        :param values: 一列内容，list
+        :param dtype: 该列的数据类型，numpy 浮点类型时直接保留小数位数，其他类型按元素的类型确定一次转换方式
+        :param decimal_point: 浮点数保留的小数位数
+        """
+        if isinstance(dtype, np.dtype):
+            if dtype.kind == "f":
+                return [round(v, decimal_point) for v in values]
+            if dtype.kind in "iub":
+                return values
+
+        converters = {}
+        result = []
+        for v in values:
+            _type = type(v)
+            if _type not in converters:
+                if re.search('tuple|list|set|numpy.ndarray|Categorical|numpy.dtype|Interval', str(_type)):
+                    converters[_type] = str
+                elif re.search('float', str(_type)):
+                    converters[_type] = lambda x: round(float(x), decimal_point)
+                else:
+                    converters[_type] = None
+
+            converter = converters[_type]
+            result.append(converter(v) if converter else v)
+
+        return result
+
     @staticmethod
     def calc_continuous_cnt(list_, index_=0):
         """
@@ -415,46 +1094,41 @@ class ExcelWriter:
             middle_odd_style, middle_even_first_style, middle_odd_last_style, middle_even_style, middle_odd_first_style, middle_even_last_style,
         ])
 
+    @profile
     def save(self, filename, close=True):
         """
         保存excel文件
 
-        :param filename: 需要保存 excel 文件的路径
+        :param filename: 需要保存 excel 文件的路径，也可以是 BytesIO 等文件对象
         :param close: 是否需要释放 writer
         """
-        if self.style_sheet.title in self.workbook.sheetnames:
+        if self.engine == "stream":
+            for worksheet in self.stream_sheets.values():
+                worksheet.flush()
+        elif self.style_sheet.title in self.workbook.sheetnames:
             self.workbook.remove(self.style_sheet)
-        
-        if os.path.exists(filename) and self.mode == "append":
-            _workbook = load_workbook(filename)
-            
-            for _sheet_name in _workbook.sheetnames:
-                if _sheet_name not in self.workbook.sheetnames:
-                    _worksheet = self.get_sheet_by_name(_sheet_name)
-                    
-                    for i, row in enumerate(_workbook[_sheet_name].iter_rows()):
-                        for j, cell in enumerate(row):
-                            _worksheet.cell(row=i + 1, column=j + 1).value = cell.value
-                            _worksheet.cell(row=i + 1, column=j + 1).style = cell.style
-
-                            if i == _workbook[_sheet_name].max_row - 1:
-                                _worksheet.column_dimensions[get_column_letter(j + 1)].width = _workbook[_sheet_name].column_dimensions[get_column_letter(j + 1)].width
-
-                self.workbook.move_sheet(_worksheet, offset=-len(self.workbook.sheetnames) + 1)
-                
-            _workbook.close()
-            
-        self.workbook.save(filename)
-        
+
+        # 追加模式下只将新写入的 sheet 拼接到已有文件中，已有 sheet 的内容不做任何改动
+        if self.mode == "append" and isinstance(filename, (str, os.PathLike)) and os.path.exists(filename):
+            content = BytesIO()
+            save_workbook(self.workbook, content)
+            append_workbook(filename, content.getvalue())
+        else:
+            save_workbook(self.workbook, filename)
+
         if close:
             self.workbook.close()
-            
-            
-def dataframe2excel(data, excel_writer, sheet_name=None, title=None, header=True, theme_color="2639E9", fill=True, percent_cols=None, condition_cols=None, custom_cols=None, custom_format="#,##0", color_cols=None, start_col=2, start_row=2, mode="replace", writer_params={}, **kwargs):
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+@profile
+def dataframe2excel(data, excel_writer, sheet_name=None, title=None, header=True, theme_color="2639E9", fill=True, percent_cols=None, condition_cols=None, custom_cols=None, custom_format="#,##0", color_cols=None, start_col=2, start_row=2, mode="replace", engine="memory", writer_params={}, **kwargs):
     """
     向excel文件中插入指定样式的dataframe数据
 
-    :param data: 需要保存的dataframe数据，index默认不保存，如果需要保存先 .reset_index().rename(columns={"index": "索引名称"}) 再保存，有部分索引 reset_index 之后是 0 而非 index，根据实际情况进行修改
+    :param data: 需要保存的dataframe数据，也可以是 dataframe 的迭代器，例如 pd.read_csv(..., chunksize=100000)，每块到达后直接写入，超过 excel 最大行数时自动写入后续的 sheet ，index默认不保存，如果需要保存先 .reset_index().rename(columns={"index": "索引名称"}) 再保存，有部分索引 reset_index 之后是 0 而非 index，根据实际情况进行修改
     :param excel_writer: 需要保存到的 excel 文件路径或者 ExcelWriter
     :param sheet_name: 需要插入内容的sheet，如果是 Worksheet，则直接向 Worksheet 插入数据
     :param title: 是否在dataframe之前的位置插入一个标题
@@ -469,6 +1143,7 @@ def dataframe2excel(data, excel_writer, sheet_name=None, title=None, header=True
     :param start_col: 在excel中的开始列数，默认 2，即第二列开始
     :param start_row: 在excel中的开始行数，默认 2，即第二行开始，如果 title 有值的话，会从 start_row + 2 行开始插入dataframe数据
     :param mode: excel写入的模式，可选 append 和 replace ，默认 replace ，选择 append 时会在已有的excel文件中增加内容，不覆盖原有内容
+    :param engine: 新建 ExcelWriter 时使用的写入引擎，可选 memory 和 stream ，默认 memory ，参考 ExcelWriter
     :param writer_params: 透传至 ExcelWriter 内的参数
     :param **kwargs: 其他参数，透传至 insert_df2sheet 方法，例如 传入 auto_width=True 会根据内容自动调整列宽
     :return 返回插入元素最后一列之后、最后一行之后的位置
@@ -476,7 +1151,7 @@ def dataframe2excel(data, excel_writer, sheet_name=None, title=None, header=True
     if isinstance(excel_writer, ExcelWriter):
         writer = excel_writer
     else:
-        writer = ExcelWriter(theme_color=theme_color, mode=mode, **writer_params)
+        writer = ExcelWriter(theme_color=theme_color, mode=mode, engine=engine, **writer_params)
     
         # if os.path.exists(excel_writer) and mode == "append":
         #     workbook = load_workbook(excel_writer)
@@ -490,7 +1165,7 @@ def dataframe2excel(data, excel_writer, sheet_name=None, title=None, header=True
             
         #     workbook.close()
     
-    if isinstance(sheet_name, Worksheet):
+    if isinstance(sheet_name, (Worksheet, StreamWorksheet)):
         worksheet = sheet_name
     else:
         worksheet = writer.get_sheet_by_name(sheet_name or "Sheet1")
@@ -499,39 +1174,187 @@ def dataframe2excel(data, excel_writer, sheet_name=None, title=None, header=True
         start_row, end_col = writer.insert_value2sheet(worksheet, (start_row, start_col), value=title, style="header")
         start_row += 1
 
-    end_row, end_col = writer.insert_df2sheet(worksheet, data, (start_row, start_col), fill=fill, header=header, **kwargs)
-    
+    # 数值显示格式在写入内容时同时设置，stream 模式下写入磁盘的行不能再修改
+    number_formats = {}
     if percent_cols:
-        for c in [c for c in percent_cols if c in data.columns]:
-            conditional_column = get_column_letter(start_col + data.columns.get_loc(c))
-            writer.set_number_format(worksheet, f"{conditional_column}{end_row - len(data)}:{conditional_column}{end_row - 1}", "0.00%")
-    
+        number_formats.update({c: "0.00%" for c in percent_cols})
+
     if custom_cols:
-        for c in [c for c in custom_cols if c in data.columns]:
-            conditional_column = get_column_letter(start_col + data.columns.get_loc(c))
-            writer.set_number_format(worksheet, f"{conditional_column}{end_row - len(data)}:{conditional_column}{end_row - 1}", custom_format)
-    
-    if condition_cols:
-        for c in [c for c in condition_cols if c in data.columns]:
-            conditional_column = get_column_letter(start_col + data.columns.get_loc(c))
-            writer.add_conditional_formatting(worksheet, f'{conditional_column}{end_row - len(data)}', f'{conditional_column}{end_row - 1}')
-
-    if color_cols:
-        for c in [c for c in color_cols if c in data.columns]:
-            try:
-                rule = ColorScaleRule(start_type='num', start_value=data[c].min(), start_color=theme_color, mid_type='num', mid_value=0., mid_color='FFFFFF', end_type='num', end_value=data[c].max(), end_color=theme_color)
-                conditional_column = get_column_letter(start_col + data.columns.get_loc(c))
-                worksheet.conditional_formatting.add(f"{conditional_column}{end_row - len(data)}:{conditional_column}{end_row - 1}", rule)
-            except:
-                import traceback
-                traceback.print_exc()
+        number_formats.update({c: custom_format for c in custom_cols})
+
+    # 超过 sheet 最大行数的 dataframe 按分块写入，自动写入后续的 sheet
+    if isinstance(data, pd.DataFrame) and not kwargs.get("merge_column") and writer.exceed_max_rows(data, (start_row, start_col), header=header):
+        data = [data]
+
+    if isinstance(data, pd.DataFrame):
+        end_row, end_col = writer.insert_df2sheet(worksheet, data, (start_row, start_col), fill=fill, header=header, number_formats=number_formats, **kwargs)
+        blocks, columns = [(worksheet, end_row - len(data), end_row, end_col)], data.columns
+        value_ranges = {c: data[c] for c in color_cols or [] if c in data.columns}
+    else:
+        # 分块写入时只保留颜色填充列每块的最大最小值，保证条件格式在各个块和后续 sheet 中一致
+        value_ranges = {}
+
+        def track(chunks):
+            for chunk in chunks:
+                for c in [c for c in color_cols or [] if c in chunk.columns and len(chunk) > 0]:
+                    value_ranges[c] = pd.concat([value_ranges.get(c), chunk[c]]).agg(["min", "max"])
+                yield chunk
+
+        if kwargs.get("merge_column"):
+            raise ValueError("分块写入时不支持 merge_column")
+        blocks, columns = writer.insert_chunks2sheet(worksheet, track(data), (start_row, start_col), fill=fill, header=header, number_formats=number_formats, **kwargs)
+        end_row, end_col = blocks[-1][2:]
+
+    for _worksheet, first_row, last_row, _ in blocks:
+        if last_row <= first_row:
+            continue
+
+        if condition_cols:
+            for c in [c for c in condition_cols if c in columns]:
+                conditional_column = get_column_letter(start_col + columns.get_loc(c))
+                writer.add_conditional_formatting(_worksheet, f'{conditional_column}{first_row}', f'{conditional_column}{last_row - 1}')
+
+        if color_cols:
+            for c in [c for c in color_cols if c in value_ranges]:
+                try:
+                    rule = ColorScaleRule(start_type='num', start_value=value_ranges[c].min(), start_color=theme_color, mid_type='num', mid_value=0., mid_color='FFFFFF', end_type='num', end_value=value_ranges[c].max(), end_color=theme_color)
+                    conditional_column = get_column_letter(start_col + columns.get_loc(c))
+                    _worksheet.conditional_formatting.add(f"{conditional_column}{first_row}:{conditional_column}{last_row - 1}", rule)
+                except:
+                    import traceback
+                    traceback.print_exc()
     
-    if not isinstance(excel_writer, ExcelWriter) and not isinstance(sheet_name, Worksheet):
+    if not isinstance(excel_writer, ExcelWriter) and not isinstance(sheet_name, (Worksheet, StreamWorksheet)):
         writer.save(excel_writer)
     
     return end_row, end_col
 
 
+class SheetJob:
+    """
+    声明式的 sheet 任务，按顺序记录需要写入 sheet 的标题、文本、表格和图片，由 build_report 在子进程中渲染
+
+    >>> job = SheetJob("模型报告").title("模型报告").table(df, title="样本分布", percent_cols=["坏样本率"]).picture("roc.png", figsize=(480, 300))
+    """
+
+    # 每类内容写入之后与下一个内容之间间隔的行数
+    gaps = {"title": 1, "value": 1, "table": 2, "picture": 2}
+
+    def __init__(self, sheet_name, items=None, start_row=2, start_col=2):
+        """
+        :param sheet_name: sheet 名称
+        :param items: 写入内容的列表，每个元素为 dict ，type 可选 title、value、table、picture ，其余键值透传至对应的写入方法，可以通过 insert_space 指定写入位置、gap 指定与下一个内容间隔的行数
+        :param start_row: 第一个内容写入的行，默认 2
+        :param start_col: 内容写入的列，默认 2
+        """
+        self.sheet_name = sheet_name
+        self.items = list(items or [])
+        self.start_row = start_row
+        self.start_col = start_col
+
+    def add(self, _type, **kwargs):
+        if _type not in self.gaps:
+            raise ValueError(f"不支持的内容类型 {_type} ，可选 {list(self.gaps)}")
+        self.items.append(dict(type=_type, **kwargs))
+        return self
+
+    def title(self, value, style="header", **kwargs):
+        return self.add("title", value=value, style=style, **kwargs)
+
+    def value(self, value, style="content", **kwargs):
+        return self.add("value", value=value, style=style, **kwargs)
+
+    def table(self, data, **kwargs):
+        return self.add("table", data=data, **kwargs)
+
+    def picture(self, fig, figsize=(600, 250), **kwargs):
+        return self.add("picture", fig=fig, figsize=figsize, **kwargs)
+
+    def render(self, writer):
+        """
+        将全部内容按顺序写入 writer 中的同名 sheet
+
+        :param writer: ExcelWriter
+        :return: 返回插入元素最后一行之后的位置
+        """
+        worksheet = writer.get_sheet_by_name(self.sheet_name)
+        row = self.start_row
+
+        for item in self.items:
+            item = dict(item)
+            _type = item.pop("type")
+            gap = item.pop("gap", self.gaps[_type])
+            insert_space = item.pop("insert_space", (row, self.start_col))
+
+            if _type in ("title", "value"):
+                end_row, _ = writer.insert_value2sheet(worksheet, insert_space, **item)
+            elif _type == "table":
+                if isinstance(insert_space, str):
+                    insert_space = coordinate_to_tuple(insert_space)
+                end_row, _ = dataframe2excel(item.pop("data"), writer, sheet_name=worksheet, start_row=insert_space[0], start_col=insert_space[1], **item)
+            else:
+                end_row, _ = writer.insert_pic2sheet(worksheet, item.pop("fig"), insert_space, **item)
+
+            row = end_row + gap
+
+        return row
+
+
+def render_sheet(job, writer_params=None):
+    """
+    在独立的 ExcelWriter 中渲染一个 sheet 任务
+
+    :param job: SheetJob 或者 dict ，dict 的键值参考 SheetJob 的初始化参数
+    :param writer_params: 透传至 ExcelWriter 内的参数
+    :return: 只包含该 sheet 的工作簿内容，bytes
+    """
+    if isinstance(job, dict):
+        job = SheetJob(**job)
+
+    writer = ExcelWriter(**{**(writer_params or {}), "mode": "replace"})
+    job.render(writer)
+    content = BytesIO()
+    writer.save(content)
+
+    return content.getvalue()
+
+
+@profile
+def build_report(jobs, filename, n_jobs=-1, writer_params={}, backend=None):
+    """
+    使用进程池并行渲染多个 sheet 任务，并按声明的顺序拼接为一个完整的 excel 报告，耗时约等于最慢的 sheet 而不是全部 sheet 之和
+
+    :param jobs: SheetJob 或者 dict 组成的列表，每个任务对应一个 sheet ，sheet 名称不能重复
+    :param filename: 需要保存 excel 文件的路径，也可以是 BytesIO 等文件对象
+    :param n_jobs: 并行的进程数，默认 -1 ，即使用全部 CPU
+    :param writer_params: 透传至 ExcelWriter 内的参数，writer_params 中 mode 为 append 且文件已存在时，拼接到已有文件中
+    :param backend: joblib 的并行后端，默认 None ，即 loky 进程池
+    :return: 每个 sheet 的名称列表
+    """
+    jobs = [SheetJob(**job) if isinstance(job, dict) else job for job in jobs]
+    sheet_names = [job.sheet_name for job in jobs]
+    duplicated = {name for name in sheet_names if sheet_names.count(name) > 1}
+    if duplicated:
+        raise ValueError(f"sheet 名称重复: {sorted(duplicated)}")
+
+    if n_jobs == 1 or len(jobs) == 1:
+        contents = [render_sheet(job, writer_params) for job in jobs]
+    else:
+        contents = Parallel(n_jobs=n_jobs, backend=backend)(delayed(render_sheet)(job, writer_params) for job in jobs)
+
+    content = concat_workbooks(contents)
+
+    if writer_params.get("mode") == "append" and isinstance(filename, (str, os.PathLike)) and os.path.exists(filename):
+        append_workbook(filename, content)
+    elif isinstance(filename, (str, os.PathLike)):
+        with open(filename, "wb") as f:
+            f.write(content)
+    else:
+        filename.write(content)
+
+    return sheet_names
+
+
 if __name__ == "__main__":
     writer = ExcelWriter()
     worksheet = writer.get_sheet_by_name("模型报告")
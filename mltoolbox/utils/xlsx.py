@@ -0,0 +1,581 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/16 14:05
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import os
+import re
+import shutil
+import posixpath
+import tempfile
+from io import BytesIO
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+from xml.sax.saxutils import quoteattr
+from xml.etree import ElementTree as ET
+from joblib import Parallel, delayed
+from openpyxl.xml.functions import tostring
+from openpyxl.writer.excel import ExcelWriter as WorkbookWriter
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+WORKSHEET_REL = f"{REL_NS}/worksheet"
+OFFICE_DOCUMENT_REL = f"{REL_NS}/officeDocument"
+CALC_CHAIN_REL = f"{REL_NS}/calcChain"
+EXTENDED_PROPERTIES_REL = f"{REL_NS}/extended-properties"
+
+# styles.xml 中各个容器的先后顺序，新建容器时需要按顺序插入
+STYLE_CONTAINERS = ["numFmts", "fonts", "fills", "borders", "cellStyleXfs", "cellXfs", "cellStyles", "dxfs", "tableStyles", "colors", "extLst"]
+
+
+def _q(tag, ns=MAIN_NS):
+    return f"{{{ns}}}{tag}"
+
+
+def _rels_path(part):
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _resolve(source, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source), target))
+
+
+def _read_rels(package, part):
+    path = _rels_path(part)
+    if path not in package.namelist():
+        return []
+    return [rel.attrib for rel in ET.fromstring(package.read(path)).iter(_q("Relationship", PKG_REL_NS))]
+
+
+def _workbook_part(package):
+    for rel in _read_rels(package, ""):
+        if rel["Type"] == OFFICE_DOCUMENT_REL:
+            return _resolve("", rel["Target"])
+    raise ValueError("excel 文件中不存在 workbook")
+
+
+def _serialize(element):
+    ET.register_namespace("", MAIN_NS)
+    return ET.tostring(element, encoding="unicode").replace(f' xmlns="{MAIN_NS}"', "", 1)
+
+
+def _insert_before_close(xml, tag, content):
+    index = xml.rindex(f"</{tag}>")
+    return xml[:index] + content + xml[index:]
+
+
+class MediaWriter(WorkbookWriter):
+    """
+    openpyxl 工作簿写入器，digest 相同的图片只在 xl/media 中保存一份，多个位置的图片引用同一份内容
+    """
+
+    def __init__(self, workbook, archive):
+        super().__init__(workbook, archive)
+        self._media = {}
+
+    def _write_drawing(self, drawing):
+        self._drawings.append(drawing)
+        drawing._id = len(self._drawings)
+        for chart in drawing.charts:
+            self._charts.append(chart)
+            chart._id = len(self._charts)
+        for img in drawing.images:
+            key = (getattr(img, "digest", None) or id(img), img.format)
+            if key in self._media:
+                img._id = self._media[key]._id
+                continue
+            self._images.append(img)
+            img._id = len(self._images)
+            self._media[key] = img
+        rels_path = _rels_path(drawing.path[1:])
+        self._archive.writestr(drawing.path[1:], tostring(drawing._write()))
+        self._archive.writestr(rels_path, tostring(drawing._write_rels()))
+        self.manifest.append(drawing)
+
+
+def save_workbook(workbook, filename):
+    """
+    保存 openpyxl 工作簿，与 Workbook.save 相同，但相同内容的图片只保存一份
+
+    :param workbook: openpyxl 工作簿
+    :param filename: 需要保存 excel 文件的路径，也可以是 BytesIO 等文件对象
+    """
+    if workbook.write_only and not workbook.worksheets:
+        workbook.create_sheet()
+
+    archive = ZipFile(filename, "w", ZIP_DEFLATED, allowZip64=True)
+    MediaWriter(workbook, archive).save()
+
+
+class StyleMerger:
+    """
+    将新工作簿 styles.xml 中的样式追加到已有工作簿的 styles.xml，并记录新旧样式编号的对应关系
+    """
+
+    def __init__(self, styles, new_styles):
+        """
+        :param styles: 已有工作簿的 styles.xml 内容
+        :param new_styles: 新工作簿的 styles.xml 内容
+        """
+        self.xml = styles.decode("utf-8") if isinstance(styles, bytes) else styles
+        self.root = ET.fromstring(self.xml)
+        self.new_root = ET.fromstring(new_styles)
+        self.appended = {tag: [] for tag in STYLE_CONTAINERS}
+        self.existing = {tag: [_serialize(child) for child in self.children(self.root, tag)] for tag in ["fonts", "fills", "borders", "cellStyleXfs", "cellXfs", "dxfs"]}
+
+        self.num_fmts = self.merge_num_fmts()
+        self.fonts = self.merge_list("fonts")
+        self.fills = self.merge_list("fills")
+        self.borders = self.merge_list("borders")
+        self.style_xfs = self.merge_style_xfs()
+        self.cell_xfs = self.merge_list("cellXfs", self.remap_xf)
+        self.dxfs = self.merge_list("dxfs")
+
+    @staticmethod
+    def children(root, tag):
+        container = root.find(_q(tag))
+        return list(container) if container is not None else []
+
+    def append(self, tag, element):
+        """
+        追加一个样式元素，内容完全相同的样式只保留一份
+
+        :return 该样式在已有工作簿中的编号
+        """
+        content = _serialize(element)
+        existing = self.existing.setdefault(tag, [])
+        if content in existing:
+            return existing.index(content)
+
+        existing.append(content)
+        self.appended[tag].append(content)
+        return len(existing) - 1
+
+    def merge_list(self, tag, remap=None):
+        mapping = []
+        for element in self.children(self.new_root, tag):
+            if remap is not None:
+                remap(element)
+            mapping.append(self.append(tag, element))
+        return mapping
+
+    def merge_num_fmts(self):
+        codes = {fmt.get("formatCode"): int(fmt.get("numFmtId")) for fmt in self.children(self.root, "numFmts")}
+        next_id = max(list(codes.values()) + [163]) + 1
+        mapping = {}
+        for fmt in self.children(self.new_root, "numFmts"):
+            code = fmt.get("formatCode")
+            if code not in codes:
+                codes[code] = next_id
+                next_id += 1
+                element = ET.Element(_q("numFmt"), numFmtId=str(codes[code]), formatCode=code)
+                self.appended["numFmts"].append(_serialize(element))
+            mapping[int(fmt.get("numFmtId"))] = codes[code]
+        return mapping
+
+    def remap_xf(self, xf, style_xfs=True):
+        for attr, mapping in [("fontId", self.fonts), ("fillId", self.fills), ("borderId", self.borders)]:
+            if xf.get(attr) is not None:
+                xf.set(attr, str(mapping[int(xf.get(attr))]))
+
+        num_fmt = int(xf.get("numFmtId", 0))
+        xf.set("numFmtId", str(self.num_fmts.get(num_fmt, num_fmt)))
+
+        if style_xfs and xf.get("xfId") is not None:
+            xf.set("xfId", str(self.style_xfs[int(xf.get("xfId"))]))
+
+    def merge_style_xfs(self):
+        """
+        合并命名样式，同名的命名样式沿用已有工作簿中的样式
+        """
+        names = {style.get("name"): int(style.get("xfId")) for style in self.children(self.root, "cellStyles")}
+        named = {int(style.get("xfId")): style for style in self.children(self.new_root, "cellStyles")}
+
+        mapping = []
+        for i, xf in enumerate(self.children(self.new_root, "cellStyleXfs")):
+            style = named.get(i)
+            if style is not None and style.get("name") in names:
+                mapping.append(names[style.get("name")])
+                continue
+
+            self.remap_xf(xf, style_xfs=False)
+            mapping.append(self.append("cellStyleXfs", xf))
+            if style is not None:
+                style.set("xfId", str(mapping[-1]))
+                names[style.get("name")] = mapping[-1]
+                self.appended["cellStyles"].append(_serialize(style))
+
+        return mapping
+
+    def tostring(self):
+        """
+        将追加的样式写入已有工作簿的 styles.xml，并更新各个容器的 count
+        """
+        xml = self.xml
+        for tag in STYLE_CONTAINERS:
+            if not self.appended[tag]:
+                continue
+
+            count = len(self.children(self.root, tag)) + len(self.appended[tag])
+            content = "".join(self.appended[tag])
+            match = re.search(rf"<{tag}\b([^>]*?)(/?)>", xml)
+            if match is None:
+                following = [t for t in STYLE_CONTAINERS[STYLE_CONTAINERS.index(tag) + 1:] if re.search(rf"<{t}\b", xml)]
+                index = re.search(rf"<{following[0]}\b", xml).start() if following else xml.rindex("</styleSheet>")
+                xml = xml[:index] + f'<{tag} count="{count}">{content}</{tag}>' + xml[index:]
+                continue
+
+            attrs = re.sub(r'\s*\bcount="\d*"', "", match.group(1))
+            start = f'<{tag} count="{count}"{attrs}>'
+            if match.group(2):
+                xml = xml[:match.start()] + start + content + f"</{tag}>" + xml[match.end():]
+            else:
+                close = xml.index(f"</{tag}>", match.end())
+                xml = xml[:match.start()] + start + xml[match.end():close] + content + xml[close:]
+
+        return xml
+
+
+class WorkbookSplicer:
+    """
+    在 zip/xml 层面将新工作簿中的 sheet 拼接到已有的 excel 文件中
+
+    已有 sheet 的内容不经过解析直接拷贝，合并单元格、图片、条件格式等全部保留，耗时只和新写入的内容相关，
+    与已有 sheet 同名的 sheet 会替换已有 sheet 的内容，原 sheet 的图片、绘图等不再被引用的 part 一并删除，其余 sheet 追加在已有 sheet 之后；
+    新工作簿中的名称 (打印区域、命名区域等) 合并到已有工作簿中，同名同作用域的名称以新工作簿为准
+    拼接后删除计算链 calcChain.xml 和 docProps/app.xml 中的 sheet 列表，由 excel 打开或保存时重新生成
+    """
+
+    def __init__(self, filename, content):
+        """
+        :param filename: 已有的 excel 文件路径
+        :param content: 新工作簿保存后的内容，bytes
+        """
+        self.filename = filename
+        self.package = ZipFile(filename)
+        self.new_package = ZipFile(BytesIO(content))
+        self.names = set(self.package.namelist())
+        self.parts = {}
+        self.content_types = []
+
+        self.workbook = _workbook_part(self.package)
+        self.new_workbook = _workbook_part(self.new_package)
+        self.workbook_rels = _read_rels(self.package, self.workbook)
+
+        if re.match(r"(<\?xml[^>]*>\s*)?<\w+:workbook\b", self.package.read(self.workbook).decode("utf-8")):
+            self.close()
+            raise ValueError(f"{filename} 使用了带前缀的命名空间，暂不支持追加写入")
+
+    def close(self):
+        self.package.close()
+        self.new_package.close()
+
+    def part_by_type(self, package, workbook, _type):
+        for rel in _read_rels(package, workbook):
+            if rel["Type"] == f"{REL_NS}/{_type}":
+                return _resolve(workbook, rel["Target"])
+
+    def sheets(self, package, workbook):
+        rels = {rel["Id"]: rel for rel in _read_rels(package, workbook)}
+        root = ET.fromstring(package.read(workbook))
+        return [(sheet.get("name"), sheet.get("sheetId"), sheet.get(_q("id", REL_NS)), _resolve(workbook, rels[sheet.get(_q("id", REL_NS))]["Target"])) for sheet in root.iter(_q("sheet"))]
+
+    def unique_name(self, part):
+        stem, ext = posixpath.splitext(part)
+        stem = re.sub(r"\d+$", "", stem)
+        i = 1
+        while f"{stem}{i}{ext}" in self.names:
+            i += 1
+        self.names.add(f"{stem}{i}{ext}")
+        return f"{stem}{i}{ext}"
+
+    def copy_part(self, part, target=None):
+        """
+        从新工作簿拷贝一个 part 及其关联的 part，重名的 part 重新命名
+
+        :return 拷贝后的 part 路径
+        """
+        if part in self.parts:
+            return self.parts[part]
+
+        self.parts[part] = target or self.unique_name(part)
+        self.content_types.append((part, self.parts[part]))
+
+        rels = _read_rels(self.new_package, part)
+        if rels:
+            relationships = []
+            for rel in rels:
+                if rel.get("TargetMode") == "External":
+                    relationships.append(rel)
+                else:
+                    relationships.append(dict(rel, Target="/" + self.copy_part(_resolve(part, rel["Target"]))))
+
+            self.parts[_rels_path(part)] = (_rels_path(self.parts[part]), '<Relationships xmlns="%s">%s</Relationships>' % (PKG_REL_NS, "".join("<Relationship %s/>" % " ".join(f"{k}={quoteattr(v)}" for k, v in rel.items()) for rel in relationships)))
+
+        return self.parts[part]
+
+    def shared_strings(self):
+        part = self.part_by_type(self.new_package, self.new_workbook, "sharedStrings")
+        if part is None:
+            return []
+        return [m.group(1) or "" for m in re.finditer(r"<si>(.*?)</si>|<si\s*/>", self.new_package.read(part).decode("utf-8"), re.S)]
+
+    def convert_sheet(self, xml, styles, strings):
+        """
+        转换新 sheet 的 xml：共享字符串转为内联字符串，样式编号转为已有工作簿中的编号，取消 sheet 的选中状态
+        """
+        if strings:
+            xml = re.sub(r'<c\b([^>]*?)\bt="s"([^>]*)><v>(\d+)</v>', lambda m: f'<c{m.group(1)}t="inlineStr"{m.group(2)}><is>{strings[int(m.group(3))]}</is>', xml)
+
+        # 新旧工作簿样式编号一致时不需要逐个单元格替换
+        if styles.cell_xfs != list(range(len(styles.cell_xfs))):
+            xml = re.sub(r'(<(?:c|row)\b[^>]*?\bs=")(\d+)"', lambda m: f'{m.group(1)}{styles.cell_xfs[int(m.group(2))]}"', xml)
+            xml = re.sub(r'(<col\b[^>]*?\bstyle=")(\d+)"', lambda m: f'{m.group(1)}{styles.cell_xfs[int(m.group(2))]}"', xml)
+
+        if styles.dxfs != list(range(len(styles.dxfs))):
+            xml = re.sub(r'(<cfRule\b[^>]*?\bdxfId=")(\d+)"', lambda m: f'{m.group(1)}{styles.dxfs[int(m.group(2))]}"', xml)
+
+        head, sep, tail = xml.partition("<sheetData")
+        xml = re.sub(r'\s*\btabSelected="1"', "", head) + sep + tail
+
+        return xml
+
+    def orphaned_parts(self, sheet_parts):
+        """
+        被替换的 sheet 直接或间接引用的 part 中，不再被已有工作簿其他 part 引用的部分
+
+        :param sheet_parts: 被替换的 sheet part
+        :return: 需要删除的 part 及其 rels
+        """
+        names = set(self.package.namelist())
+
+        def walk(parts, skip):
+            seen, stack = set(), list(parts)
+            while stack:
+                part = stack.pop()
+                if part in seen or part in skip or part not in names:
+                    continue
+                seen.add(part)
+                stack.extend(_resolve(part, rel["Target"]) for rel in _read_rels(self.package, part) if rel.get("TargetMode") != "External")
+            return seen
+
+        roots = [_resolve("", rel["Target"]) for rel in _read_rels(self.package, "") if rel.get("TargetMode") != "External"]
+        orphaned = walk(sheet_parts, walk(roots, set(sheet_parts)))
+        return orphaned | {_rels_path(part) for part in orphaned}
+
+    def merge_defined_names(self, workbook_xml, old_names, new_names, replaced_names):
+        """
+        合并新旧工作簿的 definedNames ，新工作簿中 localSheetId 按 sheet 名称转换为拼接后的 sheet 下标，
+        已有工作簿中作用于被替换 sheet 的名称以及与新名称同名同作用域的名称被删除
+
+        :param workbook_xml: 已有工作簿的 workbook.xml
+        :param old_names: 已有工作簿的 sheet 名称，按顺序
+        :param new_names: 新工作簿的 sheet 名称，按顺序
+        :param replaced_names: 被替换的 sheet 名称
+        :return: 合并后的 workbook.xml
+        """
+        pattern = re.compile(r"<definedName\b[^>]*?(?:/>|>.*?</definedName>)", re.S)
+        block = re.search(r"<definedNames\b[^>]*?(?:/>|>.*?</definedNames>)", workbook_xml, re.S)
+        new_block = re.search(r"<definedNames\b[^>]*?(?:/>|>.*?</definedNames>)", self.new_package.read(self.new_workbook).decode("utf-8"), re.S)
+        if new_block is None:
+            return workbook_xml
+
+        def scope(xml, names):
+            index = re.match(r'<definedName\b[^>]*?\blocalSheetId="(\d+)"', xml)
+            return re.match(r'<definedName\b[^>]*?\bname="([^"]*)"', xml).group(1).lower(), names[int(index.group(1))] if index else None
+
+        order = {name: i for i, name in enumerate(old_names + [name for name in new_names if name not in old_names])}
+        merged = []
+        for xml in pattern.findall(new_block.group(0)):
+            name, sheet = scope(xml, new_names)
+            if sheet is not None:
+                xml = re.sub(r'(\blocalSheetId=")\d+"', lambda m: f'{m.group(1)}{order[sheet]}"', xml, count=1)
+            merged.append(((name, sheet), xml))
+
+        keys = {key for key, _ in merged}
+        existing = [xml for xml in pattern.findall(block.group(0))] if block else []
+        kept = [xml for xml in existing if scope(xml, old_names)[1] not in replaced_names and scope(xml, old_names) not in keys]
+        content = "<definedNames>%s</definedNames>" % "".join(kept + [xml for _, xml in merged])
+
+        if block:
+            return workbook_xml[:block.start()] + content + workbook_xml[block.end():]
+        anchor = "</externalReferences>" if "</externalReferences>" in workbook_xml else "</sheets>"
+        index = workbook_xml.index(anchor) + len(anchor)
+        return workbook_xml[:index] + content + workbook_xml[index:]
+
+    def splice(self, output):
+        """
+        拼接后的 excel 文件写入 output
+        """
+        styles_part = self.part_by_type(self.package, self.workbook, "styles")
+        styles = StyleMerger(self.package.read(styles_part), self.new_package.read(self.part_by_type(self.new_package, self.new_workbook, "styles")))
+        strings = self.shared_strings()
+
+        sheets = {name: (sheet_id, rel_id, part) for name, sheet_id, rel_id, part in self.sheets(self.package, self.workbook)}
+        sheet_ids = [int(sheet_id) for sheet_id, _, _ in sheets.values()]
+        rel_ids = {rel["Id"] for rel in self.workbook_rels}
+
+        new_sheets = self.sheets(self.new_package, self.new_workbook)
+        replaced, appended, sheet_xml = set(), [], {}
+        for name, _, _, part in new_sheets:
+            if name in sheets:
+                target = sheets[name][2]
+                replaced.add(target)
+            else:
+                target = self.unique_name("xl/worksheets/sheet1.xml")
+                rel_id = next(f"rId{i}" for i in range(1, len(rel_ids) + 2) if f"rId{i}" not in rel_ids)
+                rel_ids.add(rel_id)
+                sheet_ids.append(max(sheet_ids + [0]) + 1)
+                appended.append((name, sheet_ids[-1], rel_id, target))
+
+            self.copy_part(part, target=target)
+            sheet_xml[target] = self.convert_sheet(self.new_package.read(part).decode("utf-8"), styles, strings)
+
+        replaced = self.orphaned_parts(replaced)
+        # 计算链中记录了每个公式单元格的位置，sheet 被替换或追加后不再准确，删除后 excel 打开时会重新生成
+        calc_chain = self.part_by_type(self.package, self.workbook, "calcChain")
+        if calc_chain is not None:
+            replaced.add(calc_chain)
+
+        workbook_xml = self.package.read(self.workbook).decode("utf-8")
+        if appended:
+            workbook_xml = _insert_before_close(workbook_xml, "sheets", "".join(f'<sheet xmlns:r="{REL_NS}" name={quoteattr(name)} sheetId="{sheet_id}" r:id="{rel_id}"/>' for name, sheet_id, rel_id, _ in appended))
+        workbook_xml = self.merge_defined_names(workbook_xml, list(sheets), [name for name, _, _, _ in new_sheets], {name for name, _, _, _ in new_sheets if name in sheets})
+
+        workbook_rels = self.package.read(_rels_path(self.workbook)).decode("utf-8")
+        if appended:
+            workbook_rels = _insert_before_close(workbook_rels, "Relationships", "".join(f'<Relationship Id="{rel_id}" Type="{WORKSHEET_REL}" Target="/{target}"/>' for _, _, rel_id, target in appended))
+        workbook_rels = re.sub(r'<Relationship\b[^>]*\bType="%s"[^>]*/>' % re.escape(CALC_CHAIN_REL), "", workbook_rels)
+
+        updates = {
+            styles_part: styles.tostring(),
+            self.workbook: workbook_xml,
+            _rels_path(self.workbook): workbook_rels,
+            "[Content_Types].xml": self.merge_content_types(replaced),
+        }
+        app = next((_resolve("", rel["Target"]) for rel in _read_rels(self.package, "") if rel["Type"] == EXTENDED_PROPERTIES_REL), None)
+        if app is not None and app in self.package.namelist():
+            # docProps/app.xml 中的 sheet 列表只用于展示，删除后 excel 保存时会重新生成
+            updates[app] = re.sub(r"<(\w+:)?(HeadingPairs|TitlesOfParts)\b.*?</(\w+:)?\2>", "", self.package.read(app).decode("utf-8"), flags=re.S)
+        for part, target in list(self.parts.items()):
+            if isinstance(target, tuple):
+                updates[target[0]] = target[1]
+            elif target in sheet_xml:
+                updates[target] = sheet_xml[target]
+
+        with ZipFile(output, "w", ZIP_DEFLATED) as zf:
+            for info in self.package.infolist():
+                if info.filename in updates or info.filename in replaced:
+                    continue
+                zinfo = ZipInfo(info.filename, info.date_time)
+                zinfo.compress_type = info.compress_type
+                with self.package.open(info) as src, zf.open(zinfo, "w") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+            for part, target in self.parts.items():
+                if not isinstance(target, tuple) and target not in updates:
+                    with self.new_package.open(part) as src, zf.open(target, "w") as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+            for part, content in updates.items():
+                zf.writestr(part, content)
+
+    def merge_content_types(self, replaced):
+        xml = self.package.read("[Content_Types].xml").decode("utf-8")
+        # 被替换 sheet 中不再使用的 part 删除对应的 Override ，sheet 本身的 part 名称沿用
+        targets = {target for target in self.parts.values() if not isinstance(target, tuple)}
+        for part in replaced - targets:
+            xml = re.sub(r'<Override\b[^>]*?\bPartName="/%s"[^>]*/>' % re.escape(part), "", xml)
+        root = ET.fromstring(xml)
+        new_root = ET.fromstring(self.new_package.read("[Content_Types].xml"))
+
+        defaults = {item.get("Extension").lower() for item in root.iter(_q("Default", CT_NS))}
+        overrides = {item.get("PartName") for item in root.iter(_q("Override", CT_NS))}
+        new_defaults = {item.get("Extension").lower(): item.get("ContentType") for item in new_root.iter(_q("Default", CT_NS))}
+        new_overrides = {item.get("PartName"): item.get("ContentType") for item in new_root.iter(_q("Override", CT_NS))}
+
+        items = []
+        for part, target in self.content_types:
+            extension = posixpath.splitext(part)[1].lstrip(".").lower()
+            if f"/{part}" in new_overrides:
+                if f"/{target}" not in overrides:
+                    overrides.add(f"/{target}")
+                    items.append(f'<Override PartName="/{target}" ContentType="{new_overrides[f"/{part}"]}"/>')
+            elif extension not in defaults and extension in new_defaults:
+                defaults.add(extension)
+                items.append(f'<Default Extension="{extension}" ContentType="{new_defaults[extension]}"/>')
+
+        return _insert_before_close(xml, "Types", "".join(items)) if items else xml
+
+
+def append_workbook(filename, content, output=None):
+    """
+    将新工作簿中的 sheet 拼接到已有的 excel 文件中，不解析已有 sheet 的内容
+
+    :param filename: 已有的 excel 文件路径
+    :param content: 新工作簿保存后的内容，bytes
+    :param output: 拼接后保存的文件路径，默认覆盖 filename
+    """
+    output = output or filename
+    splicer = WorkbookSplicer(filename, content)
+    fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            splicer.splice(f)
+        splicer.close()
+        os.replace(tmp, output)
+    except Exception:
+        splicer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def concat_workbooks(contents, n_jobs=1):
+    """
+    按顺序将多个工作簿拼接为一个工作簿，两两拼接逐轮合并，每轮内的拼接相互独立，可以并行执行
+
+    :param contents: 工作簿保存后的内容列表，bytes，sheet 名称需要互不相同
+    :param n_jobs: 每轮拼接使用的进程数，默认 1
+    :return: 拼接后工作簿的内容，bytes
+    """
+    contents = list(contents)
+    if not contents:
+        raise ValueError("至少需要一个工作簿")
+
+    while len(contents) > 1:
+        pairs = [contents[i:i + 2] for i in range(0, len(contents), 2)]
+        if n_jobs == 1 or len(pairs) == 1:
+            contents = [splice_workbooks(*pair) for pair in pairs]
+        else:
+            contents = Parallel(n_jobs=n_jobs)(delayed(splice_workbooks)(*pair) for pair in pairs)
+
+    return contents[0]
+
+
+def splice_workbooks(content, new_content=None):
+    """
+    在内存中将 new_content 中的 sheet 拼接到 content 之后
+
+    :param content: 已有工作簿的内容，bytes
+    :param new_content: 新工作簿的内容，bytes，为空时直接返回 content
+    :return: 拼接后工作簿的内容，bytes
+    """
+    if new_content is None:
+        return content
+
+    output = BytesIO()
+    splicer = WorkbookSplicer(BytesIO(content), new_content)
+    try:
+        splicer.splice(output)
+    finally:
+        splicer.close()
+
+    return output.getvalue()
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 11:00
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import pytest
+from openpyxl import Workbook
+
+
+@pytest.fixture
+def template(tmp_path):
+    workbook = Workbook()
+    workbook.active.title = "初始化"
+    workbook.save(tmp_path / "template.xlsx")
+    return str(tmp_path / "template.xlsx")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 04:20
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mltoolbox.utils.reader import load_artifact, clear_artifact_cache, artifact_path
+from mltoolbox.utils.writer import save_artifact
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    clear_artifact_cache()
+    yield
+    clear_artifact_cache()
+
+
+@pytest.fixture
+def model():
+    rng = np.random.RandomState(42)
+    weights = rng.normal(size=(512, 512))
+    bins = pd.DataFrame({"feature": [f"x{i}" for i in range(1000)], "woe": rng.normal(size=1000)})
+    table = pd.DataFrame(rng.normal(size=(200000, 2)), columns=["a", "b"])
+    return {"weights": weights, "bins": bins, "table": table, "params": {"gamma": 2., "classes": [0, 1]}}
+
+
+def files(store, kind):
+    return glob.glob(os.path.join(store, kind, "*", "*"))
+
+
+@pytest.mark.parametrize("compress", [0, 3, "gzip", ("bz2", 5), ("lzma", 1)])
+def test_roundtrip(model, tmp_path, compress):
+    store = str(tmp_path)
+    key = save_artifact(model, store, compress=compress)
+    loaded = load_artifact(key, store)
+
+    assert loaded["params"] == model["params"]
+    pd.testing.assert_frame_equal(loaded["bins"], model["bins"])
+    pd.testing.assert_frame_equal(loaded["table"], model["table"])
+    np.testing.assert_array_equal(loaded["weights"], model["weights"])
+
+    # 大数组以只读的内存映射加载，小数组压缩在 pickle 中
+    assert isinstance(loaded["weights"], np.memmap) and not loaded["weights"].flags.writeable
+    assert len(files(store, "arrays")) == 2
+
+
+def test_content_addressed(model, tmp_path):
+    store = str(tmp_path)
+    key = save_artifact(model, store)
+    assert save_artifact(dict(model), store, compress="lzma") == key
+    assert len(files(store, "objects")) == 1
+
+    # 不同的 artifact 中相同的大数组只保存一份
+    other = save_artifact({"weights": model["weights"], "version": 2}, store)
+    assert other != key
+    assert len(files(store, "objects")) == 2 and len(files(store, "arrays")) == 2
+
+    # 重新保存加载出来的内存映射不会产生新的文件
+    assert save_artifact(load_artifact(key, store), store) == key
+
+
+def test_cache(model, tmp_path):
+    store = str(tmp_path)
+    key = save_artifact(model, store)
+    loaded = load_artifact(key, store)
+    assert load_artifact(key, store) is loaded
+    assert load_artifact(key, store, cache=False) is not loaded
+
+    path = artifact_path(store, key)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_artifact(key, store) is not loaded
+
+    in_memory = load_artifact(key, store, mmap_mode=None)
+    assert not isinstance(in_memory["weights"], np.memmap)
+
+
+def sum_weights(key, store):
+    weights = load_artifact(key, store)["weights"]
+    return isinstance(weights, np.memmap), float(weights.sum())
+
+
+def test_workers(model, tmp_path):
+    store = str(tmp_path)
+    key = save_artifact(model, store)
+    with ProcessPoolExecutor(2) as pool:
+        results = list(pool.map(sum_weights, [key] * 4, [store] * 4))
+    assert results == [(True, float(model["weights"].sum()))] * 4
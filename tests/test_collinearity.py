@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 08:40
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from mltoolbox.eda import Collinearity, correlation_pairs, vif
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.RandomState(42)
+    n = 5000
+    base = rng.normal(size=(n, 3))
+    data = pd.DataFrame(rng.normal(size=(n, 7)), columns=[f"x{i}" for i in range(7)])
+    data["a"] = base[:, 0] * 1000 + 1e6
+    data["b"] = base[:, 0] + 0.1 * rng.normal(size=n)
+    data["c"] = np.exp(base[:, 1])
+    data["d"] = base[:, 1] + 0.3 * base[:, 2]
+    data["flag"] = rng.random_sample(n) < 0.3
+    return data
+
+
+def test_matrix(dataset):
+    expected = dataset.astype(float).corr()
+    for block_size in (3, 512):
+        matrix = Collinearity(dataset, block_size=block_size, chunk_size=700, n_jobs=2).matrix()
+        np.testing.assert_allclose(matrix, expected, atol=1e-10)
+
+    np.testing.assert_allclose(Collinearity(dataset, float32=True, block_size=4).matrix(), expected, atol=1e-5)
+    np.testing.assert_allclose(Collinearity(dataset, method="spearman", block_size=4).matrix(), dataset.astype(float).corr("spearman"), atol=1e-10)
+
+    # 存在缺失值和常数列时与 pd.DataFrame.corr 的逐对计算一致
+    missing = dataset.astype(float).mask(np.random.RandomState(0).random_sample(dataset.shape) < 0.2)
+    missing["constant"] = 1.
+    np.testing.assert_allclose(Collinearity(missing, block_size=4, chunk_size=1000).matrix(), missing.corr(), atol=1e-10)
+
+
+def test_pairs(dataset):
+    pairs = correlation_pairs(dataset, threshold=0.5, block_size=3)
+    corr = dataset.astype(float).corr().where(np.triu(np.ones((dataset.shape[1],) * 2, dtype=bool), k=1)).stack()
+    expected = corr[corr.abs() >= 0.5]
+
+    assert set(zip(pairs["feature_a"], pairs["feature_b"])) == set(expected.index)
+    assert pairs.iloc[0][["feature_a", "feature_b"]].tolist() == ["a", "b"] and pairs["corr"].abs().is_monotonic_decreasing
+
+
+def test_vif(dataset):
+    result = vif(dataset, block_size=4)
+    X = dataset.astype(float)
+    for column in X.columns:
+        others = X.drop(columns=column)
+        r2 = LinearRegression().fit(others, X[column]).score(others, X[column])
+        assert result[column] == pytest.approx(1 / (1 - r2), rel=1e-6)
+
+    collinear = dataset.assign(e=dataset["a"] - 2 * dataset["x0"], constant=1)
+    result = vif(collinear)
+    assert np.isinf(result[["a", "x0", "e"]]).all() and np.isfinite(result[["b", "c", "x1"]]).all() and np.isnan(result["constant"])
+
+
+def test_chunks(dataset, tmp_path):
+    from mltoolbox.utils.reader import DatasetReader
+
+    # 缺失值只出现在后面的块中，大数值的列在第一块中全部缺失
+    data = dataset.astype(float)
+    data.loc[3000:, "x1"] = np.nan
+    data.loc[data.index % 7 == 0, "c"] = np.nan
+    data["late"] = np.where(data.index < 1000, np.nan, data["a"] * 10 + data["x0"])
+    chunks = (data.iloc[start:start + 1000] for start in range(0, len(data), 1000))
+
+    collinearity = Collinearity(chunks, block_size=4, n_jobs=2)
+    assert collinearity.rows == len(data) and collinearity.missing.sum() == 3
+    np.testing.assert_allclose(collinearity.matrix(), data.corr(), atol=1e-10)
+    np.testing.assert_allclose(Collinearity(iter([data.iloc[:2500], data.iloc[2500:]]), float32=True, block_size=4).matrix(), data.corr(), atol=1e-5)
+
+    dataset.to_csv(tmp_path / "data.csv", index=False)
+    matrix = Collinearity(DatasetReader(str(tmp_path / "data.csv"), chunk_size=700, downcast=False)).matrix()
+    np.testing.assert_allclose(matrix, dataset.astype(float).corr(), atol=1e-10)
+
+    with pytest.raises(ValueError):
+        Collinearity(iter([data]), method="spearman")
+
+
+def test_vif_missing(dataset):
+    # 各段缺失不同的变量，逐对计算的相关系数矩阵不是半正定矩阵，VIF 只使用完整样本计算，与完整样本上的回归一致
+    data = dataset.astype(float)
+    rng = np.random.RandomState(1)
+    u = rng.normal(size=len(data))
+    data[["p", "q", "r"]] = rng.normal(size=(len(data), 3))
+    # p≈q 、q≈-r 、p≈r 分别只在缺失第三个变量的样本上成立
+    for rows, values in [(slice(0, 1600), dict(p=1, q=1, r=np.nan)), (slice(1600, 3200), dict(p=np.nan, q=1, r=-1)), (slice(3200, 4800), dict(p=1, q=np.nan, r=1))]:
+        for column, sign in values.items():
+            data.iloc[rows, data.columns.get_loc(column)] = sign * u[rows]
+    assert np.linalg.eigvalsh(data.corr().to_numpy()).min() < 0
+
+    collinearity = Collinearity(iter([data.iloc[:1000], data.iloc[1000:]]), block_size=4)
+    with pytest.warns(UserWarning):
+        result = collinearity.vif()
+
+    X = data.dropna()
+    assert collinearity.complete_rows == len(X) and np.isfinite(result[["p", "q", "r"]]).all()
+    for column in X.columns:
+        others = X.drop(columns=column)
+        r2 = LinearRegression().fit(others, X[column]).score(others, X[column])
+        assert result[column] == pytest.approx(1 / (1 - r2), rel=1e-6)
+
+    with pytest.raises(ValueError):
+        Collinearity(data.assign(e=np.where(data.index < 2500, 1., np.nan), b=np.where(data.index < 2500, np.nan, 1.))).vif()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 05:50
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import KFold, cross_val_predict
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import LinearSVC
+from sklearn.tree import DecisionTreeClassifier
+
+from mltoolbox.cv import CrossValidator, cross_validate
+from mltoolbox.utils.reader import load_artifact
+
+
+class CountingScaler(StandardScaler):
+    fits = 0
+
+    def fit(self, X, y=None, sample_weight=None):
+        CountingScaler.fits += 1
+        return super().fit(X, y, sample_weight=sample_weight)
+
+
+@pytest.fixture
+def dataset():
+    X, y = make_classification(n_samples=3000, n_features=20, random_state=42)
+    return pd.DataFrame(X * 100, columns=[f"x{i}" for i in range(20)]), y
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_oof(dataset, n_jobs):
+    X, y = dataset
+    folds = KFold(5, shuffle=True, random_state=0)
+    result = cross_validate(LogisticRegression(max_iter=1000), X, y, cv=folds, n_jobs=n_jobs)
+
+    expected = cross_val_predict(LogisticRegression(max_iter=1000), X, y, cv=folds, method="predict_proba")[:, 1]
+    np.testing.assert_allclose(result.oof, expected)
+    assert result.scores["fold"].tolist() == list(range(5)) and result.scores["valid_size"].sum() == len(y)
+
+    valid = [v for _, v in folds.split(X, y)]
+    np.testing.assert_allclose(result.scores["auc"], [roc_auc_score(y[v], expected[v]) for v in valid])
+    assert {"ks", "fit_time", "predict_time"} <= set(result.summary.index)
+
+
+def test_shared_data(dataset, tmp_path):
+    X, y = dataset
+    validator = CrossValidator(X, y, cv=3, n_jobs=2, cache_dir=str(tmp_path), mmap_threshold=0)
+    data = load_artifact(validator.data_key, validator.store, cache=False)
+    assert isinstance(data["y"], np.memmap)
+    assert all(isinstance(train, np.memmap) and train.dtype == np.int32 for train, _ in validator.folds)
+
+    # 数据只保存一份，重复初始化时复用
+    other = CrossValidator(X, y, cv=3, cache_dir=str(tmp_path), mmap_threshold=0)
+    assert other.data_key == validator.data_key
+
+    validator.close()
+    assert os.path.exists(str(tmp_path / "objects"))
+
+
+def test_preprocess_cache(dataset, tmp_path):
+    X, y = dataset
+    CountingScaler.fits = 0
+
+    with CrossValidator(X, y, cv=4, n_jobs=1, seed=42) as validator:
+        first = validator.evaluate(LogisticRegression(max_iter=1000), preprocessor=CountingScaler())
+        second = validator.evaluate(DecisionTreeClassifier(max_depth=3), preprocessor=CountingScaler(), return_estimator=True)
+        store = validator.store
+
+        assert CountingScaler.fits == 4
+        assert not first.scores["cached"].any() and second.scores["cached"].all()
+        assert second.estimators[1].random_state != second.estimators[0].random_state
+
+        # 预处理参数不同时重新拟合
+        validator.evaluate(LogisticRegression(max_iter=1000), preprocessor=CountingScaler(with_mean=False))
+        assert CountingScaler.fits == 8
+
+    assert not os.path.exists(store)
+
+
+def test_partial_folds():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(100, 3))
+    y = X @ [1., 2., 3.]
+    folds = [(np.arange(0, 60), np.arange(60, 80)), (np.arange(0, 80), np.arange(80, 100))]
+    result = cross_validate(Ridge(), X, y, cv=folds, n_jobs=1, metrics={"mae": lambda t, p: np.abs(t - p).mean()})
+
+    assert np.isnan(result.oof[:60]).all() and not np.isnan(result.oof[60:]).any()
+    assert result.scores["mae"].max() < 0.1
+
+
+def test_label_oof(dataset):
+    X, y = dataset
+    labels = np.where(y == 1, "good", "bad")
+    folds = KFold(3, shuffle=True, random_state=0)
+    result = cross_validate(LinearSVC(dual=False), X, labels, cv=folds, n_jobs=1)
+    assert result.oof.dtype.kind == "U" and (result.oof == cross_val_predict(LinearSVC(dual=False), X, labels, cv=folds)).all()
+
+    # 整数标签同样不取平均，未进入验证集的样本为 None ，验证集重叠时报错
+    partial = [(np.arange(1000, 3000), np.arange(0, 1000)), (np.arange(0, 1000), np.arange(1000, 2000))]
+    oof = cross_validate(DecisionTreeClassifier(max_depth=3), X, y, cv=partial, method="predict", n_jobs=1).oof
+    assert oof.dtype == object and all(v is None for v in oof[2000:]) and set(oof[:2000]) <= {0, 1}
+    with pytest.raises(ValueError):
+        cross_validate(DecisionTreeClassifier(max_depth=3), X, y, cv=[(np.arange(1000, 3000), np.arange(0, 1500))] * 2, method="predict", n_jobs=1)
+
+
+def test_rare_class(dataset):
+    X, y = dataset
+    y = y.copy()
+    y[:2] = 2
+    with pytest.warns(UserWarning):
+        result = cross_validate(DecisionTreeClassifier(max_depth=3), X, y, cv=5, n_jobs=1, seed=0)
+    assert result.oof.shape == (len(y), 3) and not np.isnan(result.oof).any()
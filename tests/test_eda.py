@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 07:50
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from mltoolbox.eda import DataProfiler, profile_data
+from mltoolbox.eda.sketch import Moments, HyperLogLog, QuantileSketch, TopK
+from mltoolbox.utils.writer import ExcelWriter
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.RandomState(42)
+    n = 200000
+    return pd.DataFrame({
+        "amount": rng.lognormal(5, 1, n),
+        "score": rng.normal(size=n),
+        "count": np.where(rng.random_sample(n) < 0.2, np.nan, rng.poisson(2, n)),
+        "city": rng.choice(["北京", "上海", "深圳", "广州", None], n, p=[0.4, 0.3, 0.2, 0.05, 0.05]),
+        "id": np.arange(n),
+        "date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.randint(0, 365, n), "D"),
+    })
+
+
+def test_sketches():
+    rng = np.random.RandomState(0)
+    a, b = rng.lognormal(size=50000) - 1, rng.normal(3, 2, size=30000)
+    values = np.concatenate([a, b])
+
+    moments = Moments().update(a).merge(Moments().update(b))
+    assert moments.mean == pytest.approx(values.mean()) and moments.var == pytest.approx(values.var(ddof=1))
+    assert moments.skew == pytest.approx(pd.Series(values).skew()) and moments.kurt == pytest.approx(pd.Series(values).kurt())
+
+    sketch = QuantileSketch(0.01).update(a).merge(QuantileSketch(0.01).update(b))
+    qs = [0.01, 0.1, 0.5, 0.9, 0.99]
+    np.testing.assert_allclose(sketch.quantile(qs), np.quantile(values, qs, method="lower"), rtol=0.0201)
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+    hll = HyperLogLog(14).update(np.arange(100000.)).merge(HyperLogLog(14).update(np.arange(50000., 150000.)))
+    assert hll.count() == pytest.approx(150000, rel=0.03)
+    assert HyperLogLog(14).update(np.array(["a", "b", "a", "c"], dtype=object)).count() == 3
+
+    top = TopK(2, capacity=3).update(np.array([1, 1, 1, 2, 2, 3, 4, 5]))
+    assert top.top() == [(1, 3), (2, 2)] and top.error == 1
+
+
+def test_profile(dataset):
+    frame = DataProfiler().fit(dataset, chunk_size=30000).to_frame().set_index("column")
+
+    assert frame.loc["count", "missing"] == dataset["count"].isna().sum() and frame.loc["city", "missing_rate"] == dataset["city"].isna().mean()
+    assert frame.loc["count", "zeros"] == (dataset["count"] == 0).sum()
+    numeric = ["amount", "score", "count", "id"]
+    np.testing.assert_allclose(frame.loc[numeric, "mean"].astype(float), dataset[numeric].mean())
+    np.testing.assert_allclose(frame.loc[numeric, "std"].astype(float), dataset[numeric].std())
+    np.testing.assert_allclose(frame.loc[numeric, "kurt"].astype(float), dataset[numeric].kurt(), atol=1e-8)
+    np.testing.assert_allclose(frame.loc["amount", ["25%", "50%", "75%"]].astype(float), dataset["amount"].quantile([0.25, 0.5, 0.75]), rtol=0.02)
+
+    assert frame.loc["city", "distinct"] == 4 and frame.loc["count", "distinct"] == dataset["count"].nunique()
+    assert frame.loc["id", "distinct"] == pytest.approx(len(dataset), rel=0.03)
+    assert frame.loc["city", "top"].startswith(f"北京({(dataset['city'] == '北京').sum()})")
+    assert frame.loc["date", "min"] == dataset["date"].min() and frame.loc["date", "distinct"] == pytest.approx(365, abs=5)
+
+
+def test_merge(dataset):
+    whole = DataProfiler().fit(dataset)
+    parts = DataProfiler().fit(dataset.iloc[:70000]).merge(DataProfiler().fit(dataset.iloc[70000:]))
+
+    for column, profile in whole.profiles.items():
+        other = parts.profiles[column]
+        assert np.array_equal(profile.distinct.registers, other.distinct.registers)
+        if column in ("city", "count", "date"):
+            assert profile.top.top() == other.top.top()
+        if profile.quantiles is not None:
+            assert np.array_equal(profile.quantiles.positive.counts, other.quantiles.positive.counts)
+
+    # 取值全部不同的列中被保留的高频取值与分块方式有关
+    expected = whole.to_frame().drop(columns="top")
+    pd.testing.assert_frame_equal(parts.to_frame().drop(columns="top"), expected)
+
+    parallel = profile_data(dataset, chunk_size=40000, n_jobs=2)
+    pd.testing.assert_frame_equal(parallel.to_frame().drop(columns="top"), expected)
+
+
+def test_files(dataset, template, tmp_path):
+    path = str(tmp_path / "dataset.csv")
+    dataset.drop(columns="date").to_csv(path, index=False)
+    profiler = profile_data(path, chunk_size=50000, columns=["amount", "city"])
+    assert profiler.rows == len(dataset) and list(profiler.profiles) == ["amount", "city"]
+
+    writer = ExcelWriter(style_excel=template)
+    DataProfiler().fit(dataset).to_excel(writer)
+    writer.save(tmp_path / "eda.xlsx")
+
+    worksheet = load_workbook(tmp_path / "eda.xlsx")["数据探查"]
+    assert worksheet["B2"].value == "数据概览"
+    assert [c.value for c in worksheet[4][1:4]] == ["变量名称", "数据类型", "变量类型"]
+    assert worksheet.cell(5, 2).value == "amount"
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 09:30
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from sklearn.datasets import make_classification, make_regression
+from sklearn.linear_model import LogisticRegression, LinearRegression
+from sklearn.metrics import mean_squared_error, roc_auc_score
+
+from mltoolbox.explainer import PartialDependence, PermutationImportance, permutation_importance
+from mltoolbox.explainer.permutation import stratified_sample
+from mltoolbox.utils.setter import task_seed
+from mltoolbox.utils.writer import ExcelWriter
+
+
+@pytest.fixture
+def classification():
+    X, y = make_classification(n_samples=3000, n_features=8, n_informative=3, n_redundant=0, shuffle=False, random_state=42)
+    X = pd.DataFrame(X, columns=[f"x{i}" for i in range(8)]).assign(flag=(X[:, 0] > 0).astype(int))
+    return X, y, LogisticRegression().fit(X, y)
+
+
+def test_stratified_sample():
+    y = np.array([0] * 900 + [1] * 100)
+    index = stratified_sample(y, 0.1, random_state=0)
+    assert len(index) == 100 and y[index].sum() == 10 and np.all(np.diff(index) > 0)
+    assert stratified_sample(y, 2000) is None and len(stratified_sample(np.arange(1000.), 50, random_state=0)) == 50
+
+
+def test_permutation(classification):
+    X, y, model = classification
+    explainer = PermutationImportance(model, n_repeats=4, seed=42, batch_size=3).fit(X, y)
+    importances = explainer.importances.set_index("feature")
+
+    assert set(importances.index[:3]) <= {"x0", "x1", "x2", "flag"} and importances.loc[["x5", "x6", "x7"], "importance"].abs().max() < 0.01
+    assert (importances["ci_lower"] <= importances["importance"]).all() and (importances["importance"] <= importances["ci_upper"]).all()
+
+    # 打乱顺序只由种子决定，与批大小、并行方式无关，缓冲区还原后不影响后续特征
+    for params in (dict(batch_size=1), dict(batch_size=100, n_jobs=2)):
+        other = PermutationImportance(model, n_repeats=4, seed=42, **params).fit(X, y)
+        pd.testing.assert_frame_equal(other.scores, explainer.scores)
+
+    permuted = X.copy()
+    permuted["x1"] = permuted["x1"].to_numpy()[np.random.default_rng(task_seed(42, "permutation", 1, 0)).permutation(len(X))]
+    assert explainer.scores.loc["x1", "repeat_0"] == pytest.approx(roc_auc_score(y, model.predict_proba(permuted)[:, 1]))
+
+
+def test_sample_and_regression(classification):
+    X, y, model = classification
+    explainer = PermutationImportance(model, n_repeats=3, max_samples=1000, seed=0).fit(X, y, features=["x0", "x5"])
+    assert explainer.sample_size == 1000 and list(explainer.scores.index) == ["x0", "x5"]
+
+    X, y = make_regression(n_samples=1000, n_features=4, n_informative=2, shuffle=False, random_state=0)
+    model = LinearRegression().fit(X, y)
+    result = permutation_importance(model, X, y, scoring=mean_squared_error, greater_is_better=False, n_repeats=3, seed=0)
+    assert set(result["feature"][:2]) == {0, 1} and (result["importance"][:2] > 0).all()
+
+
+def test_partial_dependence(classification, template, tmp_path):
+    X, y, model = classification
+    explainer = PartialDependence(model, grid_resolution=10, max_samples=500, max_rows=1200, seed=0).fit(X, y)
+    ice = explainer.ice("x1")
+    assert ice.shape == (500, 10) and list(explainer.grid("flag")) == [0, 1]
+
+    # 分块拼接预测与逐个网格点单独预测一致，缓冲区还原后不影响其他特征
+    for value in ice.columns[[0, 5, 9]]:
+        expected = model.predict_proba(explainer.X.assign(x1=value))[:, 1]
+        np.testing.assert_allclose(ice[value], expected)
+    np.testing.assert_allclose(explainer.predict(explainer.buffer(1).iloc[:500]), explainer.base)
+
+    # 中心化的 ICE 以样本的原始预测为基准，特征取样本实际取值时变化为 0
+    centered = explainer.ice("flag", centered=True)
+    np.testing.assert_allclose(centered, explainer.ice("flag").to_numpy() - explainer.base[:, None])
+    np.testing.assert_allclose(centered.to_numpy()[np.arange(500), explainer.X["flag"].to_numpy()], 0, atol=1e-12)
+    assert explainer.plot("x1", centered=True).axes[0].get_ylabel() == "预测值变化"
+
+    table = explainer.interaction("x1", "flag")
+    assert table.shape == (10, 2)
+    assert table.loc[ice.columns[3], 1] == pytest.approx(model.predict_proba(explainer.X.assign(x1=ice.columns[3], flag=1))[:, 1].mean())
+    assert explainer.partial_dependence("x1").is_monotonic_increasing or explainer.partial_dependence("x1").is_monotonic_decreasing
+
+    writer = ExcelWriter(style_excel=template)
+    explainer.to_excel(writer, features=["x1", "flag"], interactions=[("x1", "flag")])
+    writer.save(tmp_path / "pdp.xlsx")
+
+    worksheet = load_workbook(tmp_path / "pdp.xlsx")["部分依赖"]
+    assert worksheet["B2"].value == "部分依赖" and len(worksheet._images) == 3
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 00:20
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pytest
+from scipy import special
+
+from mltoolbox.models.tricks.focal_loss import FocalLoss
+
+
+class Dataset:
+
+    def __init__(self, label, weight=None):
+        self.label = label
+        self.weight = weight
+
+    def get_label(self):
+        return self.label
+
+    def get_weight(self):
+        return self.weight
+
+
+@pytest.fixture
+def binary():
+    rng = np.random.RandomState(42)
+    return rng.randint(0, 2, 5000).astype(np.float32), rng.normal(0, 4, 5000)
+
+
+@pytest.mark.parametrize("gamma", [0, 1, 2, 2.5])
+@pytest.mark.parametrize("alpha", [None, 0.25])
+def test_grad_hess(binary, gamma, alpha):
+    y, preds = binary
+    loss = FocalLoss(gamma=gamma, alpha=alpha)
+    p = special.expit(preds)
+
+    grad, hess = loss.lgb_obj(preds, Dataset(y))
+    np.testing.assert_allclose(grad, loss.grad(y, p), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(hess, loss.hess(y, p), rtol=1e-8, atol=1e-12)
+
+    grad32, hess32 = FocalLoss(gamma=gamma, alpha=alpha, dtype=np.float32).lgb_obj(preds, Dataset(y))
+    assert grad32.dtype == hess32.dtype == np.float32
+    np.testing.assert_allclose(grad32, grad, atol=1e-5 * np.abs(grad).max())
+    np.testing.assert_allclose(hess32, hess, atol=1e-5 * np.abs(hess).max())
+
+
+def test_grad_hess_buffers(binary):
+    y, preds = binary
+    loss = FocalLoss(alpha=0.25)
+    train_data = Dataset(y)
+
+    grad, hess = loss.lgb_obj(preds, train_data)
+    expected = grad.copy(), hess.copy()
+    assert loss.lgb_obj(preds, train_data)[0] is grad
+    np.testing.assert_array_equal(grad, expected[0])
+    np.testing.assert_array_equal(hess, expected[1])
+    assert len(loss._labels) == 1
+
+    # 验证集的标签单独缓存，不影响训练集的结果
+    loss.lgb_obj(preds[:100], Dataset(y[:100][::-1].copy()))
+    np.testing.assert_array_equal(loss.lgb_obj(preds, train_data)[0], expected[0])
+
+
+class MultiClassDataset(Dataset):
+
+    def num_data(self):
+        return len(self.label)
+
+
+@pytest.fixture
+def multiclass():
+    rng = np.random.RandomState(42)
+    return rng.randint(0, 4, 300).astype(np.float32), rng.normal(0, 2, (300, 4))
+
+
+@pytest.mark.parametrize("gamma", [0, 0.5, 2, 3])
+@pytest.mark.parametrize("alpha", [None, [0.1, 0.2, 0.3, 0.4]])
+def test_multiclass_grad_hess(multiclass, gamma, alpha):
+    from mltoolbox.models.tricks.focal_loss import MultiClassFocalLoss
+
+    y, logits = multiclass
+    loss = MultiClassFocalLoss(gamma=gamma, alpha=alpha)
+    grad, hess = loss.grad(y, loss.softmax(logits)), loss.hess(y, loss.softmax(logits))
+
+    # 对每个类别的原始得分做中心差分
+    eps = 1e-5
+    numeric_grad, numeric_hess = np.zeros_like(logits), np.zeros_like(logits)
+    for j in range(logits.shape[1]):
+        shift = np.zeros_like(logits)
+        shift[:, j] = eps
+        numeric_grad[:, j] = (loss(y, loss.softmax(logits + shift)) - loss(y, loss.softmax(logits - shift))) / (2 * eps)
+        numeric_hess[:, j] = (loss.grad(y, loss.softmax(logits + shift))[:, j] - loss.grad(y, loss.softmax(logits - shift))[:, j]) / (2 * eps)
+
+    np.testing.assert_allclose(grad, numeric_grad, rtol=1e-5, atol=1e-7)
+    np.testing.assert_allclose(hess, numeric_hess, rtol=1e-4, atol=1e-6)
+
+    if gamma == 0 and alpha is None:
+        p = loss.softmax(logits)
+        onehot = np.eye(4)[y.astype(int)]
+        np.testing.assert_allclose(grad, p - onehot)
+        np.testing.assert_allclose(hess, p * (1 - p))
+
+
+def test_multiclass_lgb_layout(multiclass):
+    from mltoolbox.models.tricks.focal_loss import MultiClassFocalLoss
+
+    y, logits = multiclass
+    loss = MultiClassFocalLoss(alpha=[0.1, 0.2, 0.3, 0.4])
+    train_data = MultiClassDataset(y)
+    grad, hess = loss.grad(y, loss.softmax(logits)), loss.hess(y, loss.softmax(logits))
+
+    # LightGBM 4.0 之前按类别展开为一维
+    flat_grad, flat_hess = loss.lgb_obj(logits.T.ravel(), train_data)
+    assert flat_grad.shape == (logits.size,) and flat_grad.base is not None
+    np.testing.assert_allclose(flat_grad.reshape(4, -1).T, grad)
+    np.testing.assert_allclose(flat_hess.reshape(4, -1).T, hess)
+
+    grad2d, hess2d = loss.lgb_obj(logits, train_data)
+    np.testing.assert_allclose(grad2d, grad)
+    np.testing.assert_allclose(hess2d, hess)
+
+    name, value, higher_better = loss.lgb_eval(logits.T.ravel(), train_data)
+    assert name == "multiclass_focal_loss" and not higher_better
+    np.testing.assert_allclose(value, loss(y, loss.softmax(logits)).mean())
+
+    extreme = logits * 200
+    assert np.isfinite(loss.softmax(extreme)).all() and all(np.isfinite(v).all() for v in loss.lgb_obj(extreme, train_data))
+
+
+@pytest.mark.parametrize("gamma", [0, 2])
+@pytest.mark.parametrize("alpha", [None, 0.25])
+def test_sample_weight(binary, gamma, alpha):
+    from scipy import optimize
+
+    y, preds = binary
+    weight = np.random.RandomState(0).randint(1, 4, len(y)).astype(float)
+    loss = FocalLoss(gamma=gamma, alpha=alpha)
+    p = special.expit(preds)
+
+    grad, hess = loss.lgb_obj(preds, Dataset(y, weight))
+    np.testing.assert_allclose(grad, loss.grad(y, p) * weight, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(hess, loss.hess(y, p, sample_weight=weight), rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(loss.lgb_eval(preds, Dataset(y, weight))[1], (loss(y, p) * weight).sum() / weight.sum())
+
+    # 逐行计算完整损失的原实现
+    expected = optimize.minimize_scalar(lambda p: loss(y, p).sum(), bounds=(0, 1), method='bounded').x
+    np.testing.assert_allclose(special.expit(loss.init_score(y)), expected, atol=1e-5)
+
+    # 整数权重等价于重复样本
+    repeated = np.repeat(y, weight.astype(int))
+    np.testing.assert_allclose(loss.init_score(y, sample_weight=weight), loss.init_score(repeated), atol=1e-6)
+    np.testing.assert_allclose(loss.init_score(y, sample_weight=np.ones(len(y))), loss.init_score(y), atol=1e-10)
+
+
+def test_multiclass_sample_weight(multiclass):
+    from mltoolbox.models.tricks.focal_loss import MultiClassFocalLoss
+
+    y, logits = multiclass
+    weight = np.random.RandomState(0).uniform(0.5, 2, len(y))
+    loss = MultiClassFocalLoss(alpha=[0.1, 0.2, 0.3, 0.4])
+    p = loss.softmax(logits)
+    grad, hess = loss.grad(y, p), loss.hess(y, p)
+
+    weighted_grad, weighted_hess = loss.lgb_obj(logits, MultiClassDataset(y, weight))
+    np.testing.assert_allclose(weighted_grad, grad * weight[:, None])
+    np.testing.assert_allclose(weighted_hess, hess * weight[:, None])
+    np.testing.assert_allclose(loss.lgb_eval(logits, MultiClassDataset(y, weight))[1], np.average(loss(y, p), weights=weight))
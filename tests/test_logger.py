@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 03:10
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from mltoolbox.utils import logger as logger_module
+from mltoolbox.utils.logger import init_logger, stop_logger, logger_queue, worker_logger, LOGGER_NAME
+
+
+@pytest.fixture(autouse=True)
+def reset_logger():
+    yield
+    stop_logger()
+    logger = logger_module.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line]
+
+
+def log_task(i):
+    logger_module.getLogger(LOGGER_NAME).info(f"task {i}")
+    return i
+
+
+def test_idempotent(tmp_path):
+    filename = str(tmp_path / "logs" / "sync.log")
+    logger = init_logger(filename)
+    handlers = list(logger.handlers)
+    assert init_logger(filename) is logger and logger.handlers == handlers
+
+    logger.info("message")
+    lines = read_lines(filename)
+    assert len(lines) == 1 and lines[0].endswith("message")
+
+
+def test_asynchronous(tmp_path):
+    filename = str(tmp_path / "async.log")
+    init_logger(filename, stream=False)
+    logger = init_logger(filename, stream=False, asynchronous=True)
+
+    # 同步模式的 handler 转移到监听线程中，logger 只保留一个 QueueHandler
+    assert [type(h).__name__ for h in logger.handlers] == ["QueueHandler"]
+    init_logger(filename, stream=False, asynchronous=True)
+    assert len(logger.handlers) == 1 and len(logger_module.get_listener()[2].handlers) == 1
+
+    for i in range(100):
+        logger.info(f"message {i}")
+    stop_logger()
+
+    lines = read_lines(filename)
+    assert len(lines) == 100 and lines[-1].endswith("message 99")
+
+
+def test_multiprocess(tmp_path):
+    filename = str(tmp_path / "pool.log")
+    logger = init_logger(filename, stream=False, asynchronous=True, multiprocess=True)
+    logger.info("parent")
+
+    with ProcessPoolExecutor(2, initializer=worker_logger, initargs=(logger_queue(),)) as pool:
+        assert list(pool.map(log_task, range(20))) == list(range(20))
+    stop_logger()
+
+    lines = read_lines(filename)
+    assert len(lines) == 21
+    assert sorted(line.rsplit(" ", 1)[-1] for line in lines if " task " in line) == sorted(str(i) for i in range(20))
+
+
+def test_upgrade_multiprocess(tmp_path):
+    filename = str(tmp_path / "upgrade.log")
+    logger = init_logger(filename, stream=False, asynchronous=True)
+    logger.info("thread")
+    assert not hasattr(logger_queue(), "join_thread")
+
+    # 之后以 multiprocess=True 调用时改用进程间队列重建监听线程，之前的日志不会丢失
+    init_logger(filename, stream=False, asynchronous=True, multiprocess=True)
+    assert hasattr(logger_queue(), "join_thread") and len(logger.handlers) == 1 and len(logger_module.get_listener()[2].handlers) == 1
+
+    with ProcessPoolExecutor(2, initializer=worker_logger, initargs=(logger_queue(),)) as pool:
+        assert list(pool.map(log_task, range(5))) == list(range(5))
+    stop_logger()
+
+    lines = read_lines(filename)
+    assert len(lines) == 6 and lines[0].endswith("thread")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 os.fork")
+def test_fork(tmp_path):
+    filename = str(tmp_path / "fork.log")
+    logger = init_logger(filename, stream=False, asynchronous=True)
+    logger.info("parent")
+
+    pid = os.fork()
+    if pid == 0:
+        # 子进程中没有监听线程，恢复为直接写入文件
+        try:
+            logger.info("child")
+            code = 0 if [type(h).__name__ for h in logger.handlers] == ["RotatingFileHandler"] else 1
+        except Exception:
+            code = 1
+        os._exit(code)
+
+    assert os.waitpid(pid, 0)[1] == 0
+    stop_logger()
+    lines = read_lines(filename)
+    assert sorted(line.rsplit(" ", 1)[-1] for line in lines) == ["child", "parent"]
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 01:50
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pytest
+from scipy import special
+
+from mltoolbox.models.tricks.focal_loss import FocalLoss, MultiClassFocalLoss
+from mltoolbox.models.tricks.objectives import WeightedLogLoss, LabelSmoothingLoss, ClassBalancedLoss
+
+
+class DMatrix:
+
+    def __init__(self, label, weight=None):
+        self.label = label
+        self.weight = np.empty(0, dtype=np.float32) if weight is None else weight
+
+    def get_label(self):
+        return self.label
+
+    def get_weight(self):
+        return self.weight
+
+    def num_row(self):
+        return len(self.label)
+
+
+OBJECTIVES = {
+    "focal": lambda: FocalLoss(gamma=2., alpha=0.25),
+    "logloss": lambda: WeightedLogLoss(),
+    "weighted_logloss": lambda: WeightedLogLoss(pos_weight=5., neg_weight=0.5),
+    "label_smoothing": lambda: LabelSmoothingLoss(smoothing=0.2, pos_weight=2.),
+    "class_balanced": lambda: ClassBalancedLoss(beta=0.99),
+    "class_balanced_focal": lambda: ClassBalancedLoss(beta=0.999, gamma=1.5, samples_per_class=(900, 100)),
+}
+
+
+@pytest.fixture
+def binary():
+    rng = np.random.RandomState(42)
+    y = (rng.random_sample(2000) < 0.1).astype(np.float32)
+    return y, rng.normal(0, 2, 2000), rng.uniform(0.5, 2, 2000)
+
+
+@pytest.mark.parametrize("name", list(OBJECTIVES))
+@pytest.mark.parametrize("weighted", [False, True])
+def test_gradient_check(binary, name, weighted):
+    y, preds, weight = binary
+    weight = weight if weighted else None
+    loss = OBJECTIVES[name]()
+
+    grad, hess = [v.copy() for v in loss.grad_hess(y, special.expit(preds), weight)]
+
+    eps = 1e-4
+    upper, center, lower = [loss(y, special.expit(preds + d), weight) for d in (eps, 0, -eps)]
+    np.testing.assert_allclose(grad, (upper - lower) / (2 * eps), rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(hess, (upper - 2 * center + lower) / eps ** 2, rtol=1e-3, atol=1e-4)
+
+
+def test_reduces_to_logloss(binary):
+    y, preds, weight = binary
+    p = special.expit(preds)
+    expected = (p - y, p * (1 - p))
+
+    for loss in [WeightedLogLoss(), LabelSmoothingLoss(smoothing=0.), ClassBalancedLoss(beta=0.), FocalLoss(gamma=0.)]:
+        for actual, target in zip(loss.grad_hess(y, p), expected):
+            np.testing.assert_allclose(actual, target, rtol=1e-10, atol=1e-12)
+
+
+def test_class_balanced_weights():
+    y = np.array([0] * 90 + [1] * 10)
+    loss = ClassBalancedLoss(beta=0.9)
+    loss(y, np.full(len(y), 0.5))
+
+    w1, w0 = loss.class_weights()
+    assert w1 > w0 and np.isclose(w1 + w0, 2)
+
+    # 只在第一次计算时统计样本数
+    loss(np.ones(50), np.full(50, 0.5))
+    assert loss.class_weights() == (w1, w0)
+    assert loss.fit(np.ones(50)).class_weights() != (w1, w0)
+
+    with pytest.raises(ValueError):
+        ClassBalancedLoss(beta=1.)
+
+
+@pytest.mark.parametrize("name", list(OBJECTIVES))
+def test_init_score(binary, name):
+    y, _, weight = binary
+    loss = OBJECTIVES[name]()
+    score = loss.init_score(y, weight)
+
+    grid = np.linspace(-6, 6, 2001)
+    totals = [loss(y, np.full(len(y), special.expit(s)), weight).sum() for s in grid]
+    assert abs(score - grid[np.argmin(totals)]) < 1e-2
+
+
+@pytest.mark.parametrize("name", list(OBJECTIVES))
+@pytest.mark.parametrize("weighted", [False, True])
+def test_xgb_adapter(binary, name, weighted):
+    y, preds, weight = binary
+    loss = OBJECTIVES[name]()
+    dtrain = DMatrix(y, weight if weighted else None)
+
+    grad, hess = loss.xgb_obj(preds, dtrain)
+    expected = OBJECTIVES[name]().grad_hess(y, special.expit(preds), weight if weighted else None)
+    np.testing.assert_allclose(grad, expected[0])
+    np.testing.assert_allclose(hess, expected[1])
+
+    metric, value = loss.xgb_eval(preds, dtrain)
+    assert metric == loss.name
+    assert np.isclose(value, np.average(loss(y, special.expit(preds)), weights=weight if weighted else None))
+
+
+
+@pytest.mark.parametrize("loss", [FocalLoss(gamma=2., alpha=0.25), MultiClassFocalLoss(gamma=1.)])
+def test_xgb_label_cache(binary, loss):
+    y, preds, weight = binary
+    # 与 xgboost 一致，get_label 和 get_weight 每次调用都返回新的数组
+    dtrain = DMatrix(y, weight)
+    dtrain.get_label, dtrain.get_weight = lambda: y.copy(), lambda: weight.copy()
+    if isinstance(loss, MultiClassFocalLoss):
+        preds = np.column_stack([-preds, preds])
+
+    loss.xgb_obj(preds, dtrain)
+    loss.xgb_eval(preds, dtrain)
+    keys = set(loss._labels)
+    for _ in range(3):
+        loss.xgb_obj(preds, dtrain)
+        loss.xgb_eval(preds, dtrain)
+    assert set(loss._labels) == keys and len(loss._dmatrices) == 1
+
+def test_lgb_adapter(binary):
+    y, preds, weight = binary
+    loss = WeightedLogLoss(pos_weight=3.)
+    dtrain = DMatrix(y, weight)
+    dtrain.get_weight = lambda: weight
+
+    grad, hess = loss.lgb_obj(preds, dtrain)
+    p = special.expit(preds)
+    np.testing.assert_allclose(grad, np.where(y == 1, 3., 1.) * weight * (p - y))
+    name, value, is_higher_better = loss.lgb_eval(preds, dtrain)
+    assert name == "weighted_logloss" and not is_higher_better
+
+
+@pytest.mark.parametrize("flat", [False, True])
+def test_multiclass_xgb_adapter(flat):
+    rng = np.random.RandomState(0)
+    n, k = 500, 4
+    y = rng.randint(0, k, n).astype(np.float32)
+    logits = rng.normal(0, 2, (n, k))
+    loss = MultiClassFocalLoss(gamma=1.)
+
+    grad, hess = loss.xgb_obj(logits.ravel() if flat else logits, DMatrix(y))
+    assert grad.shape == ((n * k,) if flat else (n, k))
+
+    p = special.softmax(logits, axis=1)
+    np.testing.assert_allclose(grad.reshape(n, k), MultiClassFocalLoss(gamma=1.).grad(y, p))
+    np.testing.assert_allclose(hess.reshape(n, k), MultiClassFocalLoss(gamma=1.).hess(y, p))
+
+
+@pytest.mark.parametrize("name", list(OBJECTIVES))
+def test_jit(binary, name):
+    pytest.importorskip("numba")
+    y, preds, weight = binary
+    p = special.expit(preds)
+
+    for sample_weight in [None, weight]:
+        expected = [v.copy() for v in OBJECTIVES[name]().grad_hess(y, p, sample_weight)]
+        loss = OBJECTIVES[name]()
+        loss.jit = True
+        for actual, target in zip(loss.grad_hess(y, p, sample_weight), expected):
+            np.testing.assert_allclose(actual, target, rtol=1e-10, atol=1e-12)
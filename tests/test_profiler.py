@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 03:50
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from openpyxl import load_workbook
+
+from mltoolbox.utils.profiler import Profiler, profiler, stage, profile, worker_profiler
+from mltoolbox.utils.writer import ExcelWriter, dataframe2excel
+
+
+@pytest.fixture(autouse=True)
+def reset_profiler():
+    yield
+    profiler.disable().reset()
+    profiler.queue = None
+
+
+@profile("任务")
+def sleep_task(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_disabled():
+    assert stage("a") is stage("b")
+    with stage("a"):
+        pass
+    assert sleep_task(0) == 0 and sleep_task.__name__ == "sleep_task"
+    assert profiler.records == []
+
+
+def test_nested_stages():
+    prof = Profiler(enabled=True, memory=True)
+
+    @prof.profile
+    def allocate():
+        return np.ones(2 * 1024 ** 2)
+
+    with prof.stage("外层"):
+        for _ in range(3):
+            with prof.stage("内层"):
+                time.sleep(0.01)
+                allocate()
+
+    frame = prof.to_frame()
+    assert frame["stage"].tolist() == ["外层", "外层/内层", "外层/内层/test_nested_stages.<locals>.allocate"]
+    assert frame["calls"].tolist() == [1, 3, 3]
+    assert frame.loc[0, "wall_ratio"] == 1 and frame.loc[1, "wall"] >= 0.03
+    # 每次分配 16MiB ，内存峰值会传递到外层阶段
+    assert 15 < frame.loc[2, "peak_memory"] < 20
+    assert frame.loc[0, "peak_memory"] >= frame.loc[2, "peak_memory"]
+    assert len(prof.to_frame(aggregate=False)) == 7
+
+    prof.disable()
+    with prof.stage("关闭"):
+        pass
+    assert len(prof.records) == 7
+
+
+def test_without_reset_peak(monkeypatch):
+    # python 3.8 的 tracemalloc 没有 reset_peak ，使用累计峰值
+    import tracemalloc
+    monkeypatch.delattr(tracemalloc, "reset_peak")
+    prof = Profiler(enabled=True, memory=True)
+    with prof.stage("分配"):
+        np.ones(2 * 1024 ** 2)
+    assert prof.to_frame().loc[0, "peak_memory"] > 15
+    prof.disable()
+
+
+def test_threads():
+    profiler.enable()
+    threads = [threading.Thread(target=sleep_task, args=(0.01,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    frame = profiler.to_frame()
+    assert frame.loc[0, "calls"] == 4 and frame.loc[0, "threads"] == 4
+
+
+def test_processes():
+    profiler.enable(multiprocess=True)
+    with profiler.stage("并行"):
+        with ProcessPoolExecutor(2, initializer=worker_profiler, initargs=(profiler.queue,)) as pool:
+            assert list(pool.map(sleep_task, [0.01] * 6)) == [0.01] * 6
+
+    frame = profiler.to_frame().set_index("stage")
+    # 子进程的阶段不在父进程的调用栈中
+    assert frame.loc["任务", "calls"] == 6 and frame.loc["任务", "processes"] >= 1
+    assert frame.loc["并行", "calls"] == 1
+
+
+def test_to_excel(template, tmp_path):
+    profiler.enable()
+    writer = ExcelWriter(style_excel=template)
+    for _ in range(2):
+        sleep_task(0)
+    dataframe2excel(profiler.to_frame(), writer, sheet_name="明细")
+    profiler.to_excel(writer)
+    writer.save(tmp_path / "profile.xlsx")
+
+    worksheet = load_workbook(tmp_path / "profile.xlsx")["性能分析"]
+    assert worksheet["B2"].value == "各阶段耗时及内存峰值"
+    assert [c.value for c in worksheet[4][1:4]] == ["阶段", "调用次数", "总耗时(秒)"]
+    assert [worksheet.cell(row, 2).value for row in range(5, 7)] == ["任务", "dataframe2excel"]
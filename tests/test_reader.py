@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 04:50
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mltoolbox.utils.reader import DatasetReader, read_dataset, filter_frame
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.RandomState(42)
+    n = 5000
+    data = pd.DataFrame({
+        "score": rng.normal(size=n).round(3),
+        "ratio": rng.randint(0, 1000, n) / 8,
+        "age": rng.randint(18, 80, n),
+        "balance": rng.randint(-100000, 100000, n),
+        "flag": rng.randint(0, 2, n).astype(float),
+        "missing": np.where(rng.random_sample(n) < 0.1, np.nan, rng.randint(0, 10, n)),
+        "city": rng.choice(["北京", "上海", "深圳", None], n),
+        "id": [f"id{i}" for i in range(n)],
+    })
+    return data
+
+
+@pytest.fixture
+def csv(dataset, tmp_path):
+    path = str(tmp_path / "dataset.csv")
+    dataset.to_csv(path, index=False)
+    return path
+
+
+def test_downcast(dataset, csv):
+    reader = DatasetReader(csv)
+    data = reader.read()
+
+    assert data.dtypes.astype(str).to_dict() == {"score": "float64", "ratio": "float32", "age": "int8", "balance": "int32", "flag": "int8", "missing": "float32", "city": "category", "id": "object"}
+    expected = pd.read_csv(csv)
+    for column in data.columns:
+        np.testing.assert_array_equal(data[column].astype(object).where(data[column].notna(), None), expected[column].astype(object).where(expected[column].notna(), None))
+
+    report = reader.report.set_index("column")
+    assert report.loc["age", "saved_ratio"] == 7 / 8 and report.loc["id", "saved"] == 0
+    assert report.loc["合计", "memory"] == data.memory_usage(index=False, deep=True).sum()
+    # 字符串列的深度内存占用与解析时字符串对象的复用情况有关，只做近似比较
+    assert report.loc["合计", "original_memory"] == pytest.approx(expected.memory_usage(index=False, deep=True).sum(), rel=0.05)
+
+    assert read_dataset(csv, float32=True)["score"].dtype == np.float32
+    assert read_dataset(csv, downcast=False).dtypes.equals(expected.dtypes)
+
+
+def test_chunks(dataset, csv):
+    reader = DatasetReader(csv, columns=["age", "city", "score"], filters=[("age", ">=", 30), ("city", "in", ["北京", "上海"])], chunk_size=700)
+    chunks = list(reader)
+
+    expected = dataset.loc[(dataset["age"] >= 30) & dataset["city"].isin(["北京", "上海"]), ["score", "age", "city"]]
+    assert all(len(c) == 700 for c in chunks[:-1]) and 0 < len(chunks[-1]) <= 700
+    assert sum(len(c) for c in chunks) == len(expected)
+
+    # 所有块使用相同的数据类型和类别
+    assert all(c.dtypes.equals(chunks[0].dtypes) for c in chunks)
+    assert chunks[0]["city"].cat.categories.tolist() == ["上海", "北京"]
+    data = pd.concat(chunks)
+    assert data["city"].dtype == "category"
+    np.testing.assert_array_equal(data["age"], expected["age"])
+
+    # 复用推断好的数据类型时跳过扫描
+    other = DatasetReader(csv, columns=["age", "city", "score"], chunk_size=1000, dtypes=reader.dtypes)
+    assert next(iter(other)).dtypes.equals(chunks[0].dtypes)
+
+
+def test_late_types(tmp_path):
+    # 缺失值、字符串、小数在第一块之后才出现时，所有块统一使用提升后的数据类型
+    rows = []
+    for i in range(1200):
+        b = "" if i == 900 else i
+        c = "" if i < 600 else "xy"[i % 2]
+        d = 1000.5 if i == 1000 else i
+        e = "" if i < 300 else i
+        rows.append(f"{i},{b},{c},{d},{e}")
+    path = tmp_path / "late.csv"
+    path.write_text("id,b,c,d,e\n" + "\n".join(rows) + "\n")
+
+    chunks = list(DatasetReader(str(path), chunk_size=300))
+    assert all(c.dtypes.equals(chunks[0].dtypes) for c in chunks)
+    result = pd.concat(chunks, ignore_index=True)
+    assert result.dtypes.astype(str).to_dict() == {"id": "int16", "b": "float32", "c": "category", "d": "float32", "e": "float32"}
+
+    expected = pd.read_csv(path)
+    for column in ["id", "b", "d", "e"]:
+        np.testing.assert_array_equal(result[column].astype(float), expected[column])
+    assert result["c"].astype(object).where(result["c"].notna(), None).tolist() == expected["c"].astype(object).where(expected["c"].notna(), None).tolist()
+
+
+def test_filters(dataset):
+    expected = dataset[(dataset["age"] > 50) & (dataset["flag"] == 1)]
+    pd.testing.assert_frame_equal(filter_frame(dataset, [("age", ">", 50), ("flag", "==", 1)]), expected)
+    pd.testing.assert_frame_equal(filter_frame(dataset, "age > 50 and flag == 1"), expected)
+    pd.testing.assert_frame_equal(filter_frame(dataset, lambda d: (d["age"] > 50) & (d["flag"] == 1)), expected)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_columnar(dataset, tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"dataset.{fmt}")
+    getattr(dataset, f"to_{fmt}")(path)
+
+    data = read_dataset(path, columns=["age", "city"])
+    assert data.columns.tolist() == ["age", "city"] and data["age"].dtype == np.int8
+
+    chunks = list(read_dataset(path, columns=["age", "city"], filters=[("age", "<", 40)], chunk_size=500))
+    assert sum(len(c) for c in chunks) == (dataset["age"] < 40).sum()
+    assert all(c["city"].dtype == chunks[0]["city"].dtype for c in chunks)
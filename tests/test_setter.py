@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 02:30
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+import pytest
+import matplotlib
+from matplotlib import font_manager
+
+from mltoolbox.utils import setter
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def font(tmp_path):
+    path = str(tmp_path / "font.ttf")
+    shutil.copy(os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans.ttf"), path)
+    ttflist = list(font_manager.fontManager.ttflist)
+    yield path
+    font_manager.fontManager.ttflist[:] = ttflist
+    font_manager.fontManager._findfont_cached.cache_clear()
+    setter._registered_fonts.pop(path, None)
+
+
+def test_lazy_import():
+    code = "import sys, mltoolbox; from mltoolbox.utils import init_logger, load_pickle, setter; print(sorted(m for m in ('numpy', 'pandas', 'matplotlib', 'joblib', 'openpyxl') if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_register_font_cache(font, tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "fonts.json")
+    name = setter.register_font(font, cache_file=cache_file)
+    assert name == "DejaVu Sans"
+    assert json.load(open(cache_file, encoding="utf-8"))[font]["font"]["name"] == name
+
+    # 新进程中直接使用缓存的字体属性，不再解析字体文件
+    def parse(*args, **kwargs):
+        raise AssertionError("不应重新解析字体文件")
+
+    monkeypatch.setattr(font_manager.ft2font, "FT2Font", parse)
+    setter._registered_fonts.clear()
+    font_manager.fontManager.ttflist[:] = [f for f in font_manager.fontManager.ttflist if f.fname != font]
+
+    assert setter.register_font(font, cache_file=cache_file) == name
+    assert sum(f.fname == font for f in font_manager.fontManager.ttflist) == 1
+
+
+def test_register_font_missing(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "wget", None)
+    with pytest.raises(FileNotFoundError):
+        setter.register_font(str(tmp_path / "missing.ttf"), cache_file=str(tmp_path / "fonts.json"))
+
+
+def sample_task(task):
+    import random
+    import numpy as np
+
+    setter.seed_task(42, "task", task)
+    return task, random.random(), float(np.random.random_sample()), float(setter.task_rng(42, "rng", task).random())
+
+
+def sample_worker(_):
+    import time
+    import multiprocessing
+    import numpy as np
+
+    # 第一个任务在每个工作进程中各执行一次
+    time.sleep(0.2)
+    return multiprocessing.current_process()._identity, float(np.random.random_sample())
+
+
+def test_task_seed():
+    assert setter.task_seed(42, "cv", 1) == setter.task_seed(42, "cv", 1)
+    assert setter.spawn_seeds(42, 3, "cv") == [setter.task_seed(42, "cv", i) for i in range(3)]
+    seeds = setter.spawn_seeds(42, 100) + setter.spawn_seeds(43, 100) + setter.spawn_seeds(42, 100, "bagging")
+    assert len(set(seeds)) == len(seeds)
+    assert all(0 <= s < 2 ** 32 for s in seeds)
+
+
+def test_pool_reproducible():
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    expected = [sample_task(task) for task in range(8)]
+
+    for max_workers in [1, 3]:
+        with ProcessPoolExecutor(max_workers, initializer=setter.worker_initializer, initargs=(42,)) as pool:
+            assert list(pool.map(sample_task, range(8))) == expected
+
+    # 线程池中共享全局随机状态，只有 task_rng 的结果与调度无关
+    with ThreadPoolExecutor(3) as pool:
+        assert [r[3] for r in pool.map(sample_task, range(8))] == [r[3] for r in expected]
+
+
+def test_worker_initializer():
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(2, initializer=setter.worker_initializer, initargs=(42,)) as pool:
+        results = dict(pool.map(sample_worker, range(2)))
+
+    assert len(results) == 2 and len(set(results.values())) == 2
+    for identity, value in results.items():
+        assert value == np.random.RandomState(setter.task_seed(42, "worker", *identity)).random_sample()
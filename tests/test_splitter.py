@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/17 06:50
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from mltoolbox.cv import CrossValidator
+from mltoolbox.cv.splitter import KFoldSplit, StratifiedSplit, GroupSplit, OutOfTimeSplit, RollingSplit
+
+
+def peak_bytes(splitter, *args):
+    """
+    遍历全部折时分配内存的峰值，不包括输入数据
+    """
+    tracemalloc.start()
+    try:
+        for _ in splitter.split(*args):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def check_partition(folds, n):
+    valid = np.concatenate([v for _, v in folds])
+    assert np.array_equal(np.sort(valid), np.arange(n))
+    for train, v in folds:
+        assert train.dtype == np.int32 and v.dtype == np.int32
+        assert len(train) + len(v) == n and not np.intersect1d(train, v).size
+
+
+def test_stratified():
+    n = 100000
+    y = (np.random.RandomState(0).random_sample(n) < 0.1).astype(int)
+    folds = list(StratifiedSplit(5, shuffle=True, random_state=42).split(np.empty((n, 1)), y))
+    check_partition(folds, n)
+    assert all(abs(y[v].mean() - y.mean()) < 1e-3 for _, v in folds)
+
+    # 相同的随机种子划分相同
+    again = list(StratifiedSplit(5, shuffle=True, random_state=42).split(np.empty((n, 1)), y))
+    assert all(np.array_equal(a[1], b[1]) for a, b in zip(folds, again))
+
+    # 与 sklearn 一致，部分类别的样本数少于折数时只提示，样本分配到能够覆盖的折中，全部类别都少于折数时报错
+    y = np.array([0] * 20 + [1] * 2)
+    with pytest.warns(UserWarning):
+        folds = list(StratifiedSplit(5, shuffle=True, random_state=0).split(np.empty((22, 1)), y))
+    check_partition(folds, 22)
+    assert sorted(int(y[v].sum()) for _, v in folds) == [0, 0, 0, 1, 1]
+    with pytest.raises(ValueError):
+        next(StratifiedSplit(5).split(np.empty((6, 1)), [0, 0, 0, 1, 1, 1]))
+
+
+def test_group():
+    n = 50000
+    groups = np.random.RandomState(0).randint(0, 2000, n)
+    folds = list(GroupSplit(4).split(np.empty((n, 1)), groups=groups))
+    check_partition(folds, n)
+    assert all(not np.intersect1d(groups[t], groups[v]).size for t, v in folds)
+    assert max(len(v) for _, v in folds) - min(len(v) for _, v in folds) < n * 0.01
+
+
+def test_memory():
+    n = 2000000
+    X = np.empty((n, 1), dtype=np.float32)
+    y = (np.random.RandomState(0).random_sample(n) < 0.1).astype(np.int8)
+
+    # 每行 1 字节的折编号加上最多两折的 int32 下标 (上一折在生成下一折时仍被引用)
+    assert peak_bytes(StratifiedSplit(5, shuffle=True, random_state=0), X, y) < 11 * n
+    assert peak_bytes(KFoldSplit(5, shuffle=True, random_state=0), X, y) < 11 * n
+
+    # 按时间顺序划分只生成 slice ，与数据量无关
+    times = pd.DataFrame({"t": np.repeat(pd.date_range("2020-01-01", periods=1000, freq="D"), n // 1000)})
+    assert peak_bytes(RollingSplit("180D", "30D", time="t"), times) < 2 * 1024 ** 2
+    assert peak_bytes(OutOfTimeSplit(0.8), X) < 64 * 1024
+
+
+def test_ordered_views():
+    data = pd.DataFrame({"t": pd.date_range("2023-01-01", periods=365, freq="D").repeat(10), "x": np.arange(3650.)})
+
+    folds = list(OutOfTimeSplit(["2023-04-01", "2023-07-01"], time="t", gap="30D").split(data))
+    assert folds == [(slice(0, 900), slice(1200, 1810)), (slice(0, 1810), slice(2110, 3650))]
+    assert np.shares_memory(data.iloc[folds[0][0]]["x"].to_numpy(), data["x"].to_numpy())
+
+    rolling = RollingSplit(5, 2)
+    assert list(rolling.split(np.empty(10))) == [(slice(0, 5), slice(5, 7)), (slice(2, 7), slice(7, 9)), (slice(4, 9), slice(9, 10))]
+    assert rolling.get_n_splits(np.empty(10)) == 3
+    train, valid = list(RollingSplit(5, 2, expanding=True, slices=False).split(np.empty(10)))[-1]
+    assert train.tolist() == list(range(9)) and valid.dtype == np.int32
+
+    with pytest.raises(ValueError):
+        list(OutOfTimeSplit("2023-04-01", time="t").split(data.iloc[::-1]))
+
+
+def test_cross_validator():
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.normal(size=(2000, 5)), columns=list("abcde"))
+    y = (X["a"] + rng.normal(size=2000) > 0).astype(int)
+
+    with CrossValidator(X, y, cv=RollingSplit(1000, 250), n_jobs=1) as validator:
+        assert all(isinstance(train, slice) for train, _ in validator.folds)
+        result = validator.evaluate(LogisticRegression())
+
+    assert np.isnan(result.oof[:1000]).all() and not np.isnan(result.oof[1000:]).any()
+    assert result.scores["train_size"].eq(1000).all() and (result.scores["auc"] > 0.7).all()
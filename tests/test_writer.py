@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2026/10/16 10:12
+@Author  : itlubber
+@Site    : itlubber.art
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mltoolbox.utils.writer import ExcelWriter
+
+
+@pytest.fixture
+def sample():
+    np.random.seed(42)
+    data = pd.DataFrame(np.random.random_sample((12, 4)) * 40, columns=[f"B{i}" for i in range(4)])
+    data["target"] = np.random.randint(0, 3, 12)
+    data["type"] = np.random.choice(["类别A", "B", "类别CC"], 12)
+    data["interval"] = pd.cut(data["B0"], 3).astype(object)
+    data["flag"] = data["B1"] > 20
+    return data
+
+
+def sheet_snapshot(worksheet):
+    cells = {(c.row, c.column): (c.value, c.style, c.number_format) for row in worksheet.iter_rows() for c in row if c.has_style or c.value is not None}
+    widths = {k: v.width for k, v in worksheet.column_dimensions.items()}
+    return cells, widths, sorted(str(r) for r in worksheet.merged_cells.ranges)
+
+
+@pytest.mark.parametrize("params", [
+    dict(),
+    dict(fill=True),
+    dict(fill=True, header=False),
+    dict(header=False),
+    dict(index=True),
+    dict(merge_column="target", merge=True),
+    dict(merge_column=["target", "type"]),
+    dict(merge_column=[4, 5], auto_width=True),
+    dict(fill=True, auto_width=True),
+])
+def test_insert_df2sheet_bulk(template, sample, params):
+    snapshots = []
+    for bulk in (False, True):
+        writer = ExcelWriter(style_excel=template)
+        worksheet = writer.get_sheet_by_name("模型报告")
+        end = writer.insert_df2sheet(worksheet, sample, "B3", bulk=bulk, **params)
+        snapshots.append((end, sheet_snapshot(worksheet)))
+
+    assert snapshots[0] == snapshots[1]
+
+
+def test_dataframe2excel_stream(template, sample, tmp_path):
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import dataframe2excel
+
+    snapshots = []
+    for engine in ("memory", "stream"):
+        writer = ExcelWriter(style_excel=template, engine=engine, buffer_rows=4)
+        worksheet = writer.get_sheet_by_name("模型报告")
+        end_row, _ = writer.insert_value2sheet(worksheet, "B2", value="模型报告", style="header")
+        end_row, _ = dataframe2excel(sample, writer, sheet_name="模型报告", start_row=end_row + 1, title="特征分布", percent_cols=["B0"], custom_cols=["B1"], condition_cols=["B2"], color_cols=["B3"], auto_width=True)
+        dataframe2excel(sample, writer, sheet_name=worksheet, start_row=end_row + 2, fill=False, merge_column="target", merge=True)
+        writer.save(str(tmp_path / f"{engine}.xlsx"))
+
+        worksheet = load_workbook(tmp_path / f"{engine}.xlsx")["模型报告"]
+        snapshots.append((sheet_snapshot(worksheet), [str(cf.sqref) for cf in worksheet.conditional_formatting]))
+
+    assert snapshots[0] == snapshots[1]
+
+
+def test_get_text_width(template):
+    writer = ExcelWriter(style_excel=template)
+    values = ["模型报告", "model", "中文mixed文本", 1.2345, None, ("a", 1), "", "特征" * 30]
+    expected = max((writer.check_contain_chinese(v)[1] * writer.english_width + writer.check_contain_chinese(v)[2] * writer.chinese_width) * writer.fontsize for v in values)
+
+    assert writer.get_text_width(values) == expected
+    assert writer.get_text_width([]) == 0
+
+
+def test_save_append(template, sample, tmp_path):
+    from PIL import Image
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import dataframe2excel
+
+    Image.new("RGB", (60, 30), "red").save(tmp_path / "fig.png")
+    filename = str(tmp_path / "report.xlsx")
+
+    writer = ExcelWriter(style_excel=template)
+    for name in ["概览", "明细", "附录"]:
+        worksheet = writer.get_sheet_by_name(name)
+        dataframe2excel(sample, writer, sheet_name=name, fill=False, merge_column="target", merge=True, percent_cols=["B0"], condition_cols=["B1"], auto_width=True)
+        writer.insert_pic2sheet(worksheet, str(tmp_path / "fig.png"), "L2")
+    writer.save(filename)
+    before = load_workbook(filename)
+
+    for engine in ("memory", "stream"):
+        writer = ExcelWriter(style_excel=template, mode="append", engine=engine, theme_color="E92639")
+        dataframe2excel(sample, writer, sheet_name=f"新增_{engine}", custom_cols=["B2"], custom_format="0.000", color_cols=["B3"])
+        dataframe2excel(sample.head(3), writer, sheet_name="明细")
+        writer.save(filename)
+
+    after = load_workbook(filename)
+    assert after.sheetnames == ["概览", "明细", "附录", "新增_memory", "新增_stream"]
+
+    for name in ["概览", "附录"]:
+        assert sheet_snapshot(before[name]) == sheet_snapshot(after[name])
+        assert len(after[name]._images) == 1
+        assert [str(cf.sqref) for cf in after[name].conditional_formatting] == [str(cf.sqref) for cf in before[name].conditional_formatting]
+
+    assert after["明细"].max_row == 5 and len(after["明细"]._images) == 0
+
+    for name in ["新增_memory", "新增_stream"]:
+        worksheet = after[name]
+        assert worksheet["B2"].style == "header_left" and worksheet["B2"].fill.fgColor.rgb == "00E92639"
+        assert worksheet["D3"].number_format == "0.000" and worksheet["D3"].value == round(sample["B2"].iloc[0], 4)
+        assert [str(cf.sqref) for cf in worksheet.conditional_formatting] == ["E3:E14"]
+
+
+def test_template_cache(template, sample, tmp_path):
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import dataframe2excel
+
+    ExcelWriter.clear_template_cache()
+
+    expected = ExcelWriter(style_excel=template, cache_template=False)
+    dataframe2excel(sample, expected, sheet_name="模型报告", percent_cols=["B0"])
+    assert len(ExcelWriter.templates) == 0
+
+    writer = ExcelWriter(style_excel=template)
+    assert len(ExcelWriter.templates) == 1
+    for i in range(3):
+        writer = ExcelWriter(style_excel=template) if i == 1 else writer
+        dataframe2excel(sample, writer, sheet_name="模型报告", percent_cols=["B0"])
+        writer.save(tmp_path / f"report_{i}.xlsx")
+        writer.reset()
+        assert sheet_snapshot(load_workbook(tmp_path / f"report_{i}.xlsx")["模型报告"]) == sheet_snapshot(expected.workbook["模型报告"])
+
+    assert len(ExcelWriter.templates) == 1
+    assert writer.workbook.sheetnames == ["初始化"]
+    assert writer.workbook._named_styles["header"].fill.fgColor.rgb == "002639E9"
+
+
+def test_build_report(template, sample, tmp_path):
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import SheetJob, build_report
+
+    jobs = [
+        SheetJob("模型报告").title("模型报告").value("样本说明", auto_width=True).table(sample, title="样本明细", percent_cols=["B0"], condition_cols=["B1"]),
+        {"sheet_name": "分箱", "items": [{"type": "table", "data": sample.head(5), "fill": False}, {"type": "table", "data": sample.tail(3), "merge_column": "target", "gap": 1}]},
+        SheetJob("汇总", start_row=3, start_col=3).table(sample.describe().reset_index()),
+    ]
+
+    assert build_report(jobs, tmp_path / "report.xlsx", n_jobs=2, writer_params=dict(style_excel=template)) == ["模型报告", "分箱", "汇总"]
+
+    writer = ExcelWriter(style_excel=template)
+    for job in jobs:
+        (SheetJob(**job) if isinstance(job, dict) else job).render(writer)
+    writer.save(tmp_path / "expected.xlsx")
+
+    report, expected = load_workbook(tmp_path / "report.xlsx"), load_workbook(tmp_path / "expected.xlsx")
+    assert report.sheetnames == expected.sheetnames
+    for name in report.sheetnames:
+        assert sheet_snapshot(report[name]) == sheet_snapshot(expected[name])
+    assert len(report["模型报告"].conditional_formatting) == 1
+
+    with pytest.raises(ValueError):
+        build_report([SheetJob("汇总"), SheetJob("汇总")], tmp_path / "report.xlsx", writer_params=dict(style_excel=template))
+
+
+@pytest.mark.parametrize("engine", ["memory", "stream"])
+def test_insert_pic2sheet_cache(template, tmp_path, engine):
+    import zipfile
+    import matplotlib.pyplot as plt
+    from io import BytesIO
+    from openpyxl import load_workbook
+
+    fig, ax = plt.subplots()
+    ax.plot([1, 3, 2])
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    (tmp_path / "fig.png").write_bytes(buffer.getvalue())
+
+    writer = ExcelWriter(style_excel=template, engine=engine, render_workers=1)
+    worksheet, other = writer.get_sheet_by_name("图片"), writer.get_sheet_by_name("其他")
+    assert writer.insert_pic2sheet(worksheet, fig, "B2", figsize=(350, 175)) == (12, 10)
+    writer.insert_pic2sheet(worksheet, buffer.getvalue(), "L2")
+    writer.insert_pic2sheet(worksheet, str(tmp_path / "fig.png"), "B20")
+    writer.insert_pic2sheet(other, fig, "B2")
+    writer.insert_pic2sheet(other, BytesIO(buffer.getvalue()), "L2")
+    writer.save(tmp_path / "report.xlsx")
+    plt.close(fig)
+
+    with zipfile.ZipFile(tmp_path / "report.xlsx") as zf:
+        assert len([name for name in zf.namelist() if name.startswith("xl/media/")]) == 2
+
+    workbook = load_workbook(tmp_path / "report.xlsx")
+    assert [len(workbook[name]._images) for name in ["图片", "其他"]] == [3, 2]
+
+
+
+def test_insert_pic2sheet_redraw(template, tmp_path):
+    import gc
+    import weakref
+    import zipfile
+    import matplotlib.pyplot as plt
+
+    writer = ExcelWriter(style_excel=template)
+    worksheet = writer.get_sheet_by_name("图片")
+    fig, ax = plt.subplots()
+    ax.plot([1, 3, 2])
+    writer.insert_pic2sheet(worksheet, fig, "B2")
+    first = writer.load_image(fig)[0]
+
+    # 重绘后的 Figure 重新渲染，writer 不持有 Figure 的引用
+    ax.clear()
+    ax.bar([0, 1], [2, 1])
+    assert writer.load_image(fig)[0] != first
+    writer.insert_pic2sheet(worksheet, fig, "L2")
+    reference = weakref.ref(fig)
+    plt.close(fig)
+    del fig, ax
+    gc.collect()
+    assert reference() is None
+
+    writer.save(tmp_path / "report.xlsx")
+    with zipfile.ZipFile(tmp_path / "report.xlsx") as zf:
+        assert len([name for name in zf.namelist() if name.startswith("xl/media/")]) == 2
+
+def conditional_snapshot(worksheet):
+    return sorted((str(rng.sqref), rule.type, str([(v.type, v.val) for v in rule.colorScale.cfvo]) if rule.colorScale else None) for rng in worksheet.conditional_formatting for rule in rng.rules)
+
+
+@pytest.mark.parametrize("engine", ["memory", "stream"])
+@pytest.mark.parametrize("fill", [True, False])
+def test_dataframe2excel_chunks(template, sample, tmp_path, engine, fill):
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import dataframe2excel
+
+    params = dict(title="明细", fill=fill, percent_cols=["B0"], custom_cols=["B1"], condition_cols=["B2"], color_cols=["B3"], auto_width=True)
+    expected = ExcelWriter(style_excel=template)
+    end = dataframe2excel(sample, expected, sheet_name="明细", **params)
+    expected.save(tmp_path / "expected.xlsx")
+
+    writer = ExcelWriter(style_excel=template, engine=engine)
+    assert dataframe2excel((sample.iloc[i:i + 5] for i in range(0, len(sample), 5)), writer, sheet_name="明细", **params) == end
+    writer.save(tmp_path / "chunks.xlsx")
+
+    expected, chunked = load_workbook(tmp_path / "expected.xlsx")["明细"], load_workbook(tmp_path / "chunks.xlsx")["明细"]
+    assert sheet_snapshot(chunked) == sheet_snapshot(expected)
+    assert conditional_snapshot(chunked) == conditional_snapshot(expected)
+
+
+def test_dataframe2excel_rollover(template, sample, tmp_path):
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import dataframe2excel
+
+    params = dict(percent_cols=["B0"], color_cols=["B3"])
+    writer = ExcelWriter(style_excel=template)
+    writer.max_rows = 10
+    assert dataframe2excel(sample, writer, sheet_name="明细", title="明细", **params) == (11, 10)
+    assert dataframe2excel(iter([sample.iloc[:7], sample.iloc[7:]]), writer, sheet_name="分块", title="分块", **params) == (11, 10)
+    writer.save(tmp_path / "rollover.xlsx")
+
+    expected = ExcelWriter(style_excel=template)
+    dataframe2excel(sample.iloc[:6], expected, sheet_name="明细", title="明细", **params)
+    dataframe2excel(sample.iloc[6:], expected, sheet_name="明细_2", start_row=4, **params)
+    expected.save(tmp_path / "expected.xlsx")
+
+    workbook, expected = load_workbook(tmp_path / "rollover.xlsx"), load_workbook(tmp_path / "expected.xlsx")
+    assert workbook.sheetnames == ["明细", "明细_2", "分块", "分块_2"]
+    for name in ["明细", "明细_2"]:
+        assert sheet_snapshot(workbook[name]) == sheet_snapshot(expected[name])
+        assert sheet_snapshot(workbook[name.replace("明细", "分块")])[0] == {k: v if k != (2, 2) else ("分块", *v[1:]) for k, v in sheet_snapshot(expected[name])[0].items()}
+        assert workbook[name].max_row == 10
+
+    assert conditional_snapshot(workbook["明细"])[0][2] == conditional_snapshot(workbook["明细_2"])[0][2] == str([("num", sample["B3"].min()), ("num", 0.0), ("num", sample["B3"].max())])
+
+
+@pytest.mark.parametrize("flags", [dict(bulk=True), dict(merge=False), dict(bulk=True, merge=False)])
+def test_dataframe2excel_chunk_flags(template, sample, tmp_path, flags):
+    from openpyxl import load_workbook
+    from mltoolbox.utils.writer import dataframe2excel
+
+    # 分块写入和超过最大行数的写入接受与 insert_df2sheet 相同的 bulk 、 merge 参数
+    expected = ExcelWriter(style_excel=template)
+    dataframe2excel(sample, expected, sheet_name="明细")
+    expected.save(tmp_path / "expected.xlsx")
+
+    writer = ExcelWriter(style_excel=template)
+    dataframe2excel(iter([sample.iloc[:5], sample.iloc[5:]]), writer, sheet_name="明细", **flags)
+    writer.max_rows = 10
+    dataframe2excel(sample, writer, sheet_name="超长", **flags)
+    writer.save(tmp_path / "flags.xlsx")
+
+    workbook = load_workbook(tmp_path / "flags.xlsx")
+    assert sheet_snapshot(workbook["明细"]) == sheet_snapshot(load_workbook(tmp_path / "expected.xlsx")["明细"])
+    assert workbook.sheetnames[-2:] == ["超长", "超长_2"]
+
+
+def test_append_workbook_replace(tmp_path):
+    import zipfile
+    from io import BytesIO
+    from PIL import Image
+    from openpyxl import Workbook, load_workbook
+    from openpyxl.drawing.image import Image as XLImage
+    from openpyxl.workbook.defined_name import DefinedName
+    from mltoolbox.utils.xlsx import append_workbook, save_workbook
+
+    for color in ("red", "blue"):
+        Image.new("RGB", (60, 30), color).save(tmp_path / f"{color}.png")
+
+    workbook = Workbook()
+    first, second = workbook.active, workbook.create_sheet("B")
+    first.title = "A"
+    first.add_image(XLImage(str(tmp_path / "red.png")), "B2")
+    second.add_image(XLImage(str(tmp_path / "red.png")), "B2")
+    second.add_image(XLImage(str(tmp_path / "blue.png")), "H2")
+    first.print_area = "A1:D10"
+    second.print_area = "A1:B2"
+    workbook.defined_names.append(DefinedName("全局", attr_text="B!$A$1"))
+    workbook.defined_names.append(DefinedName("范围", attr_text="A!$A$1"))
+    filename = str(tmp_path / "report.xlsx")
+    save_workbook(workbook, filename)
+
+    new = Workbook()
+    new.active.title = "C"
+    new.create_sheet("A")["A1"] = 1
+    new["C"].print_area = "A1:E5"
+    new.defined_names.append(DefinedName("范围", attr_text="A!$B$2"))
+    content = BytesIO()
+    new.save(content)
+    append_workbook(filename, content.getvalue())
+
+    with zipfile.ZipFile(filename) as zf:
+        names = zf.namelist()
+        content_types = zf.read("[Content_Types].xml").decode("utf-8")
+    drawings = [name for name in names if name.startswith("xl/drawings/") and name.endswith(".xml")]
+    assert len(drawings) == 1 and len([name for name in names if name.startswith("xl/media/")]) == 2
+    assert all(f'PartName="/{name}"' in content_types for name in drawings) and content_types.count("/xl/drawings/") == 1
+
+    after = load_workbook(filename)
+    assert after.sheetnames == ["A", "B", "C"]
+    assert len(after["A"]._images) == 0 and len(after["B"]._images) == 2 and after["A"]["A1"].value == 1
+    assert after["A"].print_area is None and after["B"].print_area == ["$A$1:$B$2"] and after["C"].print_area == ["$A$1:$E$5"]
+    assert after.defined_names["全局"].attr_text == "B!$A$1" and after.defined_names["范围"].attr_text == "A!$B$2"
+
+
+def test_append_workbook_calc_chain(tmp_path):
+    import zipfile
+    from io import BytesIO
+    from openpyxl import Workbook, load_workbook
+    from mltoolbox.utils.xlsx import append_workbook
+
+    workbook = Workbook()
+    workbook.active.title = "A"
+    workbook["A"]["A1"], workbook["A"]["A2"] = 1, "=A1*2"
+    workbook.create_sheet("B")["B2"] = "=SUM(A!A1:A2)"
+    content = BytesIO()
+    workbook.save(content)
+
+    # 与 excel 保存的文件一致，包含计算链和 app.xml 中的 sheet 列表
+    filename = str(tmp_path / "formula.xlsx")
+    with zipfile.ZipFile(content) as src, zipfile.ZipFile(filename, "w") as dst:
+        for name in src.namelist():
+            data = src.read(name).decode("utf-8")
+            if name == "[Content_Types].xml":
+                data = data.replace("</Types>", '<Override PartName="/xl/calcChain.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.calcChain+xml"/></Types>')
+            elif name == "xl/_rels/workbook.xml.rels":
+                data = data.replace("</Relationships>", '<Relationship Id="rId99" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain" Target="calcChain.xml"/></Relationships>')
+            elif name == "docProps/app.xml":
+                data = data.replace("</Properties>", '<HeadingPairs><vt:vector xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes" size="2" baseType="variant"><vt:variant><vt:lpstr>Worksheets</vt:lpstr></vt:variant><vt:variant><vt:i4>2</vt:i4></vt:variant></vt:vector></HeadingPairs><TitlesOfParts><vt:vector xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes" size="2" baseType="lpstr"><vt:lpstr>A</vt:lpstr><vt:lpstr>B</vt:lpstr></vt:vector></TitlesOfParts></Properties>')
+            dst.writestr(name, data)
+        dst.writestr("xl/calcChain.xml", '<calcChain xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><c r="A2" i="1"/><c r="B2" i="2"/></calcChain>')
+
+    new = Workbook()
+    new.active.title = "A"
+    new["A"]["C3"] = "=1+1"
+    new.create_sheet("C")["A1"] = 3
+    content = BytesIO()
+    new.save(content)
+    append_workbook(filename, content.getvalue())
+
+    with zipfile.ZipFile(filename) as zf:
+        assert "xl/calcChain.xml" not in zf.namelist()
+        assert "calcChain" not in zf.read("[Content_Types].xml").decode("utf-8") and "calcChain" not in zf.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+        app = zf.read("docProps/app.xml").decode("utf-8")
+        assert "TitlesOfParts" not in app and "HeadingPairs" not in app and "<Application>" in app
+
+    after = load_workbook(filename)
+    assert after.sheetnames == ["A", "B", "C"]
+    assert after["A"]["C3"].value == "=1+1" and after["A"]["A2"].value is None and after["B"]["B2"].value == "=SUM(A!A1:A2)"